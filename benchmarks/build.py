@@ -0,0 +1,215 @@
+"""Measure build throughput of the plugin against a local stand-in of PlantUML server.
+
+Every scenario runs the plugin hooks over synthetic pages and times each phase:
+``on_config`` without loading of ``FileStorage``, the loading itself, ``on_page_markdown``,
+``on_env`` (rendering of diagrams), ``on_post_page`` and saving of ``FileStorage``.
+
+Scenarios differ in the state of the cache before the build:
+
+* ``cold`` — the cache is empty, all diagrams are rendered
+* ``warm`` — the cache holds all diagrams, nothing is rendered
+* ``partial`` — the cache holds the diagrams before an edit of ``--changed`` share of them
+
+Run from the repository root::
+
+    python -m benchmarks.build --pages 50 --diagrams 10 --latency 0.02 --output results.json
+
+Compare with the results of a previous run to track regressions::
+
+    python -m benchmarks.build --baseline results.json
+"""
+import argparse
+import datetime
+import json
+from pathlib import Path
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from types import SimpleNamespace
+import typing
+from unittest.mock import patch
+
+from mkdocs_puml.plugin import PlantUMLPlugin
+from mkdocs_puml.storage import build_storage
+from benchmarks.docs import generate
+from benchmarks.server import MockPlantUMLServer
+
+SCENARIOS = ("cold", "warm", "partial")
+PHASES = ("on_config", "storage_load", "on_page_markdown", "on_env", "on_post_page", "storage_save")
+
+
+def build_plugin(server: MockPlantUMLServer, cache_dir: Path, args: argparse.Namespace) -> PlantUMLPlugin:
+    plugin = PlantUMLPlugin()
+    errors, _ = plugin.load_config(
+        {
+            "puml_url": server.url,
+            "verbose": False,
+            "streaming": args.streaming,
+            "post_threshold": args.post_threshold,
+            "retry": {"backoff_factor": args.backoff},
+            "theme": {"enabled": args.theme},
+            "interaction": {"enabled": False},
+            "cache": {
+                "backend": "local",
+                "local": {"path": str(cache_dir), "join_project_name": False},
+            },
+        }
+    )
+    assert not errors, errors
+    return plugin
+
+
+def run_build(
+    server: MockPlantUMLServer, cache_dir: Path, pages: dict[str, str], args: argparse.Namespace
+) -> dict[str, typing.Any]:
+    """Run the hooks of the plugin over the pages once.
+
+    Returns:
+        dict: seconds spent in each phase, the number of requests sent
+              to the server and the size of the storage file
+    """
+    timings = {}
+    server.reset()
+    plugin = build_plugin(server, cache_dir, args)
+
+    def load_storage(config):
+        start = time.perf_counter()
+        storage = build_storage(config)
+        timings["storage_load"] = time.perf_counter() - start
+        return storage
+
+    # on_config loads the storage, its time is reported separately
+    start = time.perf_counter()
+    with patch("mkdocs_puml.plugin.build_storage", load_storage):
+        plugin.on_config({"extra_css": [], "extra_javascript": [], "docs_dir": str(cache_dir)})
+    timings["on_config"] = time.perf_counter() - start - timings["storage_load"]
+
+    start = time.perf_counter()
+    html = {name: plugin.on_page_markdown(markdown) for name, markdown in pages.items()}
+    timings["on_page_markdown"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plugin.on_env(None)
+    timings["on_env"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for name, output in html.items():
+        plugin.on_post_page(output, SimpleNamespace(url=name[:-3] + "/", content=None))
+    timings["on_post_page"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    plugin.storage.save()
+    timings["storage_save"] = time.perf_counter() - start
+
+    return {
+        "timings": timings,
+        "requests": server.requests,
+        "errors": server.errors,
+        "diagrams": len(plugin.storage.keys()),
+        "cache_size": plugin.storage.path.stat().st_size,
+    }
+
+
+def run_scenario(name: str, server: MockPlantUMLServer, args: argparse.Namespace) -> dict[str, typing.Any]:
+    pages = generate(args.pages, args.diagrams, args.lines)
+    edited = generate(args.pages, args.diagrams, args.lines, changed=args.changed) if name == "partial" else pages
+
+    runs = []
+    for _ in range(args.repeat):
+        with tempfile.TemporaryDirectory(prefix="mkdocs_puml-bench-") as tmp:
+            cache_dir = Path(tmp)
+            if name != "cold":
+                run_build(server, cache_dir, pages, args)
+            runs.append(run_build(server, cache_dir, edited, args))
+
+    phases = {}
+    for phase in PHASES:
+        values = [r["timings"][phase] for r in runs]
+        phases[phase] = {"min": min(values), "median": statistics.median(values), "runs": values}
+
+    last = runs[-1]
+    return {
+        "phases": phases,
+        "requests": last["requests"],
+        "errors": last["errors"],
+        "diagrams": last["diagrams"],
+        "cache_size": last["cache_size"],
+    }
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """Compare median timings with a baseline.
+
+    Returns:
+        list[str]: phases of scenarios that are slower than the baseline
+                   by more than ``threshold`` times
+    """
+    regressions = []
+    for scenario, data in results["scenarios"].items():
+        base = baseline.get("scenarios", {}).get(scenario)
+        if base is None:
+            continue
+        for phase, values in data["phases"].items():
+            if phase not in base["phases"]:
+                continue
+            before, after = base["phases"][phase]["median"], values["median"]
+            ratio = after / before if before else 1.0
+            print(f"{scenario:>8} | {phase:>16} | {before * 1000:9.2f} ms -> {after * 1000:9.2f} ms | {ratio:5.2f}x")
+            if ratio > threshold:
+                regressions.append(f"{scenario}/{phase}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--diagrams", type=int, default=10, help="diagrams per page")
+    parser.add_argument("--lines", type=int, default=20, help="messages per diagram")
+    parser.add_argument("--changed", type=float, default=0.1, help="share of diagrams edited in `partial`")
+    parser.add_argument("--repeat", type=int, default=3, help="builds per scenario")
+    parser.add_argument("--latency", type=float, default=0.02, help="latency of the server in seconds")
+    parser.add_argument("--jitter", type=float, default=0.01, help="random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed with 503")
+    parser.add_argument("--backoff", type=float, default=0.0, help="`retry.backoff_factor` of the plugin")
+    parser.add_argument("--post-threshold", type=int, default=4096, help="`post_threshold` of the plugin")
+    parser.add_argument("--streaming", action="store_true", help="enable `streaming` of the plugin")
+    parser.add_argument("--no-theme", dest="theme", action="store_false", help="disable light / dark themes")
+    parser.add_argument("--output", type=Path, help="write results to a JSON file")
+    parser.add_argument("--baseline", type=Path, help="JSON results of a previous run to compare with")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown against baseline that fails")
+    args = parser.parse_args()
+
+    results = {
+        "meta": {
+            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "params": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()},
+        "scenarios": {},
+    }
+
+    with MockPlantUMLServer(args.latency, args.jitter, args.error_rate) as server:
+        for name in args.scenarios:
+            results["scenarios"][name] = data = run_scenario(name, server, args)
+
+            print(f"{name}: {data['diagrams']} diagrams, {data['requests']} requests, {data['errors']} errors")
+            for phase, values in data["phases"].items():
+                print(f"  {phase:>16}: {values['median'] * 1000:9.2f} ms (min {values['min'] * 1000:.2f} ms)")
+
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"Slower than baseline: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Generate synthetic documentation with PlantUML diagrams.
+
+Each page has the same number of ``puml`` code blocks separated with paragraphs
+of text. Diagrams are sequence diagrams of a configurable number of lines.
+
+Run from the repository root to write the pages into a directory::
+
+    python -m benchmarks.docs docs_out --pages 50 --diagrams 10 --lines 20
+"""
+import argparse
+from pathlib import Path
+import random
+
+PARAGRAPH = (
+    "Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua. Ut enim ad minim veniam.\n\n"
+)
+PARTICIPANTS = ("Alice", "Bob", "Carol", "Dave", "Eve", "Mallory", "Trent")
+
+
+def build_diagram(page: int, index: int, lines: int, revision: int = 0, keyword: str = "puml") -> str:
+    """Build a ``puml`` code block of a sequence diagram.
+
+    The content is deterministic for the same arguments; changing
+    ``revision`` changes the diagram, so it's not found in a cache.
+
+    Args:
+        page (int): number of the page
+        index (int): number of the diagram on the page
+        lines (int): number of messages in the diagram
+        revision (int): revision of the diagram
+        keyword (str): keyword of the code block
+
+    Returns:
+        str: markdown code block with the diagram
+    """
+    rnd = random.Random(f"{page}-{index}")
+    messages = []
+    for i in range(lines):
+        a, b = rnd.sample(PARTICIPANTS, 2)
+        messages.append(f"{a} -> {b} : message {page}.{index}.{i} r{revision}")
+
+    body = "\n".join(messages)
+    return f"```{keyword}\n@startuml\n{body}\n@enduml\n```\n\n"
+
+
+def generate(
+    pages: int, diagrams: int, lines: int, changed: float = 0.0, keyword: str = "puml", seed: int = 0
+) -> dict[str, str]:
+    """Generate markdown pages.
+
+    Args:
+        pages (int): number of pages
+        diagrams (int): number of diagrams on each page
+        lines (int): number of messages in each diagram
+        changed (float): share of diagrams that get a new revision, e.g. ``0.1`` changes
+                         every tenth diagram on average. It simulates an edit of the docs
+                         between two builds
+        keyword (str): keyword of the code blocks
+        seed (int): seed that selects the changed diagrams
+
+    Returns:
+        dict[str, str]: path of a page relative to ``docs_dir`` mapped to its markdown
+    """
+    rnd = random.Random(seed)
+    result = {}
+    for p in range(pages):
+        parts = [f"# Page {p}\n\n"]
+        for d in range(diagrams):
+            revision = 1 if changed and rnd.random() < changed else 0
+            parts.append(PARAGRAPH * 3)
+            parts.append(build_diagram(p, d, lines, revision, keyword))
+        result[f"page_{p:04d}.md"] = "".join(parts)
+    return result
+
+
+def write(docs_dir: Path, pages: dict[str, str]):
+    """Write the generated pages into a directory"""
+    docs_dir.mkdir(parents=True, exist_ok=True)
+    for name, markdown in pages.items():
+        docs_dir.joinpath(name).write_text(markdown, encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("docs_dir", type=Path, help="directory to write pages into")
+    parser.add_argument("--pages", type=int, default=50)
+    parser.add_argument("--diagrams", type=int, default=10, help="diagrams per page")
+    parser.add_argument("--lines", type=int, default=20, help="messages per diagram")
+    parser.add_argument("--changed", type=float, default=0.0, help="share of diagrams with a new revision")
+    parser.add_argument("--keyword", default="puml")
+    args = parser.parse_args()
+
+    pages = generate(args.pages, args.diagrams, args.lines, args.changed, args.keyword)
+    write(args.docs_dir, pages)
+    print(f"Wrote {len(pages)} pages to {args.docs_dir}")
+
+
+if __name__ == "__main__":
+    main()
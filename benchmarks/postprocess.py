@@ -0,0 +1,67 @@
+"""Compare SVG post-processing with the former DOM round-trip.
+
+Run from the repository root::
+
+    python -m benchmarks.postprocess --size 4
+"""
+import argparse
+from pathlib import Path
+import re
+import timeit
+import tracemalloc
+from xml.dom.minidom import parseString  # nosec
+
+from mkdocs_puml.puml import PlantUML
+
+TESTDATA_SVG = Path(__file__).resolve().parent.parent.joinpath("tests", "testdata", "plantuml.svg")
+
+
+def build_svg(size_mb: float) -> str:
+    """Grow the test diagram until it reaches ``size_mb`` megabytes"""
+    svg = TESTDATA_SVG.read_text()
+    body = re.search(r"<g>(.*)</g></svg>", svg, flags=re.DOTALL).group(1)
+    head = svg[: svg.index("<g>")]
+
+    repeat = max(int(size_mb * 1024 * 1024 / len(body)), 1)
+    return f"{head}<g>{body * repeat}</g></svg>"
+
+
+def dom_postprocess(puml: PlantUML, content: str) -> str:
+    svg = parseString(puml._clean_comments(content)).getElementsByTagName("svg")[0]  # nosec
+    svg.setAttribute("class", "diagram")
+    svg.setAttribute("preserveAspectRatio", "xMidYMid meet")
+    return svg.toxml()
+
+
+def measure(fn, content: str, number: int) -> tuple[float, int]:
+    seconds = min(timeit.repeat(lambda: fn(content), number=number, repeat=3)) / number
+
+    tracemalloc.start()
+    fn(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return seconds, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=float, default=4, help="SVG size in megabytes")
+    parser.add_argument("--number", type=int, default=3, help="runs per measurement")
+    args = parser.parse_args()
+
+    puml = PlantUML("http://localhost/")
+    content = build_svg(args.size)
+
+    dom_time, dom_peak = measure(lambda c: dom_postprocess(puml, c), content, args.number)
+    new_time, new_peak = measure(puml.postprocess, content, args.number)
+
+    mb = len(content) / 1024 / 1024
+    print(f"SVG size: {mb:.2f} MB")
+    print(f"minidom:     {dom_time * 1000:9.2f} ms, peak memory {dom_peak / 1024 / 1024:8.2f} MB")
+    print(f"postprocess: {new_time * 1000:9.2f} ms, peak memory {new_peak / 1024 / 1024:8.2f} MB")
+    print(f"speedup: {dom_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
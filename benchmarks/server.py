@@ -0,0 +1,209 @@
+"""Local stand-in for PlantUML server.
+
+It answers ``GET /svg/<encoded>`` and ``POST /svg`` requests with SVG images
+that grow with the number of lines in a diagram, after a configurable
+latency. A share of requests fails with ``503`` to exercise retries.
+
+Run from the repository root::
+
+    python -m benchmarks.server --port 8080 --latency 0.05 --error-rate 0.01
+"""
+import argparse
+import base64
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import random
+import threading
+import time
+import zlib
+
+from mkdocs_puml.encoder import _B64_CHARS, _PUML_CHARS
+
+_DECODE_MAP = bytes.maketrans(_PUML_CHARS.encode("utf-8"), _B64_CHARS.encode("utf-8"))
+
+_ROW_HEIGHT = 30
+
+
+def decode(encoded: str) -> str:
+    """Decode a diagram encoded by ``mkdocs_puml.encoder.encode``"""
+    raw = base64.b64decode(encoded.encode("utf-8").translate(_DECODE_MAP))
+    return zlib.decompress(raw, wbits=-15).decode("utf-8")
+
+
+def render(scheme: str) -> str:
+    """Draw a sequence-like SVG image with a row for each line of a diagram.
+    The markup mimics the output of PlantUML server
+    """
+    lines = [
+        line.strip() for line in scheme.splitlines()
+        if line.strip() and not line.strip().startswith(("@", "!", "'"))
+    ] or ["empty"]
+
+    width = max(len(line) for line in lines) * 8 + 40
+    height = len(lines) * _ROW_HEIGHT + 20
+    rows = []
+    for i, line in enumerate(lines):
+        y = 10 + i * _ROW_HEIGHT
+        rows.append(
+            f'<rect fill="#E2E2F0" height="24" rx="2.5" ry="2.5" style="stroke:#181818;stroke-width:0.5;" '
+            f'width="{width - 20}" x="10" y="{y}"/>'
+            f'<text fill="#000000" font-family="sans-serif" font-size="14" lengthAdjust="spacing" '
+            f'textLength="{len(line) * 8}" x="20" y="{y + 17}">{escape(line)}</text>'
+            f'<line style="stroke:#181818;stroke-width:0.5;stroke-dasharray:5.0,5.0;" '
+            f'x1="{width // 2}" x2="{width // 2}" y1="{y + 24}" y2="{y + _ROW_HEIGHT}"/>'
+        )
+
+    return (
+        '<?xml version="1.0" encoding="UTF-8" standalone="no"?>'
+        '<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+        f'contentStyleType="text/css" height="{height}px" preserveAspectRatio="none" '
+        f'style="width:{width}px;height:{height}px;background:#FFFFFF;" version="1.1" '
+        f'viewBox="0 0 {width} {height}" width="{width}px" zoomAndPan="magnify">'
+        f'<defs/><g>{"".join(rows)}</g>'
+        f"<!--SRC=[{escape(scheme[:64])}]--></svg>"
+    )
+
+
+class MockPlantUMLServer:
+    """HTTP server that renders diagrams like PlantUML server does.
+
+    Args:
+        latency (float): seconds to wait before answering a request
+        jitter (float): random extra latency in seconds, up to this value
+        error_rate (float): share of requests answered with ``503``
+        host (str): host to listen on
+        port (int): port to listen on. ``0`` picks a free port
+        seed (int): seed of the random generator for latency and errors
+
+    Examples:
+        Use this class as::
+
+            with MockPlantUMLServer(latency=0.05) as server:
+                plantuml = PlantUML(server.url)
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        seed: int = 0,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.requests = 0
+        self.errors = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="mock-plantuml", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        self._thread.join()
+
+    def reset(self):
+        """Reset the counters of requests and errors"""
+        with self._lock:
+            self.requests = 0
+            self.errors = 0
+
+    def __enter__(self) -> "MockPlantUMLServer":
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _answer(self) -> tuple[float, bool]:
+        """Return the delay of a response and whether it fails"""
+        with self._lock:
+            self.requests += 1
+            delay = self.latency + self._random.uniform(0, self.jitter)
+            failed = self._random.random() < self.error_rate
+            if failed:
+                self.errors += 1
+        return delay, failed
+
+    def _handler(self) -> type:
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                prefix = "/svg/"
+                if not self.path.startswith(prefix):
+                    self._send(404, b"Not found", "text/plain")
+                    return
+                self._respond(lambda: decode(self.path[len(prefix):]))
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path.rstrip("/") != "/svg":
+                    self._send(404, b"Not found", "text/plain")
+                    return
+                self._respond(lambda: body.decode("utf-8"))
+
+            def _respond(self, read_scheme):
+                delay, failed = server._answer()
+                if delay:
+                    time.sleep(delay)
+                if failed:
+                    self._send(503, b"Service Unavailable", "text/plain")
+                    return
+
+                try:
+                    scheme = read_scheme()
+                except (ValueError, zlib.error):
+                    self._send(400, b"Bad diagram", "text/plain")
+                    return
+                self._send(200, render(scheme).encode("utf-8"), "image/svg+xml")
+
+            def _send(self, status: int, content: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds to wait before answering")
+    parser.add_argument("--jitter", type=float, default=0.0, help="random extra latency in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests failed with 503")
+    args = parser.parse_args()
+
+    server = MockPlantUMLServer(args.latency, args.jitter, args.error_rate, args.host, args.port)
+    print(f"Serving PlantUML stand-in at {server.url}")
+    with server:
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Compare placeholder substitution in ``on_page_markdown`` and ``on_post_page``
+with the former approach that replaced each diagram over the whole page.
+
+Run from the repository root::
+
+    python -m benchmarks.substitution --diagrams 25 50 100 200 400
+"""
+import argparse
+import timeit
+from unittest.mock import MagicMock
+
+from mkdocs_puml.plugin import PlantUMLPlugin
+from benchmarks.postprocess import TESTDATA_SVG
+
+SCHEME = "@startuml\nBob -> Alice : hello {}\n@enduml"
+
+
+def build_plugin() -> PlantUMLPlugin:
+    plugin = PlantUMLPlugin()
+    errors, warnings = plugin.load_config(
+        {"puml_url": "http://localhost/", "verbose": False, "cache": {"backend": "disabled"}}
+    )
+    assert not errors, errors
+    plugin.on_config({"extra_css": [], "extra_javascript": []})
+    return plugin
+
+
+def build_markdown(diagrams: int) -> str:
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit.\n\n" * 20
+    return "".join(f"{text}```puml\n{SCHEME.format(i)}\n```\n\n" for i in range(diagrams))
+
+
+def former_on_page_markdown(plugin: PlantUMLPlugin, markdown: str) -> str:
+    for v in plugin.regex.findall(markdown):
+        replace_into = plugin.container.format(plugin._store_dual(v))
+        markdown = markdown.replace(f"```{plugin.puml_keyword}{v}```", replace_into)
+    return markdown
+
+
+def former_on_post_page(plugin: PlantUMLPlugin, output: str) -> str:
+    for key in plugin.uuid_regex.findall(output):
+        diagram = plugin.storage[key]
+        replacement = f'<div class="puml {diagram.mode}" style="">{diagram.diagram}</div>'
+        output = output.replace(f'<pre class="{plugin.pre_class_name}">{key}</pre>', replacement)
+    return output
+
+
+def measure(fn, number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--diagrams", type=int, nargs="+", default=[25, 50, 100, 200, 400])
+    parser.add_argument("--number", type=int, default=3, help="runs per measurement")
+    args = parser.parse_args()
+
+    svg = TESTDATA_SVG.read_text()
+    page = MagicMock()
+
+    print(f"{'diagrams':>8} | {'markdown, former':>16} | {'markdown':>10} | {'html, former':>12} | {'html':>10}")
+    for n in args.diagrams:
+        markdown = build_markdown(n)
+
+        plugin = build_plugin()
+        md_former = measure(lambda: former_on_page_markdown(plugin, markdown), args.number)
+        md_new = measure(lambda: plugin.on_page_markdown(markdown), args.number)
+
+        html = plugin.on_page_markdown(markdown)
+        for k in plugin.storage.keys():
+            plugin.storage[k].diagram = svg
+
+        html_former = measure(lambda: former_on_post_page(plugin, html), args.number)
+        html_new = measure(lambda: plugin.on_post_page(html, page), args.number)
+
+        print(f"{n:>8} | {md_former:>13.2f} ms | {md_new:>7.2f} ms | {html_former:>9.2f} ms | {html_new:>7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
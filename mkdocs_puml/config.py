@@ -6,6 +6,7 @@ from mkdocs.config.config_options import Type, SubConfig, Choice
 class CacheBackend(Enum):
     DISABLED = "disabled"
     LOCAL = "local"
+    SQLITE = "sqlite"
 
     @classmethod
     def values(cls):
@@ -16,6 +17,9 @@ class ThemeConfig(Config):
     enabled = Type(bool, default=True)
     light = Type(str, default="default/light")
     dark = Type(str, default="default/dark")
+    recolor = Type(bool, default=False)
+    inline = Type(bool, default=False)
+    path = Type(str, default="")
 
     url = Type(
         str,
@@ -26,23 +30,108 @@ class ThemeConfig(Config):
 class LocalCacheConfig(Config):
     path = Type(str, default="~/.cache/mkdocs_puml/")
     join_project_name = Type(bool, default=True)
+    max_size = Type(int, default=0)
+    max_entries = Type(int, default=0)
+    lazy = Type(bool, default=False)
+    lru_size = Type(int, default=32)
+
+
+class SQLiteCacheConfig(Config):
+    path = Type(str, default="~/.cache/mkdocs_puml/")
+    join_project_name = Type(bool, default=True)
 
 
 class CacheConfig(Config):
     backend = Choice(CacheBackend.values(), default=CacheBackend.LOCAL.value)
+    max_age = Type(int, default=30)
     local = SubConfig(LocalCacheConfig)
+    sqlite = SubConfig(SQLiteCacheConfig)
 
 
 class InteractionConfig(Config):
     enabled = Type(bool, default=True)
 
 
+class RetryConfig(Config):
+    attempts = Type(int, default=3)
+    backoff_factor = Type((int, float), default=0.5)
+    backoff_max = Type((int, float), default=30)
+    budget = Type(int, default=100)
+
+
+class ReportConfig(Config):
+    enabled = Type(bool, default=False)
+    path = Type(str, default="")
+    top = Type(int, default=5)
+
+
+class MetricsFormat(Enum):
+    OPENMETRICS = "openmetrics"
+    PROMETHEUS = "prometheus"
+
+    @classmethod
+    def values(cls):
+        return [v.value for v in cls]
+
+
+class MetricsConfig(Config):
+    enabled = Type(bool, default=False)
+    path = Type(str, default="")
+    format = Choice(MetricsFormat.values(), default=MetricsFormat.OPENMETRICS.value)
+
+
+class ProfileConfig(Config):
+    enabled = Type(bool, default=False)
+    path = Type(str, default="")
+
+
+class ProcessRendererConfig(Config):
+    command = Type(str, default="plantuml -tsvg -pipe")
+
+
+class OutputMode(Enum):
+    INLINE = "inline"
+    EXTERNAL = "external"
+    LAZY = "lazy"
+
+    @classmethod
+    def values(cls):
+        return [v.value for v in cls]
+
+
+class RenderMode(Enum):
+    ONLINE = "online"
+    OFFLINE = "offline"
+
+    @classmethod
+    def values(cls):
+        return [v.value for v in cls]
+
+
 class PlantUMLConfig(Config):
     puml_url = Type(str)
+    renderer = Type(str, default="plantuml")
+    process = SubConfig(ProcessRendererConfig)
     puml_keyword = Type(str, default="puml")
     verify_ssl = Type(bool, default=True)
     verbose = Type(bool, default=True)
     request_timeout = Type(int, default=300)
+    post_threshold = Type(int, default=4096)
+    max_concurrency = Type(int, default=16)
+    max_connections = Type(int, default=16)
+    max_keepalive_connections = Type(int, default=16)
+    retry = SubConfig(RetryConfig)
+    streaming = Type(bool, default=False)
+    mode = Choice(RenderMode.values(), default=RenderMode.ONLINE.value)
+    deadline = Type((int, float), default=0)
+    client_render = Type(bool, default=False)
+    inline_includes = Type(bool, default=False)
+    num_workers = Type(int, default=0)
+    worker_type = Choice(("thread", "process"), default="thread")
+    output = Choice(OutputMode.values(), default=OutputMode.INLINE.value)
     theme = SubConfig(ThemeConfig)  # SubConfig already has an `{}` as default
     cache = SubConfig(CacheConfig)
     interaction = SubConfig(InteractionConfig)
+    report = SubConfig(ReportConfig)
+    metrics = SubConfig(MetricsConfig)
+    profile = SubConfig(ProfileConfig)
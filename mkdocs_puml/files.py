@@ -0,0 +1,86 @@
+from contextlib import contextmanager
+import os
+from pathlib import Path
+import typing
+
+if os.name == "nt":  # pragma: no cover
+    import msvcrt
+
+    def _lock(f: typing.IO):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+
+    def _unlock(f: typing.IO):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def _lock(f: typing.IO):
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+    def _unlock(f: typing.IO):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path) -> typing.Iterator[None]:
+    """Hold an exclusive advisory lock on a file.
+
+    The lock is shared between processes, so several ``mkdocs build``
+    processes using the same storage don't write it at the same time.
+
+    Args:
+        path (Path): path to the lock file. It's created if it doesn't exist
+    """
+    with open(path, "a+b") as f:
+        _lock(f)
+        try:
+            yield
+        finally:
+            _unlock(f)
+
+
+@contextmanager
+def atomic_write(path: Path) -> typing.Iterator[typing.BinaryIO]:
+    """Open a temporary file for writing and replace the file
+    at ``path`` with it when the block exits without errors.
+
+    Readers see either the previous or the new content of the file,
+    never a partially written one.
+
+    Args:
+        path (Path): path to the file to write
+
+    Yields:
+        BinaryIO: temporary file opened for writing
+    """
+    tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            yield f
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
+
+def file_stamp(path: Path) -> typing.Optional[tuple[int, int]]:
+    """Modification time and size of a file that change
+    when the file is rewritten.
+
+    Args:
+        path (Path): path to the file
+
+    Returns:
+        tuple[int, int] | None: modification time in nanoseconds and size,
+                                or ``None`` if the file doesn't exist
+    """
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
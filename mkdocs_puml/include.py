@@ -0,0 +1,92 @@
+import logging
+from pathlib import Path
+import re
+
+logger = logging.getLogger("mkdocs.plugins.plantuml")
+
+INCLUDE_REGEX = re.compile(r"^[ \t]*!include(_once)?[ \t]+(.+?)[ \t]*$", flags=re.MULTILINE)
+
+
+class Includer:
+    """Includer splices the content of local files into PlantUML diagrams
+    in place of ``!include`` statements.
+
+    PlantUML server can't read files from the machine that builds the docs,
+    so local includes are resolved before a diagram is encoded. Each file
+    is read once and cached for the lifetime of the object, i.e. one build.
+
+    Remote includes (``!include https://...``), standard library includes
+    (``!include <C4/C4_Container>``) and includes of a sub-diagram
+    (``!include file.puml!1``) are left to the server.
+
+    Examples:
+        Use this class as::
+
+            includer = Includer()
+            diagram = includer.resolve(diagram, Path("docs"))
+    """
+
+    def __init__(self):
+        self._cache: dict[Path, str] = {}
+
+    def read(self, path: Path) -> str:
+        """Read the content of an included file.
+        Only the body between ``@startuml`` and ``@enduml`` is returned.
+
+        Args:
+            path (Path): path to the file
+
+        Returns:
+            str: content of the file
+        """
+        path = path.resolve()
+        if path not in self._cache:
+            self._cache[path] = self._strip_tags(path.read_text(encoding="utf-8"))
+        return self._cache[path]
+
+    def resolve(self, diagram: str, base_dir: Path) -> str:
+        """Replace local ``!include`` statements of a diagram with
+        the content of the files. Nested includes are resolved
+        relative to the file that includes them.
+
+        Args:
+            diagram (str): string representation of PUML diagram
+            base_dir (Path): directory to resolve relative paths against
+
+        Returns:
+            str: diagram with local files included
+        """
+        return self._resolve(diagram, base_dir, stack=(), included=set())
+
+    def _resolve(
+        self, diagram: str, base_dir: Path, stack: tuple[Path, ...], included: set[Path]
+    ) -> str:
+        def _replace(m: re.Match) -> str:
+            once, target = m.groups()
+            if "://" in target or target.startswith("<") or "!" in target:
+                return m.group(0)
+
+            path = base_dir.joinpath(target).resolve()
+            if not path.is_file():
+                logger.warning(f"Included file {target} is not found in {base_dir}")
+                return m.group(0)
+            if path in stack:
+                logger.warning(f"Recursive include of {path} is skipped")
+                return ""
+            if once and path in included:
+                return ""
+
+            included.add(path)
+            return self._resolve(self.read(path), path.parent, (*stack, path), included)
+
+        return INCLUDE_REGEX.sub(_replace, diagram)
+
+    @staticmethod
+    def _strip_tags(content: str) -> str:
+        start = content.find("@startuml")
+        if start == -1:
+            return content.strip()
+
+        body = content[start:].partition("\n")[2]
+        end = body.rfind("@enduml")
+        return (body[:end] if end != -1 else body).strip()
@@ -0,0 +1,192 @@
+from pathlib import Path
+import time
+import typing
+
+from mkdocs_puml.config import MetricsFormat
+from mkdocs_puml.files import atomic_write
+from mkdocs_puml.report import BuildReport
+
+# Upper bounds of histogram buckets in seconds
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+HOOK_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+_PREFIX = "mkdocs_puml"
+
+
+class Histogram:
+    """Cumulative histogram of observed values
+
+    Args:
+        buckets (tuple[float, ...]): upper bounds of the buckets in ascending order
+    """
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+
+    def samples(self, labels: dict[str, str]) -> list[tuple[str, dict[str, str], float]]:
+        """Samples of the histogram as ``(suffix, labels, value)``"""
+        result = [
+            ("_bucket", {**labels, "le": _format_value(bound)}, count)
+            for bound, count in zip(self.buckets, self.counts)
+        ]
+        result.append(("_bucket", {**labels, "le": "+Inf"}, self.count))
+        result.append(("_count", labels, self.count))
+        result.append(("_sum", labels, self.sum))
+        return result
+
+
+class BuildMetrics:
+    """`BuildMetrics` exports render and cache metrics of a build into a textfile
+    that node-exporter or another Prometheus agent picks up.
+
+    The file describes the last build, so counters start from zero in each build.
+    The time spent in the hooks of the plugin is observed while the build runs,
+    the rest is taken from the build report when the file is written.
+
+    Args:
+        format (str): ``openmetrics`` or ``prometheus`` text format
+
+    Examples:
+        Use this class as::
+
+            metrics = BuildMetrics()
+            metrics.observe_hook("on_env", 1.5)
+            metrics.write(Path("site/mkdocs_puml.prom"), report, storage.disk_size())
+    """
+
+    def __init__(self, format: str = MetricsFormat.OPENMETRICS.value):
+        self.format = format
+        self.hooks: dict[str, Histogram] = {}
+
+    def observe_hook(self, hook: str, seconds: float):
+        """Observe the time spent in a hook of the plugin"""
+        if hook not in self.hooks:
+            self.hooks[hook] = Histogram(HOOK_BUCKETS)
+        self.hooks[hook].observe(seconds)
+
+    def render(self, report: BuildReport, cache_size: int) -> str:
+        """Render the metrics in the text format
+
+        Args:
+            report (BuildReport): collected report of the build
+            cache_size (int): size of the cache files in bytes
+
+        Returns:
+            str: content of the textfile
+        """
+        records = list(report.records.values())
+
+        statuses: dict[str, int] = {}
+        fallbacks: dict[str, int] = {}
+        latency = Histogram(LATENCY_BUCKETS)
+        for r in records:
+            statuses[r.status] = statuses.get(r.status, 0) + 1
+            if r.error_code is not None:
+                code = str(r.error_code)
+                fallbacks[code] = fallbacks.get(code, 0) + 1
+            if not r.cache_hit and r.latency > 0:
+                latency.observe(r.latency)
+        hits = sum(1 for r in records if r.cache_hit)
+
+        lines: list[str] = []
+        self._counter(
+            lines, "diagrams", "Diagrams of the build by status",
+            [({"status": k}, v) for k, v in sorted(statuses.items())],
+        )
+        self._counter(lines, "cache_hits", "Diagrams taken from the cache", [({}, hits)])
+        self._counter(lines, "cache_misses", "Diagrams not found in the cache", [({}, len(records) - hits)])
+        self._counter(
+            lines, "fallbacks", "Diagrams that failed to render by status code",
+            [({"status_code": k}, v) for k, v in sorted(fallbacks.items())],
+        )
+        self._counter(lines, "retries", "Repeated requests", [({}, sum(r.retries for r in records))])
+        self._counter(
+            lines, "downloaded_bytes", "Bytes received from the renderer",
+            [({}, sum(r.response_bytes for r in records))], unit="bytes",
+        )
+        self._family(
+            lines, "render_latency_seconds", "histogram", "Time spent waiting for the renderer per diagram",
+            latency.samples({}), unit="seconds",
+        )
+        self._family(
+            lines, "hook_duration_seconds", "histogram", "Time spent in the hooks of the plugin",
+            [s for hook, h in sorted(self.hooks.items()) for s in h.samples({"hook": hook})], unit="seconds",
+        )
+        self._family(
+            lines, "cache_size_bytes", "gauge", "Size of the cache files",
+            [("", {}, cache_size)], unit="bytes",
+        )
+        self._family(
+            lines, "last_build_timestamp_seconds", "gauge", "Time when the build finished",
+            [("", {}, time.time())], unit="seconds",
+        )
+
+        if self.format == MetricsFormat.OPENMETRICS.value:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: Path, report: BuildReport, cache_size: int):
+        """Write the metrics to a file atomically, so a scraper never reads a partial file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path) as f:
+            f.write(self.render(report, cache_size).encode("utf-8"))
+
+    def _counter(
+        self,
+        lines: list[str],
+        name: str,
+        help: str,
+        values: list[tuple[dict[str, str], float]],
+        unit: typing.Optional[str] = None,
+    ):
+        self._family(lines, name, "counter", help, [("_total", labels, v) for labels, v in values], unit)
+
+    def _family(
+        self,
+        lines: list[str],
+        name: str,
+        type: str,
+        help: str,
+        samples: list[tuple[str, dict[str, str], float]],
+        unit: typing.Optional[str] = None,
+    ):
+        """Append a metric family. Names of counters in the metadata of OpenMetrics
+        don't have ``_total`` suffix, while Prometheus format keeps it
+        """
+        name = f"{_PREFIX}_{name}"
+        meta_name = name
+        if type == "counter" and self.format == MetricsFormat.PROMETHEUS.value:
+            meta_name = f"{name}_total"
+
+        lines.append(f"# HELP {meta_name} {help}")
+        lines.append(f"# TYPE {meta_name} {type}")
+        if unit is not None and self.format == MetricsFormat.OPENMETRICS.value:
+            lines.append(f"# UNIT {meta_name} {unit}")
+        for suffix, labels, value in samples:
+            lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        k + '="' + v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+        for k, v in labels.items()
+    )
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
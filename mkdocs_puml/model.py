@@ -15,6 +15,7 @@ class Diagram:
     scheme: str
     mode: ThemeMode
     diagram: Optional[typing.Union[str, Fallback]] = None
+    last_seen: Optional[int] = None
 
 
 @dataclass
@@ -0,0 +1,260 @@
+"""Colour palettes that convert light diagrams into dark ones.
+
+A palette maps colours of a light theme to the colours of the paired dark
+theme. It is generated from the ``.puml`` files of both themes: each style
+property is resolved to a colour in both files, and the light colour of a
+property maps to its dark colour. A colour that maps to several dark colours
+takes the one of the least nested property, then the most frequent one.
+
+PlantUML draws the elements a theme doesn't style with its own black, grey and
+white colours. Unless the light theme uses them on the top level, they map to
+the font, line and background colours of the dark theme.
+
+The table of palettes shipped with the package is regenerated with::
+
+    python -m mkdocs_puml.palette themes/ mkdocs_puml/palettes.json
+"""
+import json
+from pathlib import Path
+import re
+import sys
+import typing
+
+PALETTES_PATH = Path(__file__).parent.joinpath("palettes.json")
+
+# Pairs of themes documented in `docs/themes`
+THEME_PAIRS = [
+    ("default/light", "default/dark"),
+    ("nord/day", "nord/night"),
+    ("kanagawa/fuji", "kanagawa/wave"),
+    *(
+        (f"catppuccin/{light}", f"catppuccin/{dark}")
+        for light in ("latte", "latte-white")
+        for dark in ("frappe", "macchiato", "mocha")
+    ),
+    *(
+        (f"material/{color}-light", f"material/{color}-dark")
+        for color in (
+            "amber", "blue", "blue-grey", "brown", "cyan", "deep-orange", "deep-purple",
+            "green", "grey", "indigo", "light-blue", "light-green", "lime", "orange",
+            "pink", "purple", "red", "teal", "yellow",
+        )
+    ),
+]
+
+_property_regex = re.compile(r"(--[\w-]+|[\w-]+)\s*:?\s*(.*?)\s*;?$")
+_var_regex = re.compile(r"^var\((--[\w-]+)\)$")
+_hex_regex = re.compile(r"^#([0-9a-fA-F]{1,2}|[0-9a-fA-F]{3}|[0-9a-fA-F]{6}|[0-9a-fA-F]{8})$")
+# Colours in attribute values and inline styles of SVG, e.g. fill="#181818" or style="stroke:#181818;"
+_svg_color_regex = re.compile(r"""(?<=["':])#([0-9a-fA-F]{6})([0-9a-fA-F]{2})?(?![0-9a-fA-F])""")
+
+# Colours set in the source of a diagram, e.g. `class Foo #Red` or `#e2e2f0`
+_scheme_color_regex = re.compile(r"#([0-9a-fA-F]{1,8}|[a-zA-Z]+)\b")
+
+# Colours of PlantUML for the elements that a theme doesn't style,
+# mapped to the property of `root` with the same role
+_builtin_colors = {
+    "#000000": "fontcolor",
+    "#181818": "linecolor",
+    "#ffffff": "backgroundcolor",
+}
+
+# Colour names used by the themes
+_named_colors = {
+    "black": "#000000",
+    "white": "#ffffff",
+    "red": "#ff0000",
+    "green": "#008000",
+    "blue": "#0000ff",
+    "yellow": "#ffff00",
+    "gray": "#808080",
+    "grey": "#808080",
+}
+
+
+def normalize(color: str) -> typing.Optional[str]:
+    """Return RGB part of a colour as ``#rrggbb`` in lower case,
+    or ``None`` if the value is not a colour.
+
+    PlantUML shortcuts of grey colours such as ``#8`` or ``#e0`` are expanded.
+    """
+    if color.lower() in _named_colors:
+        return _named_colors[color.lower()]
+
+    m = _hex_regex.match(color)
+    if m is None:
+        return None
+    digits = m.group(1).lower()
+    if len(digits) <= 2:
+        digits = (digits * 6)[:6] if len(digits) == 1 else digits * 3
+    elif len(digits) == 3:
+        digits = "".join(c * 2 for c in digits)
+    return f"#{digits[:6]}"
+
+
+def resolve_colors(theme: str) -> dict[str, str]:
+    """Resolve colours of all style properties of a theme file.
+
+    Args:
+        theme (str): content of a ``.puml`` theme file
+
+    Returns:
+        dict[str, str]: path of a property (selectors joined with ``/``)
+                        mapped to its ``#rrggbb`` colour
+    """
+    variables: dict[str, str] = {}
+    colors: dict[str, str] = {}
+    selectors: list[str] = []
+
+    for line in theme.splitlines():
+        line = line.strip()
+        if not line or line.startswith(("'", "<")):
+            continue
+        if line.endswith("{"):
+            selectors.append(line[:-1].strip())
+            continue
+        if line == "}":
+            if selectors:
+                selectors.pop()
+            continue
+
+        m = _property_regex.match(line)
+        if m is None:
+            continue
+        name, value = m.groups()
+
+        var = _var_regex.match(value)
+        color = variables.get(var.group(1)) if var else normalize(value)
+        if color is None:
+            continue
+
+        # Variables are the raw palette of a theme, only the properties
+        # show how the colours are used
+        if name.startswith("--"):
+            variables[name] = color
+        else:
+            colors["/".join([*selectors, name.lower()])] = color
+    return colors
+
+
+def build_palette(light: str, dark: str) -> dict[str, str]:
+    """Build a palette that maps colours of a light theme to the dark one.
+
+    Args:
+        light (str): content of the light theme file
+        dark (str): content of the dark theme file
+
+    Returns:
+        dict[str, str]: ``#rrggbb`` light colour mapped to ``#rrggbb`` dark colour
+    """
+    light_colors = resolve_colors(light)
+    dark_colors = resolve_colors(dark)
+
+    # Light colour -> dark colour -> (depth of the least nested property, number of properties)
+    candidates: dict[str, dict[str, tuple[int, int]]] = {}
+    for key, color in light_colors.items():
+        if key not in dark_colors:
+            continue
+        options = candidates.setdefault(color, {})
+        depth, count = options.get(dark_colors[key], (key.count("/"), 0))
+        options[dark_colors[key]] = (min(depth, key.count("/")), count + 1)
+
+    palette = {
+        color: min(options.items(), key=lambda o: (o[1][0], -o[1][1], o[0]))[0]
+        for color, options in sorted(candidates.items())
+    }
+
+    top_level = {color for key, color in light_colors.items() if key.count("/") == 1}
+    for color, name in _builtin_colors.items():
+        if color not in top_level and f"root/{name}" in dark_colors:
+            palette[color] = dark_colors[f"root/{name}"]
+    return palette
+
+
+def load_palette(light: str, dark: str) -> typing.Optional[dict[str, str]]:
+    """Load the shipped palette for a pair of themes.
+
+    Args:
+        light (str): name of the light theme, e.g. ``default/light``
+        dark (str): name of the dark theme, e.g. ``default/dark``
+
+    Returns:
+        dict[str, str] | None: the palette or ``None`` if the pair is not supported
+    """
+    with open(PALETTES_PATH, encoding="utf-8") as f:
+        return json.load(f).get(f"{light}:{dark}")
+
+
+def recolor(svg: str, palette: dict[str, str]) -> typing.Optional[str]:
+    """Replace colours of a light SVG diagram with the colours of the palette.
+    The alpha channel of a colour is kept as is.
+
+    Args:
+        svg (str): SVG image rendered with the light theme
+        palette (dict[str, str]): palette created by ``build_palette``
+
+    Returns:
+        str | None: dark SVG image or ``None`` if the image contains
+                    a colour the palette doesn't know, e.g. one set
+                    in the diagram itself
+    """
+    unknown = False
+
+    def _replace(m: re.Match) -> str:
+        nonlocal unknown
+        dark = palette.get(f"#{m.group(1).lower()}")
+        if dark is None:
+            unknown = True
+            return m.group(0)
+        return dark + (m.group(2) or "")
+
+    result = _svg_color_regex.sub(_replace, svg)
+    return None if unknown else result
+
+
+def can_recolor(scheme: str, palette: dict[str, str]) -> bool:
+    """Check by the source of a diagram whether its light image can be recolored.
+
+    Styles and colours set in the diagram itself stay in the light image,
+    so the dark diagram is rendered by the server together with the light one
+    instead of waiting for it.
+
+    Args:
+        scheme (str): PlantUML diagram without the theme
+        palette (dict[str, str]): palette created by ``build_palette``
+
+    Returns:
+        bool: ``False`` if the diagram sets styles or colours the palette doesn't know
+    """
+    lowered = scheme.lower()
+    if "skinparam" in lowered or "<style>" in lowered or "!theme" in lowered:
+        return False
+    return all(
+        (normalize(f"#{m.group(1)}") or normalize(m.group(1))) in palette
+        for m in _scheme_color_regex.finditer(scheme)
+    )
+
+
+def generate(themes_dir: Path) -> dict[str, dict[str, str]]:
+    """Generate palettes for all supported pairs of themes
+
+    Args:
+        themes_dir (Path): directory with ``.puml`` theme files
+
+    Returns:
+        dict[str, dict[str, str]]: palettes with ``light:dark`` keys
+    """
+    def _read(name: str) -> str:
+        return themes_dir.joinpath(f"{name}.puml").read_text(encoding="utf-8")
+
+    return {
+        f"{light}:{dark}": build_palette(_read(light), _read(dark))
+        for light, dark in THEME_PAIRS
+    }
+
+
+if __name__ == "__main__":  # pragma: no cover
+    palettes = generate(Path(sys.argv[1]))
+    with open(sys.argv[2], "w", encoding="utf-8") as f:
+        json.dump(palettes, f, indent=1, sort_keys=True)
+        f.write("\n")
@@ -1,19 +1,34 @@
+import logging
 from pathlib import Path
 import typing
 import re
 import os
 import shutil
-
-from rich.console import Console
+import time
 
 from mkdocs.config.defaults import MkDocsConfig
+from mkdocs.exceptions import PluginError
 from mkdocs.plugins import BasePlugin
+from mkdocs.utils import get_relative_url
 
-from mkdocs_puml.config import PlantUMLConfig
+from mkdocs_puml.config import OutputMode, PlantUMLConfig, RenderMode
+from mkdocs_puml.include import Includer
+from mkdocs_puml.metrics import BuildMetrics
 from mkdocs_puml.model import Count, Diagram, ThemeMode
+from mkdocs_puml.palette import can_recolor, load_palette, recolor
+from mkdocs_puml.profiling import PROFILE_ENV, Profiler, hook, profiled, span
 from mkdocs_puml.storage import AbstractStorage, build_storage
-from mkdocs_puml.puml import Fallback, PlantUML
-from mkdocs_puml.theme import Theme
+from mkdocs_puml.puml import AbstractRenderer, Fallback, PlantUML
+from mkdocs_puml.renderers import load_renderer
+from mkdocs_puml.report import BuildReport
+from mkdocs_puml.streaming import StreamingRenderer
+from mkdocs_puml.theme import THEMES_DIR, Theme
+from mkdocs_puml.utils import QuietConsole, build_console, format_size
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from rich.console import Console
+
+logger = logging.getLogger("mkdocs.plugins.plantuml")
 
 
 class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
@@ -35,10 +50,12 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         container (str): html element where the diagrams will be inserted.
                          **DO NOT** insert any `\n` characters, as the Markdown parser will convert them into
                          `<p>...</p>`, which may result in an unexpected html
+        assets_dir (str): directory in `site_dir` where static files and external diagrams are written
     """
 
     pre_class_name = "diagram-key"
     container = "<div class='puml-container'>{}</div>"
+    assets_dir = "assets/mkdocs_puml/"
 
     def __init__(self):
         self.regex: typing.Optional[typing.Any] = None
@@ -46,18 +63,45 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
             rf'<pre class="{self.pre_class_name}">(.+?)</pre>', flags=re.DOTALL
         )
 
-        self.puml: typing.Optional[PlantUML] = None
+        self.puml: typing.Optional[AbstractRenderer] = None
         self.themer: typing.Optional[Theme] = None
+        self.includer: typing.Optional[Includer] = None
+        self.docs_dir = Path(".")
         self.storage: typing.Optional[AbstractStorage] = None
-        self.console: typing.Optional[Console] = None
+        self.streamer: typing.Optional[StreamingRenderer] = None
+
+        # palette to derive dark diagrams from the light ones and
+        # the keys of such dark diagrams mapped to the keys of light ones
+        self.palette: typing.Optional[dict[str, str]] = None
+        self.derived: dict[str, str] = {}
+
+        # keys of the diagrams referenced as external files
+        self.external: set[str] = set()
+        self.report: typing.Optional[BuildReport] = None
+        self.report_path: typing.Optional[Path] = None
+        self.metrics: typing.Optional[BuildMetrics] = None
+        self.metrics_path: typing.Optional[Path] = None
+        self.profiler: typing.Optional[Profiler] = None
+        self.console: typing.Optional[typing.Union["Console", QuietConsole]] = None
 
     def on_config(self, config: MkDocsConfig) -> MkDocsConfig:
         """Event that is fired by mkdocs when configs are created.
 
-        All required classes such as PlantUML, Theme, or any class for storage
-        are initialized in this method.
+        All required classes such as the renderer selected by `renderer` config, Theme,
+        or any class for storage are initialized in this method.
         Also, `puml.css` file that enable dark / light mode styles is added to `extra_css`.
 
+        When `streaming` is enabled, a background renderer is started here, so the
+        diagrams are sent to PlantUML server as soon as they are found on a page.
+
+        When `theme.recolor` is enabled, the palette of the theme pair is loaded here.
+        When `theme.inline` is enabled, the theme files must exist in the local directory
+        of themes, otherwise `PluginError` is raised.
+
+        When `report` or `metrics` is enabled, the renderer starts measuring each diagram.
+        When `profile` is enabled, or `MKDOCS_PUML_PROFILE` environment variable is set
+        to a directory, this hook and the following ones are profiled.
+
         Args:
             config: Full mkdocs.yml config file. To access configs of PlantUMLPlugin only,
                     use self.config attribute.
@@ -65,6 +109,14 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         Returns:
             Full config of the mkdocs
         """
+        config_dir = Path(config.get("config_file_path") or "mkdocs.yml").parent
+        # The profiler is created by this hook, so the hook is profiled here rather than by `profiled`
+        self.profiler = self._build_profiler(config_dir)
+        with hook(self.profiler, "on_config"):
+            return self._configure(config, config_dir)
+
+    def _configure(self, config: MkDocsConfig, config_dir: Path) -> MkDocsConfig:
+        """Initialize the components of the plugin for a build, see `on_config`"""
         config["extra_css"].append("assets/mkdocs_puml/puml.css")
         config["extra_javascript"].append("assets/mkdocs_puml/puml.js")
 
@@ -77,36 +129,103 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
                 ]
             )
 
-        self.console = Console(quiet=not self.config.verbose)
-        self.puml = PlantUML(
-            self.config.puml_url,
-            verify_ssl=self.config.verify_ssl,
-            timeout=self.config.request_timeout
-        )
+        self.console = build_console(self.config.verbose)
+        if self.puml is not None:
+            self.puml.close()
+        renderer = load_renderer(self.config.renderer)
+        if renderer is None:
+            raise PluginError(f"Renderer {self.config.renderer} is not found")
+        self.puml = renderer.from_config(self.config)
         self.puml_keyword = self.config.puml_keyword
         self.regex = re.compile(rf"```{self.puml_keyword}(\n.+?)```", flags=re.DOTALL)
 
-        if self.config.theme.enabled:
-            self.themer = Theme(self.config.theme.url)
+        # Local files are read once per build
+        self.includer = Includer()
+        self.docs_dir = Path(config.get("docs_dir") or ".")
 
+        if self.config.theme.enabled:
             self.theme_light = self.config.theme.light
             self.theme_dark = self.config.theme.dark
+
+            themes_dir = None
+            if self.config.theme.inline:
+                if self.config.client_render:
+                    # The browser would request the inlined theme with every diagram URL
+                    raise PluginError("client_render can't be used with theme.inline")
+                themes_dir = Path(self.config.theme.path).expanduser() if self.config.theme.path else THEMES_DIR
+                for name in (self.theme_light, self.theme_dark):
+                    if not themes_dir.joinpath(f"{name}.puml").is_file():
+                        raise PluginError(f"Theme file {name}.puml is not found in {themes_dir}")
+
+            self.themer = Theme(self.config.theme.url, path=themes_dir, includer=self.includer)
+
+            self.palette = None
+            if self.config.theme.recolor:
+                self.palette = load_palette(self.theme_light, self.theme_dark)
+                if self.palette is None:
+                    logger.warning(
+                        f"Themes {self.theme_light} and {self.theme_dark} can't be recolored locally."
+                        " Dark diagrams are rendered by PlantUML server"
+                    )
         else:
             self.themer = None
             self.theme_light = None
             self.theme_dark = None
+            self.palette = None
+
+        self.derived = {}
+        if self.storage is not None:
+            self.storage.close()
+        with span(self.profiler, "storage.load"):
+            self.storage = build_storage(self.config.cache)
+        self.external = set()
+
+        # Metrics are calculated from the measurements of the build report
+        if self.config.report.enabled or self.config.metrics.enabled:
+            self.report = BuildReport()
+            self.puml.stats = self.report.stats
+        else:
+            self.report = None
+        self.metrics = BuildMetrics(self.config.metrics.format) if self.config.metrics.enabled else None
+
+        self.report_path = self._output_path(config_dir, self.config.report.path)
+        # The textfile is kept out of `site_dir`, so it's never deployed with the site
+        cache_path = getattr(self.storage, "path", None)
+        metrics_dir = cache_path.parent if cache_path is not None else config_dir
+        self.metrics_path = self._output_path(config_dir, self.config.metrics.path) or metrics_dir.joinpath(
+            "mkdocs_puml.prom"
+        )
 
-        self.storage = build_storage(self.config.cache)
+        # Retries are limited for the whole build, across all rounds of requests
+        if isinstance(self.puml, PlantUML):
+            self.puml.budget = self.puml.retry.new_budget()
+
+        if self.streamer is not None:
+            self.streamer.close()
+        # Nothing is sent to the server in offline mode. Streaming
+        # works only with the renderers that talk to a PlantUML server
+        online = self.config.mode == RenderMode.ONLINE.value
+        if self.config.streaming and online and isinstance(self.puml, PlantUML):
+            self.streamer = StreamingRenderer(self.puml)
+        else:
+            self.streamer = None
+        self.deadline: typing.Optional[float] = None
 
         return config
 
+    @profiled
     def on_page_markdown(self, markdown: str, *args, **kwargs) -> str:
         """Event to fire for each .md page.
 
         Here, all ``puml`` code blocks are found and added to a storage.
 
         Then, <pre class="...">{key of diagram}</pre> tags are added to
-        the markdown page.
+        the markdown page. All code blocks are substituted in a single pass.
+
+        When `inline_includes` is enabled, local files included by a diagram are
+        resolved relative to the directory of the page.
+
+        When `report` is enabled, each diagram is recorded with the page it's found on.
 
         Args:
             markdown: Markdown page in which to look for PlantUML diagrams.
@@ -114,32 +233,44 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         Returns:
             Updated markdown page
         """
+        start = time.perf_counter()
         with self.console.status(
             "[bold dim cyan]Search puml in markdown",
             spinner="dots2",
             spinner_style="magenta",
         ):
-            schemes = self.regex.findall(markdown)
+            page = kwargs.get("page")
+            if page is not None and page.file.abs_src_path:
+                base_dir = Path(page.file.abs_src_path).parent
+            else:
+                base_dir = self.docs_dir
+            src_uri = page.file.src_uri if page is not None else None
+            markdown = self.regex.sub(lambda m: self._store(m, base_dir, src_uri), markdown)
+
+        self._observe("on_page_markdown", start)
+        return markdown
 
-            # DO NOT insert `\n` characters in the replacement!
-            for v in schemes:
-                if self.themer:
-                    replace_into = self.container.format(self._store_dual(v))
-                else:
-                    replace_into = self.container.format(self._store_single(v))
-                markdown = markdown.replace(
-                    f"```{self.puml_keyword}{v}```",
-                    replace_into,
-                )
+    def _store(self, match: re.Match, base_dir: Path, page: typing.Optional[str] = None) -> str:
+        """Store the diagram of a matched code block and return
+        the container with the diagram keys
+        """
+        v = match.group(1)
+        if self.config.inline_includes:
+            v = self.includer.resolve(v, base_dir)
 
-        return markdown
+        # DO NOT insert `\n` characters in the replacement!
+        if self.themer:
+            return self.container.format(self._store_dual(v, page))
+        return self.container.format(self._store_single(v, page))
 
-    def _store_single(self, scheme: str) -> str:
+    def _store_single(self, scheme: str, page: typing.Optional[str] = None) -> str:
         d = Diagram(scheme, mode=ThemeMode.LIGHT)
         key = self.storage.add(d)
+        self._record(key, d.mode, page)
+        self._submit(key)
         return f'<pre class="{self.pre_class_name}">{key}</pre>'
 
-    def _store_dual(self, scheme: str) -> str:
+    def _store_dual(self, scheme: str, page: typing.Optional[str] = None) -> str:
         d_light = Diagram(
             self.themer.include(self.config.theme.light, scheme), mode=ThemeMode.LIGHT
         )
@@ -149,23 +280,60 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
 
         key_light = self.storage.add(d_light)
         key_dark = self.storage.add(d_dark)
+        self._record(key_light, d_light.mode, page)
+        self._record(key_dark, d_dark.mode, page)
+        self._submit(key_light)
+        if self.palette is not None and can_recolor(scheme, self.palette):
+            self.derived[key_dark] = key_light
+        else:
+            self._submit(key_dark)
 
         return (
             f'<pre class="{self.pre_class_name}">{key_light}</pre>'
             f'<pre class="{self.pre_class_name}">{key_dark}</pre>'
         )
 
+    def _record(self, key: str, mode: str, page: typing.Optional[str]):
+        """Add a diagram to the build report if it's enabled"""
+        if self.report is not None:
+            self.report.add(key, mode, page, cache_hit=self.storage.is_rendered(key))
+
+    def _submit(self, key: str):
+        """Start rendering a diagram in the background if
+        streaming is enabled and the diagram is not cached
+        """
+        if self.streamer is None:
+            return
+
+        # A cached image is not read, e.g. from the memory-mapped file
+        if not self.storage.is_rendered(key):
+            self.streamer.submit(key, self.storage[key].scheme)
+
+    @profiled
     def on_env(self, env, *args, **kwargs):
         """The event is fired when jinja environment is configured.
         Such as it is fired once when all .md pages are processed,
         we can use it to request PlantUML service and convert the
         diagrams.
 
+        In streaming mode, most of the diagrams are already rendered
+        at this point, so it only waits for the ones still in flight.
+
+        With `theme.recolor`, dark diagrams are derived from the rendered light ones.
+        Dark diagrams that set their own colours, or whose cached light version
+        can't be recolored, are sent to the server together with the light ones.
+        The rest wait for their light diagrams and are sent only if recoloring fails.
+
+        In `offline` mode, only the cached diagrams are used. The diagrams
+        that are not cached, or not rendered before `deadline`, are deferred:
+        they are replaced with placeholders and rendered by the next build.
+
         Args:
             env: jinja environment
         Returns:
             Jinja environment
         """
+        start = time.perf_counter()
         with self.console.status(
             "[bold dim cyan]Building PlantUML diagrams",
             spinner="dots2",
@@ -173,17 +341,88 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         ):
             to_request = self.storage.schemes()
             to_req_count = self.storage.count()
-            svgs = self.puml.translate(to_request.values())
-            self.storage.update(zip(to_request.keys(), svgs))
+            self.deadline = time.monotonic() + self.config.deadline if self.config.deadline > 0 else None
+            derived = {k: self.derived[k] for k in to_request if k in self.derived}
+            for k in derived:
+                del to_request[k]
+            # Cached light diagrams are recolored right away, so the dark ones
+            # that can't be recolored are requested together with the rest
+            cached = {k: v for k, v in derived.items() if self.storage.is_rendered(v)}
+            to_request.update(self._derive(cached))
+            derived = {k: v for k, v in derived.items() if k not in cached}
+
+            svgs = self._translate(to_request)
+            self.storage.update((k, v) for k, v in zip(to_request.keys(), svgs) if v is not None)
+
+            if derived:
+                to_request = self._derive(derived)
+                rest = self._translate(to_request)
+                self.storage.update((k, v) for k, v in zip(to_request.keys(), rest) if v is not None)
+                svgs.extend(rest)
+
+            if self.streamer is not None:
+                self.streamer.close()
+                self.streamer = None
+            self.puml.close()
 
             fallback_count = len([True for v in svgs if isinstance(v, Fallback)])
 
-        self.console.print(self._prepare_status_message(fallback_count, to_req_count))
+            deferred = self.storage.count()
+            built_count = Count(to_req_count.light - deferred.light, to_req_count.dark - deferred.dark)
+
+        self.console.print(
+            self._prepare_status_message(
+                fallback_count, built_count, deferred.light + deferred.dark, self.storage.duplicates
+            )
+        )
+        self._observe("on_env", start)
         return env
 
+    def _translate(self, schemes: dict[str, str]) -> list[typing.Optional[typing.Union[str, Fallback]]]:
+        """Render diagrams with the background renderer or PlantUML converter.
+        The diagrams that are not rendered because of offline mode or deadline are ``None``
+        """
+        if not schemes:
+            return []
+        if self.config.mode == RenderMode.OFFLINE.value:
+            return [None] * len(schemes)
+
+        timeout = None if self.deadline is None else max(self.deadline - time.monotonic(), 0)
+        with span(self.profiler, "translate"):
+            if self.streamer is not None:
+                return self.streamer.translate(schemes, timeout)
+            return self.puml.translate(schemes.values(), timeout)
+
+    def _derive(self, derived: dict[str, str]) -> dict[str, str]:
+        """Recolor light diagrams into the dark ones and store them.
+
+        Args:
+            derived (dict[str, str]): keys of dark diagrams mapped to the keys of light diagrams
+
+        Returns:
+            dict[str, str]: schemes of the dark diagrams that couldn't be recolored
+        """
+        rest = {}
+        with span(self.profiler, "recolor"):
+            for key_dark, key_light in derived.items():
+                light = self.storage[key_light].diagram
+                svg = recolor(light, self.palette) if isinstance(light, str) else None
+                if svg is None:
+                    rest[key_dark] = self.storage[key_dark].scheme
+                else:
+                    self.storage.update([(key_dark, svg)])
+        return rest
+
+    @profiled
     def on_post_page(self, output: str, page, *args, **kwargs) -> str:
         """The event is fired after HTML page is rendered.
-        Here, we substitute <pre> tags with the corresponding SVG images.
+        Here, we substitute <pre> tags with the corresponding SVG images
+        in a single pass over the page.
+
+        When `output` is `external`, the images are referenced by `<img>` tags
+        and written to files in `on_post_build`. When `output` is `lazy`, empty
+        placeholders are inserted instead, and `puml.js` loads the images once
+        they become visible.
 
         Args:
             output: rendered HTML in str format
@@ -192,27 +431,33 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         Returns:
             HTML page containing SVG diagrams
         """
-        schemes = self.uuid_regex.findall(output)
-        for v in schemes:
-            output = self._replace(v, output)
+        start = time.perf_counter()
+        output, count = self.uuid_regex.subn(lambda m: self._replace(m, page), output)
+        if count:
             page.content = output
 
+        self._observe("on_post_page", start)
         return output
 
+    @profiled
     def on_post_build(self, config):
         """Event triggered after the build process is complete.
 
-        This method copies static assets of the plugin and saves
-        the diagrams to the storage.
+        This method copies static assets of the plugin, writes external
+        diagrams, the build report and metrics, and saves the diagrams to the storage. Diagrams that were not seen in
+        the docs for longer than `cache.max_age` days are pruned, and
+        the least recently seen ones are evicted if the cache is over its size limits.
+        The storage is closed at the end.
 
         Args:
             config (dict): The MkDocs configuration object.
 
         """
+        start = time.perf_counter()
         # Path to the static directory in the plugin
         static_dir = Path(__file__).parent.joinpath("static")
         # Destination directory in the site output
-        dest_dir = Path(config["site_dir"]).joinpath("assets/mkdocs_puml/")
+        dest_dir = Path(config["site_dir"]).joinpath(self.assets_dir)
 
         if not dest_dir.exists():
             os.makedirs(dest_dir)
@@ -221,33 +466,143 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         # shutil.copy(puml_js, dest_dir)
         shutil.copytree(static_dir, dest_dir, dirs_exist_ok=True)
 
-        self.storage.save()
+        # Diagrams are content-addressed, so an existing file is up to date
+        for key in self.external:
+            path = dest_dir.joinpath(f"{key}.svg")
+            if not path.exists():
+                path.write_text(self.storage[key].diagram, encoding="utf-8")
+
+        if self.report is not None:
+            self.report.collect(self.storage, self.derived)
+        if self.config.report.enabled:
+            self.report.write(self.report_path or Path(config["site_dir"]).joinpath("mkdocs_puml_report.json"))
+            self._print_report()
+
+        if self.config.cache.max_age > 0:
+            self.storage.prune(self.config.cache.max_age * 24 * 60 * 60)
+        with span(self.profiler, "storage.save"):
+            self.storage.save()
+
+        if self.storage.evicted_bytes:
+            self.console.print(
+                "[dim][bold magenta]mkdocs_puml[/bold magenta]: "
+                f"Evicted {format_size(self.storage.evicted_bytes)} from cache[/dim]"
+            )
+
+        if self.metrics is not None:
+            self._observe("on_post_build", start)
+            self.metrics.write(
+                self.metrics_path,
+                self.report,
+                self.storage.disk_size(),
+            )
+        self.storage.close()
 
-    def _replace(self, key: str, content: str) -> str:
-        """Replace a key of a diagram with a diagram svg in a
-        content
+    def on_build_error(self, error, **kwargs):
+        """Stop the background renderer and release the resources of the renderer
+        and the storage if the build failed before the diagrams were saved
+        """
+        if self.streamer is not None:
+            self.streamer.close()
+            self.streamer = None
+        if self.puml is not None:
+            self.puml.close()
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    def _replace(self, match: re.Match, page) -> str:
+        """Return a diagram svg to replace the matched
+        <pre> tag containing a key of the diagram
         """
+        key = match.group(1)
         diagram = self.storage[key]
 
         # When theming is not enabled, user will manually manage themes in each diagram.
         # Also, only one version of diagram will be generated for each scheme, which
         # should be displayed always despite the light / dark mode of mkdocs-material.
         style = "display: block" if not self.config.theme.enabled else ""
-        replacement = (
-            f'<div class="puml {diagram.mode}" style="{style}">{diagram.diagram}</div>'
-        )
-        return content.replace(
-            f'<pre class="{self.pre_class_name}">{key}</pre>', replacement
-        )
+        if diagram.diagram is None:
+            return f'<div class="puml {diagram.mode}" style="{style}">{self._placeholder(diagram)}</div>'
+        if self.config.output == OutputMode.INLINE.value or not isinstance(diagram.diagram, str):
+            return f'<div class="puml {diagram.mode}" style="{style}">{diagram.diagram}</div>'
+
+        self.external.add(key)
+        src = get_relative_url(f"{self.assets_dir}{key}.svg", page.url)
+
+        # puml.js loads the diagram when the placeholder becomes visible
+        if self.config.output == OutputMode.LAZY.value:
+            return f'<div class="puml {diagram.mode}" style="{style}" data-puml-src="{src}"></div>'
+
+        content = f'<img class="diagram" src="{src}" alt="" loading="lazy">'
+        return f'<div class="puml {diagram.mode}" style="{style}">{content}</div>'
+
+    def _observe(self, hook: str, start: float):
+        """Observe the time spent in a hook if metrics are enabled"""
+        if self.metrics is not None:
+            self.metrics.observe_hook(hook, time.perf_counter() - start)
+
+    def _build_profiler(self, config_dir: Path) -> typing.Optional[Profiler]:
+        """Build the profiler if `MKDOCS_PUML_PROFILE` environment variable is set or `profile` is enabled"""
+        profile_dir = os.environ.get(PROFILE_ENV)
+        if profile_dir:
+            return Profiler(Path(profile_dir))
+        if self.config.profile.enabled:
+            return Profiler(
+                self._output_path(config_dir, self.config.profile.path) or config_dir.joinpath("mkdocs_puml_profile")
+            )
+        return None
+
+    @staticmethod
+    def _output_path(config_dir: Path, path: str) -> typing.Optional[Path]:
+        """Resolve a configured output path against the directory of `mkdocs.yml`"""
+        if not path:
+            return None
+        return config_dir.joinpath(Path(path).expanduser())
+
+    def _print_report(self):
+        """Print the slowest and the largest diagrams of the build report"""
+        top = self.config.report.top
+        if top <= 0:
+            return
+
+        slowest = self.report.slowest(top)
+        if slowest:
+            self.console.print("[dim][bold magenta]mkdocs_puml[/bold magenta]: Slowest diagrams[/dim]")
+            for r in slowest:
+                self.console.print(
+                    f"[dim]  {r.total_time:8.3f} s  {r.key[:12]}  {', '.join(r.pages)}"
+                    f"  (latency {r.latency:.3f} s, retries {r.retries})[/dim]"
+                )
+
+        largest = self.report.largest(top)
+        if largest:
+            self.console.print("[dim][bold magenta]mkdocs_puml[/bold magenta]: Largest diagrams[/dim]")
+            for r in largest:
+                self.console.print(f"[dim]  {format_size(r.size):>9}  {r.key[:12]}  {', '.join(r.pages)}[/dim]")
+
+    def _placeholder(self, diagram: Diagram) -> str:
+        """Return the content that stands in for a deferred diagram.
+        With `client_render`, the browser requests the image from PlantUML server
+        """
+        if self.config.client_render and isinstance(self.puml, PlantUML):
+            return f'<img class="diagram" src="{self.puml.url_for(diagram.scheme)}" alt="" loading="lazy">'
+        return '<p class="deferred">The diagram is not rendered yet</p>'
 
-    def _prepare_status_message(self, fallback_count: int, req_count: Count):
+    def _prepare_status_message(
+        self, fallback_count: int, req_count: Count, deferred_count: int = 0, duplicate_count: int = 0
+    ):
         if fallback_count:
             ok_msg = f".[/dim][bold red] {fallback_count} diagram failed to render ⨯[/bold red]"
         else:
             ok_msg = "[/dim] [green bold]✔️[/green bold]"
 
+        if deferred_count:
+            d = "diagram" if deferred_count == 1 else "diagrams"
+            ok_msg += f"[bold yellow] {deferred_count} {d} deferred[/bold yellow]"
+
         if req_count.light == 0 and req_count.dark == 0:
-            built_msg = "All diagrams loaded from cache"
+            built_msg = "No diagrams built" if deferred_count else "All diagrams loaded from cache"
         elif req_count.light == 0:
             d = "diagram" if req_count.dark == 1 else "diagrams"
             built_msg = f"Built {req_count.dark} dark {d}"
@@ -257,4 +612,8 @@ class PlantUMLPlugin(BasePlugin[PlantUMLConfig]):
         else:
             built_msg = f"Built {req_count.light} light and {req_count.dark} dark diagrams"
 
+        if duplicate_count:
+            d = "duplicate" if duplicate_count == 1 else "duplicates"
+            built_msg += f", {duplicate_count} {d} coalesced"
+
         return "[dim][bold magenta]mkdocs_puml[/bold magenta]: " + built_msg + ok_msg
@@ -0,0 +1,183 @@
+from contextlib import contextmanager, nullcontext
+import cProfile
+import functools
+import logging
+from pathlib import Path
+import pstats
+import time
+import typing
+
+logger = logging.getLogger("mkdocs.plugins.plantuml")
+
+# Environment variable with a directory that enables profiling regardless of the config
+PROFILE_ENV = "MKDOCS_PUML_PROFILE"
+
+_null = nullcontext()
+
+
+class Profiler:
+    """`Profiler` profiles the hooks of the plugin with cProfile and measures
+    wall-clock spans of the internals, e.g. rendering or saving of the storage.
+
+    Each hook accumulates one profile over all of its calls, so
+    ``on_page_markdown`` is profiled over all pages of a build. ``write`` dumps
+
+    * ``<hook>.prof`` — cProfile stats of a hook, readable by ``pstats``, snakeviz, etc.
+    * ``profile.collapsed`` — stacks of functions in the collapsed format of ``flamegraph.pl``
+      and speedscope, in microseconds of own time
+    * ``spans.collapsed`` — wall-clock stacks of hooks and internal spans in the same format
+
+    cProfile sees only the thread that runs a hook, so the work done by background
+    threads and processes is visible in spans only.
+
+    Args:
+        directory (Path): directory to write the files into
+
+    Examples:
+        Use this class as::
+
+            profiler = Profiler(Path("profile"))
+            with profiler.hook("on_env"):
+                with profiler.span("translate"):
+                    ...
+            profiler.write()
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.profiles: dict[str, cProfile.Profile] = {}
+        self.spans: dict[tuple[str, ...], float] = {}
+        self._stack: list[str] = []
+
+    @contextmanager
+    def hook(self, name: str) -> typing.Iterator[None]:
+        """Profile a hook of the plugin. Another active profiler,
+        e.g. when mkdocs itself runs under cProfile, leaves the hook with a span only
+        """
+        profile = self.profiles.setdefault(name, cProfile.Profile())
+        try:
+            profile.enable()
+        except ValueError as e:
+            logger.debug(f"Hook {name} is not profiled: {e}")
+            profile = None
+
+        try:
+            with self.span(name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+
+    @contextmanager
+    def span(self, name: str) -> typing.Iterator[None]:
+        """Measure wall-clock time of a block nested into the current span"""
+        self._stack.append(name)
+        key = tuple(self._stack)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans[key] = self.spans.get(key, 0) + time.perf_counter() - start
+            self._stack.pop()
+
+    def write(self):
+        """Write the profiles and the collapsed stacks into the directory"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+        lines = []
+        for name, profile in self.profiles.items():
+            try:
+                stats = pstats.Stats(profile)
+            except TypeError:
+                # The profile has never been enabled
+                continue
+            stats.dump_stats(self.directory.joinpath(f"{name}.prof"))
+            lines.extend(f"{name};{stack} {us}" for stack, us in collapse(stats).items())
+        self.directory.joinpath("profile.collapsed").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        spans = []
+        for stack, seconds in self.spans.items():
+            # Own time of a span without the time of the nested spans
+            nested = sum(v for k, v in self.spans.items() if len(k) == len(stack) + 1 and k[:-1] == stack)
+            spans.append(f"{';'.join(stack)} {max(int((seconds - nested) * 1e6), 0)}")
+        self.directory.joinpath("spans.collapsed").write_text("\n".join(spans) + "\n", encoding="utf-8")
+
+
+def collapse(stats: pstats.Stats) -> dict[str, int]:
+    """Convert cProfile stats into collapsed stacks.
+
+    cProfile keeps only the edges between callers and callees, so the stack of
+    a function is rebuilt by following its most expensive caller up to the root.
+    It's exact for functions called from a single place and an approximation otherwise.
+
+    Args:
+        stats (pstats.Stats): stats of a profile
+
+    Returns:
+        dict[str, int]: stacks separated by ``;`` mapped to own time in microseconds
+    """
+    raw = stats.stats  # type: ignore[attr-defined]
+    result: dict[str, int] = {}
+    for func, (_, _, tottime, _, _) in raw.items():
+        us = int(tottime * 1e6)
+        if us <= 0:
+            continue
+
+        chain = [func]
+        seen = {func}
+        callers = raw[func][4]
+        while callers:
+            caller = max(callers, key=lambda c: _cumtime(callers[c]))
+            if caller in seen or caller not in raw:
+                break
+            chain.append(caller)
+            seen.add(caller)
+            callers = raw[caller][4]
+
+        stack = ";".join(_label(f) for f in reversed(chain))
+        result[stack] = result.get(stack, 0) + us
+    return result
+
+
+def profiled(fn: typing.Callable) -> typing.Callable:
+    """Profile a hook of `PlantUMLPlugin` when its ``profiler`` is set.
+
+    mkdocs registers the hooks when the plugin is loaded, before the config is read,
+    so the hooks are wrapped once and check the profiler on each call. The profiles
+    are written when ``on_post_build`` is finished.
+    """
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(self, *args, **kwargs):
+        if self.profiler is None:
+            return fn(self, *args, **kwargs)
+
+        with self.profiler.hook(name):
+            result = fn(self, *args, **kwargs)
+        if name == "on_post_build":
+            self.profiler.write()
+        return result
+
+    return wrapper
+
+
+def hook(profiler: typing.Optional[Profiler], name: str) -> typing.ContextManager:
+    """Profile of a hook or a no-op context if profiling is disabled"""
+    return _null if profiler is None else profiler.hook(name)
+
+
+def span(profiler: typing.Optional[Profiler], name: str) -> typing.ContextManager:
+    """Span of the profiler or a no-op context if profiling is disabled"""
+    return _null if profiler is None else profiler.span(name)
+
+
+def _cumtime(edge: tuple) -> float:
+    # Caller edges are (cc, nc, tt, ct)
+    return edge[3]
+
+
+def _label(func: tuple[str, int, str]) -> str:
+    filename, _, name = func
+    label = name if filename == "~" else f"{Path(filename).stem}.{name}"
+    return label.replace(";", ",")
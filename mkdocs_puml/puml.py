@@ -1,24 +1,34 @@
+from abc import ABC, abstractmethod
 import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from dataclasses import dataclass
 import logging
+import time
 import typing
 import re
 
 from urllib.parse import urljoin
-from xml.dom.minidom import Element, parseString  # nosec
-
-from httpx import AsyncClient, Response
 
 from mkdocs_puml.encoder import encode
+from mkdocs_puml.retry import RetryBudget, RetryPolicy
 from mkdocs_puml.utils import sanitize_url
 
+# httpx is imported when the first request is sent, so builds
+# that take all diagrams from the cache don't pay for it
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from httpx import AsyncClient, Limits, Response, TransportError
+
 
 logger = logging.getLogger("mkdocs.plugins.plantuml")
 
 
 @dataclass
 class Fallback:
-    """Fallback message for a scheme when PlantUML returns an error"""
+    """Fallback message for a scheme when PlantUML returns an error.
+
+    ``status_code`` is ``0`` when the server didn't respond at all,
+    e.g. the connection was reset or the request timed out.
+    """
 
     status_code: int
     message: str
@@ -27,16 +37,217 @@ class Fallback:
         return f"{self.status_code}. {self.message}"
 
 
-class PlantUML:
+@dataclass
+class RenderStats:
+    """Measurements of rendering of a single diagram.
+
+    Attributes:
+        encode_time (float): seconds spent to encode the diagram
+        latency (float): seconds spent waiting for the server or the PlantUML process,
+                         summed over all attempts
+        postprocess_time (float): seconds spent to post-process the image
+        response_bytes (int): size of the last response in bytes
+        retries (int): the number of repeated requests
+    """
+
+    encode_time: float = 0.0
+    latency: float = 0.0
+    postprocess_time: float = 0.0
+    response_bytes: int = 0
+    retries: int = 0
+
+
+class AbstractRenderer(ABC):
+    """Renderer converts PlantUML schemes into SVG images.
+
+    The plugin selects a renderer by name from `renderer` config. Custom renderers
+    are registered in ``mkdocs_puml.renderers`` entry point group and must
+    implement ``from_config`` and ``translate`` methods.
+
+    The received SVG images are post-processed in the same way for all renderers.
+
+    Attributes:
+        stats (dict[str, RenderStats] | None): measurements of the rendered diagrams
+                                               by their schemes. Nothing is measured
+                                               while it's ``None``
+    """
+
+    stats: typing.Optional[typing.Dict[str, RenderStats]] = None
+
+    _html_comment_regex = re.compile(r"<!--.*?-->", flags=re.DOTALL)
+    _svg_start_regex = re.compile(r"<svg(?=[\s/>])")
+    _svg_attribute_regex = re.compile(r"""\s*([^\s=/>]+)\s*=\s*("[^"]*"|'[^']*')""")
+    _svg_start_end_regex = re.compile(r"\s*(/?)>")
+
+    @classmethod
+    @abstractmethod
+    def from_config(cls, config) -> "AbstractRenderer":
+        """Create the renderer from the config of the plugin
+
+        Args:
+            config (PlantUMLConfig): config of the plugin
+
+        Returns:
+            AbstractRenderer: configured renderer
+        """
+
+    @abstractmethod
+    def translate(
+        self, schemes: typing.Iterable[str], timeout: typing.Optional[float] = None
+    ) -> typing.List[typing.Optional[typing.Union[str, Fallback]]]:
+        """Translate PlantUML schemes into SVG images.
+
+        Args:
+            schemes (list): string representation of PUML diagram
+            timeout (float | None): seconds to wait for all diagrams. The diagrams
+                                    that are not rendered in time are ``None``
+
+        Returns:
+            list[str | Fallback | None]: SVG images ordered as ``schemes``
+        """
+
+    def __getstate__(self) -> dict:
+        # Bound methods submitted to a process pool pickle the renderer,
+        # so the measurements are not copied to the workers with every call
+        state = self.__dict__.copy()
+        state.pop("stats", None)
+        return state
+
+    def close(self):
+        """Release the resources held between calls of ``translate``,
+        e.g. running processes. It's called when the build is finished
+        """
+
+    def postprocess(self, content: typing.Union[str, Fallback]) -> typing.Union[Fallback]:
+        """Postprocess an SVG diagram received from PlantUML server.
+
+        The code that applies CSS styling to the SVG can be placed here.
+
+        Args:
+            content (str): SVG representation of build diagram
+        Returns:
+            Post-processed SVG diagram
+        """
+        if isinstance(content, Fallback):
+            return content
+
+        diagram_content = self._clean_comments(content)
+
+        return self._rewrite_svg(diagram_content)
+
+    @staticmethod
+    async def _wait_all(
+        tasks: list[asyncio.Future], timeout: typing.Optional[float]
+    ) -> list[typing.Optional[typing.Union[str, Fallback]]]:
+        """Wait for the tasks, cancel the ones that are not done within
+        ``timeout`` and return the results in the order of ``tasks``
+        """
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for t in pending:
+            t.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        return [t.result() if t in done else None for t in tasks]
+
+    def _postprocess(self, content: str, stats: typing.Optional[RenderStats]) -> typing.Union[str, Fallback]:
+        """Post-process an image of a local renderer and record
+        its size and the time spent
+        """
+        if stats is None:
+            return self.postprocess(content)
+
+        start = time.perf_counter()
+        result = self.postprocess(content)
+        stats.postprocess_time = time.perf_counter() - start
+        stats.response_bytes = len(content.encode("utf-8"))
+        return result
+
+    def _new_stats(self, scheme: str) -> typing.Optional[RenderStats]:
+        """Start measuring a diagram if the measurements are enabled"""
+        if self.stats is None:
+            return None
+        stats = self.stats[scheme] = RenderStats()
+        return stats
+
+    def _clean_comments(self, content: str) -> str:
+        """Remove comments from HTML content"""
+        return self._html_comment_regex.sub("", content)
+
+    def _rewrite_svg(self, content: str) -> str:
+        """Rewrite attributes of the root ``<svg>`` element.
+
+        Only the start tag of the root element is rebuilt. The XML prolog
+        (declaration, doctype) and anything after the closing ``</svg>``
+        are dropped, the rest of the document is copied as is. It avoids
+        parsing the whole SVG into DOM, which is slow and memory-hungry
+        for large diagrams.
+
+        Args:
+            content (str): SVG document without comments
+
+        Returns:
+            str: SVG element with updated root attributes
+        """
+        start = self._svg_start_regex.search(content)
+        if start is None:
+            raise ValueError("The content doesn't contain <svg> element")
+
+        attributes: dict[str, str] = {}
+        pos = start.end()
+        while True:
+            attr = self._svg_attribute_regex.match(content, pos)
+            if attr is None:
+                break
+            attributes[attr.group(1)] = attr.group(2)
+            pos = attr.end()
+
+        end = self._svg_start_end_regex.match(content, pos)
+        if end is None:
+            raise ValueError("The root <svg> element has a malformed start tag")
+
+        attributes["class"] = '"diagram"'
+        self._stylize_svg(attributes)
+
+        start_tag = "<svg" + "".join(f" {k}={v}" for k, v in attributes.items())
+        if end.group(1):
+            return f"{start_tag}/>"
+
+        close = content.rfind("</svg>")
+        if close < end.end():
+            raise ValueError("The root <svg> element is not closed")
+        return f"{start_tag}>{content[end.end():close + len('</svg>')]}"
+
+    def _stylize_svg(self, attributes: dict[str, str]):
+        """This method is used for modifications of the root SVG tag.
+
+        Args:
+            attributes (dict[str, str]): attributes of the root ``<svg>`` tag,
+                                         values are stored together with the quotes
+        """
+        attributes["preserveAspectRatio"] = '"xMidYMid meet"'
+
+
+class PlantUML(AbstractRenderer):
     """PlantUML converter class.
     It requests PUML service, updates received `svg`
     and returns it to the user.
 
     Attributes:
         base_url (str): Base URL to the PUML service
-        num_workers (int): The size of pool to run requests in
+        num_workers (int): The size of pool to run encoding and post-processing in.
+                           ``0`` runs them in the event loop
+        worker_type (str): The type of the pool, either "thread" or "process"
         verify_ssl (bool): Designates whether the ``requests`` should verify SSL certiticate
         output_format (str): The output format for the diagrams (e.g., "svg" or "dsvg")
+        max_concurrency (int): The maximum number of requests that are in flight at the same time
+        max_connections (int): The maximum number of connections kept in the HTTP pool
+        max_keepalive_connections (int): The maximum number of idle connections kept alive
+        retry (RetryPolicy): The policy to repeat requests that failed with a transient error
+        post_threshold (int): The size of a diagram source in bytes above which the source
+                              is sent in the body of POST request instead of GET URL.
+                              ``0`` always uses GET
+        budget (RetryBudget | None): retries left for the whole build, shared by all calls
+                                     of ``translate``. Each call gets a new budget while it's ``None``
 
     Examples:
         Use this class as::
@@ -45,14 +256,19 @@ class PlantUML:
             svg = puml.translate([diagram])[0]
     """
 
-    _html_comment_regex = re.compile(r"<!--.*?-->", flags=re.DOTALL)
-
     def __init__(
         self,
         base_url: str,
         verify_ssl: bool = True,
         output_format: str = "svg",
         timeout: int = 40,
+        max_concurrency: int = 16,
+        max_connections: int = 16,
+        max_keepalive_connections: int = 16,
+        retry: typing.Optional[RetryPolicy] = None,
+        num_workers: int = 0,
+        worker_type: str = "thread",
+        post_threshold: int = 4096,
     ):
         # Use sanitize_url because urllib removes last part of url which doesn't
         # end with / which makes it inconvenient to work with.
@@ -62,23 +278,54 @@ class PlantUML:
         self.verify_ssl = verify_ssl
         self.timeout = timeout
 
-    def translate(self, schemes: typing.Iterable[str]) -> typing.List[typing.Union[str, Fallback]]:
+        self.max_concurrency = max_concurrency
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.retry = retry if retry is not None else RetryPolicy()
+
+        self.num_workers = num_workers
+        self.worker_type = worker_type
+        self.post_threshold = post_threshold
+        self.budget: typing.Optional[RetryBudget] = None
+
+    @classmethod
+    def from_config(cls, config) -> "PlantUML":
+        return cls(
+            config.puml_url,
+            verify_ssl=config.verify_ssl,
+            timeout=config.request_timeout,
+            max_concurrency=config.max_concurrency,
+            max_connections=config.max_connections,
+            max_keepalive_connections=config.max_keepalive_connections,
+            retry=RetryPolicy(
+                attempts=config.retry.attempts,
+                backoff_factor=config.retry.backoff_factor,
+                backoff_max=config.retry.backoff_max,
+                budget=config.retry.budget,
+            ),
+            num_workers=config.num_workers,
+            worker_type=config.worker_type,
+            post_threshold=config.post_threshold,
+        )
+
+    def translate(
+        self, schemes: typing.Iterable[str], timeout: typing.Optional[float] = None
+    ) -> typing.List[typing.Optional[typing.Union[str, Fallback]]]:
         """Translate PlantUML schemes into the received SVG image.
 
+        Each diagram is post-processed as soon as its response arrives,
+        so CPU work overlaps with waiting for the other responses.
+        The order of the output matches the order of the schemes.
+
         Args:
             schemes (list): string representation of PUML diagram
+            timeout (float | None): seconds to wait for all diagrams. The diagrams
+                                    that are not rendered in time are ``None``
 
         Returns:
             SVG image of built diagram
         """
-        encoded = [self.preprocess(v) for v in schemes]
-
-        svg_images = self.request(encoded)
-
-        for i, v in enumerate(svg_images):
-            svg_images[i] = self.postprocess(v)
-
-        return svg_images
+        return asyncio.run(self._translate_all(list(schemes), timeout))
 
     def preprocess(self, content: str) -> str:
         """Pre-process the content before passing it
@@ -94,91 +341,210 @@ class PlantUML:
         """
         return encode(content)
 
-    def postprocess(self, content: typing.Union[str, Fallback]) -> typing.Union[Fallback]:
-        """Postprocess an SVG diagram received from PlantUML server.
-
-        The code that applies CSS styling to the SVG can be placed here.
+    async def translate_one(
+        self,
+        scheme: str,
+        client: "AsyncClient",
+        semaphore: asyncio.Semaphore,
+        budget: RetryBudget,
+        executor: typing.Optional[Executor] = None,
+    ) -> typing.Union[str, Fallback]:
+        """Translate a single PlantUML scheme asynchronously.
+
+        It is used to render diagrams one by one as soon as they are found,
+        sharing the client, the semaphore and the retry budget between calls.
+        Encoding and post-processing run in the executor, if it's passed.
+
+        Diagrams larger than ``post_threshold`` are not encoded, their source
+        is sent in the body of POST request, so the URL doesn't exceed
+        the limits of proxies and servers.
 
         Args:
-            content (str): SVG representation of build diagram
+            scheme (str): string representation of PUML diagram
+            client (AsyncClient): pooled HTTP client created by ``build_client``
+            semaphore (asyncio.Semaphore): semaphore that bounds the number of requests in flight
+            budget (RetryBudget): retries left for the whole build
+            executor (Executor | None): pool created by ``build_executor``
+
         Returns:
-            Post-processed SVG diagram
+            SVG image of built diagram or Fallback
         """
-        if isinstance(content, Fallback):
-            return content
+        stats = self._new_stats(scheme)
+        start = time.perf_counter()
 
-        diagram_content = self._clean_comments(content)
+        if self._use_post(scheme):
+            encoded, uri, content = scheme, self.base_url.rstrip("/"), scheme
+        else:
+            encoded = await self._run_cpu(executor, self.preprocess, scheme)
+            uri, content = urljoin(self.base_url, encoded), None
+        encoded_at = time.perf_counter()
 
-        svg = self._convert_to_dom(diagram_content)
-        self._stylize_svg(svg)
+        resp = await self._request_one(client, semaphore, budget, uri, content=content, stats=stats)
+        responded_at = time.perf_counter()
+        result = await self._run_cpu(executor, self.postprocess, self._read_response(encoded, resp))
 
-        return svg.toxml()
+        if stats is not None:
+            from httpx import Response
 
-    def request(self, schemes: list[str]) -> list[typing.Union[str, Fallback]]:
-        """Request PlantUML service with the encoded diagram;
-        return SVG content
+            stats.encode_time = encoded_at - start
+            stats.postprocess_time = time.perf_counter() - responded_at
+            if isinstance(resp, Response):
+                stats.response_bytes = len(resp.content)
+        return result
+
+    def url_for(self, scheme: str) -> str:
+        """Create the URL that renders a scheme on PlantUML server
 
         Args:
-            schemes (str): Encoded string representation of the diagram diagrams
+            scheme (str): string representation of PUML diagram
+
         Returns:
-            SVG representation of the diagram
+            str: URL of the diagram image
         """
-        responses: list[Response] = asyncio.run(self._request_all(schemes))
+        return urljoin(self.base_url, self.preprocess(scheme))
 
-        svgs = []
-        for s, resp in zip(schemes, responses):
-            # Use 'ignore' to strip non-utf chars
-            c = resp.content.decode("utf-8", errors="ignore")
-            if not resp.is_success:
-                logger.warning(
-                    f"While building diagram \n\n{s}\n\nServer responded"
-                    f" with a status {resp.status_code}"
-                )
-                svgs.append(Fallback(status_code=resp.status_code, message=c))
-            else:
-                svgs.append(c)
+    def _use_post(self, scheme: str) -> bool:
+        """Whether the scheme is sent with POST request instead of GET"""
+        return bool(self.post_threshold) and len(scheme.encode("utf-8")) > self.post_threshold
 
-        return svgs
+    @property
+    def limits(self) -> "Limits":
+        """Limits of the connection pool of HTTP client"""
+        from httpx import Limits
 
-    async def _request_one(self, uri: str) -> Response:
-        """Request request PlantUML server asynchronously
+        return Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+        )
 
-        Args:
-            uri (str): URI with encoded diagram attached to it
+    def build_client(self) -> "AsyncClient":
+        """Create a pooled HTTP client configured for the PlantUML server"""
+        from httpx import AsyncClient
 
-        Returns:
-            Response: response from PlantUML server
-        """
-        async with AsyncClient(verify=self.verify_ssl, timeout=self.timeout) as client:
-            return await client.get(uri)
+        return AsyncClient(verify=self.verify_ssl, timeout=self.timeout, limits=self.limits)
 
-    async def _request_all(self, schemes: list[str]):
-        """Asynchronous wrapper that creates request coroutine for
-        each scheme and after await returns an ordered list of responses.
-
-        Args:
-            schemes (list[str]): encoded PlantUML diagrams
+    def build_executor(self) -> typing.Optional[Executor]:
+        """Create a pool for encoding and post-processing of diagrams.
 
         Returns:
-            list[Response]: ordered list of Responses
+            Executor | None: thread or process pool, or ``None`` if
+                             ``num_workers`` is ``0``
         """
-        return await asyncio.gather(
-            *(self._request_one(urljoin(self.base_url, v)) for v in schemes)
-        )
+        if self.num_workers <= 0:
+            return None
+        if self.worker_type == "process":
+            return ProcessPoolExecutor(max_workers=self.num_workers)
+        return ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="mkdocs_puml")
+
+    async def _translate_all(
+        self, schemes: list[str], timeout: typing.Optional[float] = None
+    ) -> list[typing.Optional[typing.Union[str, Fallback]]]:
+        """Translate all schemes sharing one client, semaphore,
+        retry budget and executor. The diagrams that are not
+        rendered within ``timeout`` are cancelled.
+        """
+        if not schemes:
+            return []
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        budget = self.budget if self.budget is not None else self.retry.new_budget()
+        executor = self.build_executor()
+        try:
+            async with self.build_client() as client:
+                tasks = [
+                    asyncio.ensure_future(self.translate_one(v, client, semaphore, budget, executor))
+                    for v in schemes
+                ]
+                return await self._wait_all(tasks, timeout)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    @staticmethod
+    async def _run_cpu(executor: typing.Optional[Executor], fn: typing.Callable, arg):
+        """Run CPU-bound function in the executor or inline if there is no executor"""
+        if executor is None:
+            return fn(arg)
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, arg)
+
+    def _read_response(
+        self, scheme: str, resp: typing.Union["Response", "TransportError"]
+    ) -> typing.Union[str, Fallback]:
+        """Convert a response, or the error of the last attempt,
+        into SVG content or a `Fallback`
+        """
+        from httpx import TransportError
+
+        if isinstance(resp, TransportError):
+            logger.warning(
+                f"While building diagram \n\n{scheme}\n\nRequest to the server"
+                f" failed with {type(resp).__name__}: {resp}"
+            )
+            return Fallback(status_code=0, message=f"{type(resp).__name__}: {resp}")
+
+        # Use 'ignore' to strip non-utf chars
+        c = resp.content.decode("utf-8", errors="ignore")
+        if not resp.is_success:
+            logger.warning(
+                f"While building diagram \n\n{scheme}\n\nServer responded"
+                f" with a status {resp.status_code}"
+            )
+            return Fallback(status_code=resp.status_code, message=c)
+        return c
+
+    async def _request_one(
+        self,
+        client: "AsyncClient",
+        semaphore: asyncio.Semaphore,
+        budget: RetryBudget,
+        uri: str,
+        content: typing.Optional[str] = None,
+        stats: typing.Optional[RenderStats] = None,
+    ) -> typing.Union["Response", "TransportError"]:
+        """Request request PlantUML server asynchronously.
+
+        Transient errors are retried with a backoff while both the
+        per-diagram attempts and the build-wide budget allow it.
+        The semaphore is released while waiting for the next attempt.
 
-    def _clean_comments(self, content: str) -> str:
-        """Remove comments from HTML content"""
-        return self._html_comment_regex.sub("", content)
+        Args:
+            client (AsyncClient): pooled HTTP client shared by all requests of a batch
+            semaphore (asyncio.Semaphore): semaphore that bounds the number of requests in flight
+            budget (RetryBudget): retries left for the whole batch
+            uri (str): URI with encoded diagram attached to it
+            content (str | None): diagram source to send with POST request instead of GET
+            stats (RenderStats | None): measurements of the diagram to add latency and retries to
 
-    def _convert_to_dom(self, content: str) -> Element:
-        """The method to convert received SVG into XML DOM
-        for future modifications
+        Returns:
+            Response | TransportError: response from PlantUML server or the error
+                                       of the last attempt
         """
-        dom = parseString(content)  # nosec
-        svg = dom.getElementsByTagName("svg")[0]
-        svg.setAttribute("class", "diagram")
-        return svg
-
-    def _stylize_svg(self, svg: Element):
-        """This method is used for SVG tags modifications"""
-        svg.setAttribute("preserveAspectRatio", "xMidYMid meet")
+        from httpx import TransportError
+
+        attempt = 0
+        while True:
+            result: typing.Union["Response", TransportError]
+            try:
+                async with semaphore:
+                    sent_at = time.perf_counter()
+                    if content is None:
+                        result = await client.get(uri)
+                    else:
+                        result = await client.post(
+                            uri, content=content.encode("utf-8"), headers={"Content-Type": "text/plain"}
+                        )
+            except TransportError as e:
+                result = e
+            if stats is not None:
+                stats.latency += time.perf_counter() - sent_at
+                stats.retries = attempt
+
+            if (
+                not self.retry.is_retryable(result)
+                or attempt >= self.retry.attempts
+                or not budget.spend()
+            ):
+                return result
+
+            await asyncio.sleep(self.retry.delay(attempt, result))
+            attempt += 1
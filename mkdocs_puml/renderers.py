@@ -0,0 +1,356 @@
+import asyncio
+import base64
+from concurrent.futures import ThreadPoolExecutor, wait
+import logging
+import os
+import shlex
+import subprocess  # nosec
+import sys
+import threading
+import time
+import typing
+import zlib
+
+from mkdocs_puml.puml import AbstractRenderer, Fallback, PlantUML
+
+logger = logging.getLogger("mkdocs.plugins.plantuml")
+
+ENTRY_POINT_GROUP = "mkdocs_puml.renderers"
+
+
+class KrokiRenderer(PlantUML):
+    """Renderer for Kroki-compatible servers.
+
+    Kroki serves PlantUML diagrams at ``/plantuml/svg`` and accepts
+    the source of a diagram in the body of POST request, so the diagrams
+    are never encoded into URL.
+
+    Examples:
+        Use this class as::
+
+            kroki = KrokiRenderer("https://kroki.io")
+            svg = kroki.translate([diagram])[0]
+    """
+
+    def __init__(self, base_url: str, output_format: str = "svg", **kwargs):
+        super().__init__(base_url, output_format=f"plantuml/{output_format}", **kwargs)
+
+    def url_for(self, scheme: str) -> str:
+        # Kroki encodes GET requests with zlib and URL-safe base64
+        encoded = base64.urlsafe_b64encode(zlib.compress(scheme.encode("utf-8"), 9))
+        return f"{self.base_url}{encoded.decode('ascii')}"
+
+    def _use_post(self, scheme: str) -> bool:
+        return True
+
+
+class ProcessRenderer(AbstractRenderer):
+    """Renderer that runs a local PlantUML process for each diagram.
+
+    The source of a diagram is written to the standard input of the command
+    and the SVG image is read from its standard output, so no network
+    is required.
+
+    Args:
+        command (str): command that reads a diagram from stdin and writes SVG to stdout
+        timeout (int): seconds to wait for one diagram
+        num_workers (int): the number of processes running at the same time.
+                           ``0`` uses the number of CPU cores
+
+    Examples:
+        Use this class as::
+
+            renderer = ProcessRenderer("java -jar plantuml.jar -tsvg -pipe")
+            svg = renderer.translate([diagram])[0]
+    """
+
+    def __init__(self, command: str = "plantuml -tsvg -pipe", timeout: int = 40, num_workers: int = 0):
+        self.command = shlex.split(command)
+        self.timeout = timeout
+        self.num_workers = num_workers if num_workers > 0 else os.cpu_count() or 1
+
+    @classmethod
+    def from_config(cls, config) -> "ProcessRenderer":
+        return cls(
+            config.process.command,
+            timeout=config.request_timeout,
+            num_workers=config.num_workers,
+        )
+
+    def translate(
+        self, schemes: typing.Iterable[str], timeout: typing.Optional[float] = None
+    ) -> typing.List[typing.Optional[typing.Union[str, Fallback]]]:
+        return asyncio.run(self._translate_all(list(schemes), timeout))
+
+    async def _translate_all(
+        self, schemes: list[str], timeout: typing.Optional[float] = None
+    ) -> list[typing.Optional[typing.Union[str, Fallback]]]:
+        if not schemes:
+            return []
+
+        semaphore = asyncio.Semaphore(self.num_workers)
+        tasks = [asyncio.ensure_future(self._render(v, semaphore)) for v in schemes]
+        return await self._wait_all(tasks, timeout)
+
+    async def _render(self, scheme: str, semaphore: asyncio.Semaphore) -> typing.Union[str, Fallback]:
+        """Render one diagram in a new process. The process is killed
+        if it doesn't finish in time or the task is cancelled
+        """
+        stats = self._new_stats(scheme)
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                proc = await asyncio.create_subprocess_exec(
+                    *self.command,
+                    stdin=asyncio.subprocess.PIPE,
+                    stdout=asyncio.subprocess.PIPE,
+                    stderr=asyncio.subprocess.PIPE,
+                )
+            except OSError as e:
+                logger.warning(f"Can't start PlantUML process {self.command[0]}: {e}")
+                return Fallback(status_code=0, message=f"{type(e).__name__}: {e}")
+
+            try:
+                out, err = await asyncio.wait_for(proc.communicate(scheme.encode("utf-8")), self.timeout)
+            except asyncio.TimeoutError:
+                logger.warning(f"While building diagram \n\n{scheme}\n\nPlantUML process timed out")
+                return Fallback(status_code=0, message="PlantUML process timed out")
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                if stats is not None:
+                    stats.latency = time.perf_counter() - start
+
+        if proc.returncode != 0:
+            logger.warning(
+                f"While building diagram \n\n{scheme}\n\nPlantUML process exited"
+                f" with a code {proc.returncode}"
+            )
+            return Fallback(status_code=proc.returncode, message=err.decode("utf-8", errors="ignore"))
+        return self._postprocess(out.decode("utf-8", errors="ignore"), stats)
+
+
+class _PipeProcess:
+    """PlantUML process running in pipe mode that renders
+    diagrams one by one
+    """
+
+    def __init__(self, command: list[str], delimiter: str):
+        self.delimiter = delimiter.encode("utf-8")
+        self.proc = subprocess.Popen(  # nosec
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+        )
+
+    @property
+    def alive(self) -> bool:
+        return self.proc.poll() is None
+
+    def render(self, scheme: str, timeout: float) -> typing.Optional[str]:
+        """Write a diagram to the process and read the output until the delimiter.
+
+        The process is killed if it doesn't respond within ``timeout``.
+
+        Returns:
+            str | None: output of the process or ``None`` if the process has exited
+        """
+        timer = threading.Timer(timeout, self.proc.kill)
+        timer.start()
+        try:
+            self.proc.stdin.write(scheme.encode("utf-8") + b"\n")
+            self.proc.stdin.flush()
+
+            lines = []
+            for line in self.proc.stdout:
+                # PlantUML writes the delimiter right after the image,
+                # which doesn't end with a new line
+                line = line.rstrip(b"\r\n")
+                if line.endswith(self.delimiter):
+                    lines.append(line[:-len(self.delimiter)])
+                    return b"\n".join(lines).decode("utf-8", errors="ignore")
+                lines.append(line)
+        except OSError:
+            pass
+        finally:
+            timer.cancel()
+
+        # The process is broken, make sure it's not reused
+        self.kill()
+        return None
+
+    def close(self):
+        if self.alive:
+            self.proc.stdin.close()
+            try:
+                self.proc.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proc.kill()
+                self.proc.wait()
+
+    def kill(self):
+        if self.alive:
+            self.proc.kill()
+            self.proc.wait()
+
+
+class PipeRenderer(AbstractRenderer):
+    """Renderer that streams diagrams through long-lived local
+    PlantUML processes running in pipe mode.
+
+    JVM of each process is started once and reused for all diagrams of a build.
+    ``-pipeNoStderr`` and ``-pipedelimitor`` options are appended to the command,
+    so PlantUML reports errors and separates the images in its standard output.
+    Up to ``num_workers`` processes render diagrams at the same time.
+
+    Args:
+        command (str): command that starts PlantUML in pipe mode
+        timeout (int): seconds to wait for one diagram
+        num_workers (int): the number of processes. ``0`` uses the number of CPU cores
+        delimiter (str): line that PlantUML writes after each image
+
+    Examples:
+        Use this class as::
+
+            renderer = PipeRenderer("java -jar plantuml.jar -tsvg -pipe")
+            svg = renderer.translate([diagram])[0]
+            renderer.close()
+    """
+
+    def __init__(
+        self,
+        command: str = "plantuml -tsvg -pipe",
+        timeout: int = 40,
+        num_workers: int = 0,
+        delimiter: str = "___mkdocs_puml___",
+    ):
+        self.command = [*shlex.split(command), "-pipeNoStderr", "-pipedelimitor", delimiter]
+        self.delimiter = delimiter
+        self.timeout = timeout
+        self.num_workers = num_workers if num_workers > 0 else os.cpu_count() or 1
+
+        self._lock = threading.Lock()
+        self._idle: list[_PipeProcess] = []
+        self._busy: set[_PipeProcess] = set()
+
+    @classmethod
+    def from_config(cls, config) -> "PipeRenderer":
+        return cls(
+            config.process.command,
+            timeout=config.request_timeout,
+            num_workers=config.num_workers,
+        )
+
+    def translate(
+        self, schemes: typing.Iterable[str], timeout: typing.Optional[float] = None
+    ) -> typing.List[typing.Optional[typing.Union[str, Fallback]]]:
+        schemes = list(schemes)
+        if not schemes:
+            return []
+
+        executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="mkdocs_puml")
+        futures = [executor.submit(self._render, v) for v in schemes]
+        done, pending = wait(futures, timeout=timeout)
+        if pending:
+            for f in pending:
+                f.cancel()
+            # Unblock the workers waiting for the processes
+            with self._lock:
+                busy = list(self._busy)
+            for p in busy:
+                p.kill()
+        executor.shutdown(wait=True)
+
+        return [f.result() if f in done else None for f in futures]
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for p in idle:
+            p.close()
+
+    def _render(self, scheme: str) -> typing.Union[str, Fallback]:
+        try:
+            proc = self._acquire()
+        except OSError as e:
+            logger.warning(f"Can't start PlantUML process {self.command[0]}: {e}")
+            return Fallback(status_code=0, message=f"{type(e).__name__}: {e}")
+
+        stats = self._new_stats(scheme)
+        started_at = time.perf_counter()
+        try:
+            output = proc.render(self._wrap(scheme), self.timeout)
+        finally:
+            self._release(proc)
+        if stats is not None:
+            stats.latency = time.perf_counter() - started_at
+
+        if output is None:
+            logger.warning(
+                f"While building diagram \n\n{scheme}\n\nPlantUML process exited or timed out"
+            )
+            return Fallback(status_code=0, message="PlantUML process exited or timed out")
+
+        # With -pipeNoStderr, PlantUML writes ERROR, the line number and the message
+        # before the image of the error
+        if output.startswith("ERROR"):
+            logger.warning(f"While building diagram \n\n{scheme}\n\nPlantUML reported an error")
+            start = output.find("<")
+            return Fallback(status_code=400, message=output[start:] if start != -1 else output)
+        return self._postprocess(output, stats)
+
+    def _acquire(self) -> _PipeProcess:
+        with self._lock:
+            proc = self._idle.pop() if self._idle else None
+        if proc is None:
+            proc = _PipeProcess(self.command, self.delimiter)
+        with self._lock:
+            self._busy.add(proc)
+        return proc
+
+    def _release(self, proc: _PipeProcess):
+        with self._lock:
+            self._busy.discard(proc)
+            if proc.alive:
+                self._idle.append(proc)
+
+    @staticmethod
+    def _wrap(scheme: str) -> str:
+        """PlantUML in pipe mode reads diagrams between @startuml and @enduml"""
+        scheme = scheme.strip()
+        if scheme.startswith("@start"):
+            return scheme
+        return f"@startuml\n{scheme}\n@enduml"
+
+
+BUILTIN_RENDERERS: dict[str, type[AbstractRenderer]] = {
+    "plantuml": PlantUML,
+    "kroki": KrokiRenderer,
+    "process": ProcessRenderer,
+    "pipe": PipeRenderer,
+}
+
+
+def load_renderer(name: str) -> typing.Optional[type[AbstractRenderer]]:
+    """Find a renderer class by name among the built-in renderers
+    and the ones registered in ``mkdocs_puml.renderers`` entry point group
+
+    Args:
+        name (str): name of the renderer
+
+    Returns:
+        type[AbstractRenderer] | None: renderer class or ``None`` if it's not found
+    """
+    if name in BUILTIN_RENDERERS:
+        return BUILTIN_RENDERERS[name]
+
+    from importlib.metadata import entry_points
+
+    if sys.version_info >= (3, 10):
+        eps = entry_points(group=ENTRY_POINT_GROUP)
+    else:  # pragma: no cover
+        eps = entry_points().get(ENTRY_POINT_GROUP, [])
+
+    for ep in eps:
+        if ep.name == name:
+            return ep.load()
+    return None
@@ -0,0 +1,158 @@
+from dataclasses import asdict, dataclass, field
+import datetime
+import json
+from pathlib import Path
+import typing
+
+from mkdocs_puml.puml import Fallback, RenderStats
+from mkdocs_puml.storage import AbstractStorage
+
+
+class DiagramStatus:
+    CACHED = "cached"
+    RENDERED = "rendered"
+    RECOLORED = "recolored"
+    FAILED = "failed"
+    DEFERRED = "deferred"
+
+
+@dataclass
+class DiagramRecord:
+    """Everything known about one diagram of a build.
+
+    Attributes:
+        key (str): key of the diagram in the storage
+        mode (str): theme mode of the diagram
+        pages (list[str]): source paths of the pages that contain the diagram
+        cache_hit (bool): whether the image was found in the storage
+        status (str): one of ``DiagramStatus`` values
+        size (int): size of the final SVG image in bytes
+        error_code (int | None): status code of the failed diagram
+    """
+
+    key: str
+    mode: str
+    pages: list[str] = field(default_factory=list)
+    cache_hit: bool = False
+    status: str = DiagramStatus.DEFERRED
+    size: int = 0
+    error_code: typing.Optional[int] = None
+    encode_time: float = 0.0
+    latency: float = 0.0
+    postprocess_time: float = 0.0
+    response_bytes: int = 0
+    retries: int = 0
+
+    @property
+    def total_time(self) -> float:
+        """Seconds spent to render the diagram"""
+        return self.encode_time + self.latency + self.postprocess_time
+
+
+class BuildReport:
+    """`BuildReport` collects measurements of every diagram of a build
+    and writes them as a JSON report.
+
+    The renderer records its measurements into ``stats`` by the scheme of a diagram,
+    and the plugin adds diagrams with the pages they were found on.
+    Both are joined by ``collect`` once the diagrams are rendered.
+
+    Examples:
+        Use this class as::
+
+            report = BuildReport()
+            renderer.stats = report.stats
+            report.add(key, "index.md", cache_hit=False)
+            ...
+            report.collect(storage)
+            report.write(Path("site/mkdocs_puml_report.json"))
+    """
+
+    def __init__(self):
+        self.stats: dict[str, RenderStats] = {}
+        self.records: dict[str, DiagramRecord] = {}
+
+    def add(self, key: str, mode: str, page: typing.Optional[str], cache_hit: bool):
+        """Add a diagram found on a page. A diagram found on several pages
+        is recorded once with all the pages.
+
+        Args:
+            key (str): key of the diagram in the storage
+            mode (str): theme mode of the diagram
+            page (str | None): source path of the page
+            cache_hit (bool): whether the image was found in the storage
+        """
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = DiagramRecord(key, mode, cache_hit=cache_hit)
+        if page is not None and page not in record.pages:
+            record.pages.append(page)
+
+    def collect(self, storage: AbstractStorage, derived: typing.Container[str] = ()):
+        """Fill in the status, size and measurements of the diagrams
+        from the storage and the stats of the renderer
+
+        Args:
+            storage (AbstractStorage): storage with rendered diagrams
+            derived (Container[str]): keys of the dark diagrams recolored from the light ones.
+                                      Other diagrams without stats were rendered by a renderer
+                                      that doesn't measure them
+        """
+        for key, record in self.records.items():
+            d = storage[key]
+            stats = self.stats.get(d.scheme)
+            if stats is not None and not record.cache_hit:
+                record.encode_time = stats.encode_time
+                record.latency = stats.latency
+                record.postprocess_time = stats.postprocess_time
+                record.response_bytes = stats.response_bytes
+                record.retries = stats.retries
+
+            if d.diagram is None:
+                record.status = DiagramStatus.DEFERRED
+            elif isinstance(d.diagram, Fallback):
+                record.status = DiagramStatus.FAILED
+                record.error_code = d.diagram.status_code
+            elif record.cache_hit:
+                record.status = DiagramStatus.CACHED
+            elif stats is None and key in derived:
+                record.status = DiagramStatus.RECOLORED
+            else:
+                record.status = DiagramStatus.RENDERED
+
+            record.size = len(d.diagram.encode("utf-8")) if isinstance(d.diagram, str) else 0
+
+    def slowest(self, n: int) -> list[DiagramRecord]:
+        """Diagrams that took the most time to render"""
+        records = [r for r in self.records.values() if r.total_time > 0]
+        return sorted(records, key=lambda r: r.total_time, reverse=True)[:n]
+
+    def largest(self, n: int) -> list[DiagramRecord]:
+        """Diagrams with the largest SVG images"""
+        records = [r for r in self.records.values() if r.size > 0]
+        return sorted(records, key=lambda r: r.size, reverse=True)[:n]
+
+    def to_dict(self) -> dict:
+        records = sorted(self.records.values(), key=lambda r: r.total_time, reverse=True)
+        statuses = {}
+        for r in records:
+            statuses[r.status] = statuses.get(r.status, 0) + 1
+
+        return {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "summary": {
+                "diagrams": len(records),
+                "statuses": statuses,
+                "render_time": sum(r.total_time for r in records),
+                "response_bytes": sum(r.response_bytes for r in records),
+                "size": sum(r.size for r in records),
+                "retries": sum(r.retries for r in records),
+            },
+            "diagrams": [{**asdict(r), "total_time": r.total_time} for r in records],
+        }
+
+    def write(self, path: Path):
+        """Write the report into a JSON file"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2)
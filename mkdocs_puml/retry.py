@@ -0,0 +1,124 @@
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+import random
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from httpx import Response
+
+
+@dataclass
+class RetryBudget:
+    """The total number of retries allowed for all diagrams of one build.
+
+    It prevents a broken PlantUML server from multiplying the build time
+    by the number of attempts.
+
+    Attributes:
+        left (int): the number of retries that can still be spent
+    """
+
+    left: int
+
+    def spend(self) -> bool:
+        """Take one retry from the budget.
+
+        Returns:
+            bool: ``False`` if the budget is exhausted
+        """
+        if self.left <= 0:
+            return False
+        self.left -= 1
+        return True
+
+
+@dataclass
+class RetryPolicy:
+    """Policy that decides whether a failed request to PlantUML server
+    should be repeated and how long to wait before the next attempt.
+
+    The delay grows exponentially with the attempt number and is randomized
+    with "full jitter", so that concurrent requests do not hit the server
+    at the same moment. If the server responded with a ``Retry-After`` header,
+    its value is used instead.
+
+    Attributes:
+        attempts (int): the number of retries for a single diagram
+        backoff_factor (float): the base delay in seconds
+        backoff_max (float): the upper limit of a delay in seconds
+        budget (int): the number of retries for all diagrams of one build
+        statuses (frozenset[int]): HTTP status codes that are considered transient
+    """
+
+    attempts: int = 3
+    backoff_factor: float = 0.5
+    backoff_max: float = 30
+    budget: int = 100
+    statuses: frozenset = field(default_factory=lambda: frozenset({408, 429, 502, 503, 504}))
+
+    def new_budget(self) -> RetryBudget:
+        """Create a retry budget for a new build"""
+        return RetryBudget(self.budget)
+
+    def is_retryable(self, result: typing.Union["Response", Exception]) -> bool:
+        """Classify the result of a request.
+
+        Transport errors (timeouts, connection resets, etc.) and responses
+        with a transient status code can be retried. Any other error,
+        e.g. ``400`` for a diagram with a syntax error, is permanent.
+
+        Args:
+            result (Response | Exception): response or exception raised by the request
+
+        Returns:
+            bool: ``True`` if the request can be repeated
+        """
+        from httpx import Response, TransportError
+
+        if isinstance(result, TransportError):
+            return True
+        if isinstance(result, Response):
+            return result.status_code in self.statuses
+        return False
+
+    def delay(self, attempt: int, result: typing.Union["Response", Exception, None] = None) -> float:
+        """Calculate the delay before the next attempt.
+
+        Args:
+            attempt (int): zero-based number of the failed attempt
+            result (Response | Exception | None): result of the failed attempt
+
+        Returns:
+            float: delay in seconds
+        """
+        from httpx import Response
+
+        if isinstance(result, Response):
+            retry_after = self._parse_retry_after(result.headers.get("Retry-After"))
+            if retry_after is not None:
+                return min(retry_after, self.backoff_max)
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * 2**attempt))  # nosec
+
+    @staticmethod
+    def _parse_retry_after(value: typing.Optional[str]) -> typing.Optional[float]:
+        """Parse ``Retry-After`` header that contains either
+        a number of seconds or an HTTP date
+        """
+        if not value:
+            return None
+
+        try:
+            return max(float(value), 0)
+        except ValueError:
+            pass
+
+        try:
+            date = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+
+        if date.tzinfo is None:
+            date = date.replace(tzinfo=timezone.utc)
+        return max((date - datetime.now(timezone.utc)).total_seconds(), 0)
@@ -43,74 +43,95 @@ let controls = `
 </div>
 `;
 
+// Diagrams written as external files are <img> elements.
+// Their size is known only when the image is loaded.
+function isExternal(diagram) {
+    return diagram.tagName.toLowerCase() === 'img';
+}
+
+function diagramSource(diagram) {
+    if (isExternal(diagram)) {
+        return fetch(diagram.src).then(response => response.text());
+    }
+    return Promise.resolve(new XMLSerializer().serializeToString(diagram));
+}
+
 function processDiagrams() {
     const svgs = document.querySelectorAll('.puml .diagram');
     svgs.forEach(svg => {
-        // Get the computed width and height of each SVG
-        // const rect = svg.querySelector('rect');
-        let width = svg.getAttribute('width');
-        let height = svg.getAttribute('height');
-
-        width = parseInt(width);
-        height = parseInt(height);
-
-        if(isNaN(width) || isNaN(height)) {
+        if (isExternal(svg) && !svg.complete) {
+            svg.addEventListener('load', () => processDiagram(svg), {once: true});
             return
         }
+        processDiagram(svg);
+    });
+}
 
-        if (width > height) {
-            svg.classList.add('wide-svg');
-        }
-
-        const g = svg.querySelector('g');
-        const panzoom = Panzoom(g, {canvas: true});
-
-        g.parentElement.addEventListener('wheel', function (event) {
-            if (!event.shiftKey) return
-            // Panzoom will automatically use `deltaX` here instead
-            // of `deltaY`. On a mac, the shift modifier usually
-            // translates to horizontal scrolling, but Panzoom assumes
-            // the desired behavior is zooming.
-            panzoom.zoomWithWheel(event)
-        });
+function processDiagram(svg) {
+    // Get the computed width and height of each SVG
+    // const rect = svg.querySelector('rect');
+    let width = isExternal(svg) ? svg.naturalWidth : svg.getAttribute('width');
+    let height = isExternal(svg) ? svg.naturalHeight : svg.getAttribute('height');
+
+    width = parseInt(width);
+    height = parseInt(height);
+
+    if(isNaN(width) || isNaN(height)) {
+        return
+    }
+
+    if (width > height) {
+        svg.classList.add('wide-svg');
+    }
+
+    const g = isExternal(svg) ? svg : svg.querySelector('g');
+    const panzoom = Panzoom(g, {canvas: true});
+
+    g.parentElement.addEventListener('wheel', function (event) {
+        if (!event.shiftKey) return
+        // Panzoom will automatically use `deltaX` here instead
+        // of `deltaY`. On a mac, the shift modifier usually
+        // translates to horizontal scrolling, but Panzoom assumes
+        // the desired behavior is zooming.
+        panzoom.zoomWithWheel(event)
+    });
 
-        svg.insertAdjacentHTML("beforebegin", controls);
+    svg.insertAdjacentHTML("beforebegin", controls);
 
-        const control = svg.parentElement.querySelector(".control");
-        const copyBtn = control.querySelector(".puml-copy");
-        const downloadBtn = control.querySelector(".puml-download");
-        const zoomResetBtn = control.querySelector(".puml-zoom-reset");
-        const zoomInBtn = control.querySelector(".puml-zoom-in");
-        const zoomOutBtn = control.querySelector(".puml-zoom-out");
+    const control = svg.parentElement.querySelector(".control");
+    const copyBtn = control.querySelector(".puml-copy");
+    const downloadBtn = control.querySelector(".puml-download");
+    const zoomResetBtn = control.querySelector(".puml-zoom-reset");
+    const zoomInBtn = control.querySelector(".puml-zoom-in");
+    const zoomOutBtn = control.querySelector(".puml-zoom-out");
 
-        zoomResetBtn.addEventListener("click", event => {
-            panzoom.reset({animate: false});
-        });
-        zoomInBtn.addEventListener("click", event => {
-            panzoom.zoomIn();
-        });
-        zoomOutBtn.addEventListener("click", event => {
-            panzoom.zoomOut();
-        });
+    zoomResetBtn.addEventListener("click", event => {
+        panzoom.reset({animate: false});
+    });
+    zoomInBtn.addEventListener("click", event => {
+        panzoom.zoomIn();
+    });
+    zoomOutBtn.addEventListener("click", event => {
+        panzoom.zoomOut();
+    });
 
-        let timeout = null;
-        copyBtn.addEventListener("click", event => {
-            clearTimeout(timeout);
+    let timeout = null;
+    copyBtn.addEventListener("click", event => {
+        clearTimeout(timeout);
 
-            let btn = event.target.closest('button');
-            btn.innerHTML = checkSvg;
+        let btn = event.target.closest('button');
+        btn.innerHTML = checkSvg;
 
-            timeout = setTimeout(() => {
-                btn.innerHTML = copySvg;
-            }, 1500);
-        });
-        copyBtn.addEventListener("click", e => {
-            const svgString = new XMLSerializer().serializeToString(svg);
-            // Copy svg as text
-            navigator.clipboard.writeText(svgString);
-        });
-        downloadBtn.addEventListener("click", e => {
-            const svgString = new XMLSerializer().serializeToString(svg);
+        timeout = setTimeout(() => {
+            btn.innerHTML = copySvg;
+        }, 1500);
+    });
+    copyBtn.addEventListener("click", e => {
+        // Copy svg as text
+        diagramSource(svg).then(svgString => navigator.clipboard.writeText(svgString));
+    });
+    downloadBtn.addEventListener("click", e => {
+        diagramSource(svg).then(svgString => {
             let blob = new Blob([svgString], { type: 'image/svg+xml' });
             let link = document.createElement('a');
             link.href = URL.createObjectURL(blob);
@@ -121,6 +142,9 @@ function processDiagrams() {
     });
 }
 
+// Diagrams built with `output: lazy` are inserted by puml.js
+document.addEventListener('puml:loaded', event => processDiagram(event.target));
+
 // This checks if mkdocs-material is installed, use document$.subscribe.
 // Otherwise, add listener to DOMContentLoaded
 if (typeof document$ !== 'undefined' && document$.subscribe){
@@ -1,23 +1,112 @@
 // Wide diagrams receive enormously big height. This code
 // assigns a special class .wide-svg to each svg where width > height
 // and CSS fixes the problem.
-document.addEventListener("DOMContentLoaded", function() {
-    const svgs = document.querySelectorAll('.puml .diagram');
-    svgs.forEach(svg => {
-        // Get the computed width and height of each SVG
-        // const rect = svg.querySelector('rect');
-        let width = svg.getAttribute('width');
-        let height = svg.getAttribute('height');
+function markWideDiagram(svg) {
+    // Diagrams written as external files are <img> elements
+    const external = svg.tagName.toLowerCase() === 'img';
 
-        width = parseInt(width);
-        height = parseInt(height);
+    // Get the computed width and height of each SVG
+    // const rect = svg.querySelector('rect');
+    let width = external ? svg.naturalWidth : svg.getAttribute('width');
+    let height = external ? svg.naturalHeight : svg.getAttribute('height');
 
-        if(isNaN(width) || isNaN(height)) {
-            return
-        }
+    width = parseInt(width);
+    height = parseInt(height);
+
+    if(isNaN(width) || isNaN(height)) {
+        return
+    }
+
+    if (width > height) {
+        svg.classList.add('wide-svg');
+    }
+}
+
+// Diagrams built with `output: lazy` are empty placeholders with
+// data-puml-src attribute. The SVG is fetched and inlined when
+// the placeholder becomes visible. Hidden placeholders, such as
+// the inactive theme variant, never intersect the viewport, so they
+// are loaded only when the user switches the color scheme.
+function loadDiagram(container) {
+    const src = container.dataset.pumlSrc;
+    delete container.dataset.pumlSrc;
+
+    fetch(src)
+        .then(response => {
+            if (!response.ok) {
+                throw new Error(`${response.status} ${response.statusText}`);
+            }
+            return response.text();
+        })
+        .then(text => {
+            container.innerHTML = text;
+
+            const svg = container.querySelector('.diagram');
+            if (!svg) {
+                return
+            }
+            markWideDiagram(svg);
+            // interaction.js listens to this event
+            svg.dispatchEvent(new CustomEvent('puml:loaded', {bubbles: true}));
+        })
+        .catch(() => loadImage(container, src));
+}
 
-        if (width > height) {
-            svg.classList.add('wide-svg');
+// The diagram can't be fetched, e.g. the page is opened from file://
+// or the request failed. Let the browser load it as an image, and show
+// an error if that fails too.
+function loadImage(container, src) {
+    const img = document.createElement('img');
+    img.className = 'diagram';
+    img.alt = '';
+    img.addEventListener('load', () => markWideDiagram(img), {once: true});
+    img.addEventListener('error', () => {
+        const error = document.createElement('p');
+        error.className = 'failed';
+        error.textContent = 'The diagram failed to load';
+        container.replaceChildren(error);
+    }, {once: true});
+    img.src = src;
+    container.replaceChildren(img);
+}
+
+function observeDiagrams() {
+    const containers = document.querySelectorAll('.puml[data-puml-src]');
+    if (!('IntersectionObserver' in window)) {
+        containers.forEach(loadDiagram);
+        return
+    }
+
+    const observer = new IntersectionObserver(entries => {
+        entries.forEach(entry => {
+            if (!entry.isIntersecting) {
+                return
+            }
+            observer.unobserve(entry.target);
+            loadDiagram(entry.target);
+        });
+    }, {rootMargin: '200px'});
+
+    containers.forEach(container => observer.observe(container));
+}
+
+function processDiagrams() {
+    const svgs = document.querySelectorAll('.puml .diagram');
+    svgs.forEach(svg => {
+        if (svg.tagName.toLowerCase() === 'img' && !svg.complete) {
+            svg.addEventListener('load', () => markWideDiagram(svg), {once: true});
+            return
         }
+        markWideDiagram(svg);
     });
-});
+
+    observeDiagrams();
+}
+
+// This checks if mkdocs-material is installed, use document$.subscribe.
+// Otherwise, add listener to DOMContentLoaded
+if (typeof document$ !== 'undefined' && document$.subscribe){
+    document$.subscribe(processDiagrams);
+} else {
+    document.addEventListener('DOMContentLoaded', processDiagrams);
+}
@@ -1,14 +1,16 @@
 from abc import ABC, abstractmethod
 import dataclasses
+import functools
 import hashlib
+import mmap
 from pathlib import Path
+import sqlite3
+import time
 from typing import Iterable
 import typing
-import uuid
-
-import msgpack
 
 from mkdocs_puml.config import CacheBackend, CacheConfig
+from mkdocs_puml.files import atomic_write, file_lock, file_stamp
 from mkdocs_puml.model import Count, Diagram, ThemeMode
 from mkdocs_puml.puml import Fallback
 
@@ -17,6 +19,12 @@ class AbstractStorage(ABC):
     """PlantUML may take up to several seconds to render
     a single diagram. Storage adds a persistence to the built SVG,
     allowing to use it as a cache for the diagrams.
+
+    Each diagram keeps the time it was last seen in the docs.
+    A diagram that is absent from a build is not deleted by `save`,
+    so partial builds (e.g. `mkdocs serve --dirtyreload`) don't evict
+    diagrams of untouched pages. Old diagrams are removed only
+    by an explicit call of `prune`.
     """
 
     def __init__(self):
@@ -26,6 +34,15 @@ class AbstractStorage(ABC):
         # in the next save(..) iteration
         self.invalid: set[str] = set()
 
+        # the size of SVG images evicted by the last save(..)
+        # to fit the storage into its size limits
+        self.evicted_bytes = 0
+
+        # the number of diagrams added more than once, which
+        # share the key and the SVG image with the first one
+        self.duplicates = 0
+        self._added: set[str] = set()
+
     @abstractmethod
     def add(self, d: Diagram) -> str:  # pragma: no cover
         """Add a diagram to the storage and return
@@ -38,6 +55,13 @@ class AbstractStorage(ABC):
             str: key of the diagram
         """
 
+    def _track(self, key: str):
+        """Count the key as a duplicate if it was already added to the storage"""
+        if key in self._added:
+            self.duplicates += 1
+        else:
+            self._added.add(key)
+
     def update(self, svg: Iterable[tuple[str, typing.Union[str, Fallback]]]):
         """Update a collection of diagrams from an
         iterable of SVG images.
@@ -67,6 +91,24 @@ class AbstractStorage(ABC):
         database, etc
         """
 
+    def close(self):
+        """Release the resources held by the storage, e.g. open files
+        and connections. It's called when the build is finished
+        """
+
+    def prune(self, max_age: float):
+        """Mark diagrams that were not seen in the docs for
+        longer than `max_age` as invalid. They are removed
+        from the persistent storage by the next `save` call.
+
+        Args:
+            max_age (float): maximum age of a diagram in seconds
+        """
+        expire_before = time.time() - max_age
+        for k, v in self.data.items():
+            if v.last_seen is not None and v.last_seen < expire_before:
+                self.invalid.add(k)
+
     def schemes(self) -> dict[str, str]:
         """A dictionary of diagrams that doesn't have SVG
         image rendered for them.
@@ -101,6 +143,14 @@ class AbstractStorage(ABC):
 
         return Count(light, dark)
 
+    def disk_size(self) -> int:
+        """Size of the files of the storage in bytes"""
+        return 0
+
+    def is_rendered(self, key: str) -> bool:
+        """Whether the diagram has an image, without reading the image"""
+        return self.data[key].diagram is not None
+
     def __getitem__(self, key: str) -> Diagram:
         """Get diagram by key"""
         return self.data[key]
@@ -111,17 +161,23 @@ class RAMStorage(AbstractStorage):
     The diagrams are stored in memory only.
 
     It may be useful when user wants to disable caching.
+
+    Diagrams are content-addressed by scheme and theme mode,
+    so identical diagrams of one build are rendered once.
     """
 
     def hash(self, d: Diagram):
-        if d.mode == ThemeMode.LIGHT:
-            return str(uuid.uuid4())
-        elif d.mode == ThemeMode.DARK:
-            return f"{uuid.uuid4()}-dark"
+        h = hashlib.blake2b(d.scheme.encode("utf-8")).hexdigest()
+        if d.mode == ThemeMode.DARK:
+            return f"{h}-dark"
+        return h
 
     def add(self, d: Diagram):
         h = self.hash(d)
-        self.data[h] = d
+        self._track(h)
+
+        if h not in self.data:
+            self.data[h] = d
         return h
 
     def save(self):  # pragma: no coverage
@@ -137,6 +193,10 @@ class FileStorage(AbstractStorage):
 
     `FileStorage` uses `blake2b` as a hasher for diagrams.
 
+    Several builds may share the same storage file. `save` holds an advisory
+    lock on the file, merges the diagrams written by other builds since
+    the file was read, and replaces the file atomically.
+
     Args:
         base_dir (Path): the directory where `FileStorage` stores the file.
         filename (str): name of the file. Defaults to "storage.mpack".
@@ -145,61 +205,484 @@ class FileStorage(AbstractStorage):
                             it possible to keep storage in one place and work
                             with multiple projects. Otherwise, storage will
                             keep the file with data in base_dir as passed
+        max_size (int): maximum size of SVG images in the storage file in bytes.
+                        Other files under ``base_dir`` are not counted.
+                        ``0`` means no limit
+        max_entries (int): maximum number of diagrams in the storage file.
+                           ``0`` means no limit
     """
 
     def __init__(
-        self, base_dir: Path, filename: str = "storage.mpack", join_project_name: bool = True
+        self,
+        base_dir: Path,
+        filename: str = "storage.mpack",
+        join_project_name: bool = True,
+        max_size: int = 0,
+        max_entries: int = 0,
     ):
         super().__init__()
-        dir = base_dir.expanduser()
-
-        if join_project_name:
-            work_dir = Path.cwd().name
-            dir = dir.joinpath(work_dir)
-
-        dir.mkdir(parents=True, exist_ok=True)
-        self.path = dir.joinpath(filename)
+        self.path = _storage_dir(base_dir, join_project_name).joinpath(filename)
+        self.max_size = max_size
+        self.max_entries = max_entries
 
+        # modification time and size of the file when it was read,
+        # used to detect writes of other builds
+        self._stamp: typing.Optional[tuple[int, int]] = None
         self._read_data()
 
-        # This attribute helps in finding invalid diagrams
-        # that don't exists in docs anymore but present in storage.
-        #
-        # During the build self.data will be populated by call of
-        # self.add method. If the key was never added through self.add
-        # method, then this diagram doesn't exist anymore in the docs
-        # and it can be safely deleted from storage.
-        self.invalid = set(self.data.keys())
+    @property
+    def lock_path(self) -> Path:
+        """Path to the lock file of the storage"""
+        return self.path.with_name(f"{self.path.name}.lock")
 
     def hash(self, d: Diagram):
         return hashlib.blake2b(d.scheme.encode("utf-8")).hexdigest()
 
+    def disk_size(self) -> int:
+        return _file_size(self.path)
+
     def add(self, d: Diagram):
         h = self.hash(d)
+        self._track(h)
 
         if h in self.invalid:
             self.invalid.remove(h)
 
         if h not in self.data:
             self.data[h] = d
+        self.data[h].last_seen = int(time.time())
 
         return h
 
     def save(self):
-        with open(self.path, "wb") as f:
+        import msgpack
+
+        with file_lock(self.lock_path):
+            if file_stamp(self.path) != self._stamp:
+                self._merge(self._load())
+            # Evicted after the merge, so the diagrams of other builds count towards the limits
+            self._evict()
+
             to_save = {}
             for k, v in self.data.items():
-                if k not in self.invalid:
+                # Deferred diagrams aren't cached, the next build renders them
+                if k not in self.invalid and v.diagram is not None:
                     to_save[k] = dataclasses.asdict(v)
-            msgpack.dump(to_save, f)
+
+            with atomic_write(self.path) as f:
+                msgpack.dump(to_save, f)
+            self._stamp = file_stamp(self.path)
+
+    def _merge(self, other: dict[str, Diagram]):
+        """Merge diagrams written to the storage file by other builds.
+
+        Diagrams unknown to this build are taken as is. A diagram that
+        is invalid here, but rendered or more recently seen by another
+        build, is restored.
+
+        Args:
+            other (dict[str, Diagram]): diagrams read from the storage file
+        """
+        for k, theirs in other.items():
+            ours = self.data.get(k)
+            if ours is None:
+                self.data[k] = theirs
+                continue
+
+            if (ours.diagram is None or isinstance(ours.diagram, Fallback)) and theirs.diagram is not None:
+                ours.diagram = theirs.diagram
+                self.invalid.discard(k)
+            elif k in self.invalid and (theirs.last_seen or 0) > (ours.last_seen or 0):
+                self.invalid.discard(k)
+
+            ours.last_seen = max(ours.last_seen or 0, theirs.last_seen or 0)
+
+    def _evict(self):
+        """Mark the least recently seen diagrams as invalid until the storage
+        fits into `max_size` and `max_entries`
+        """
+        self.evicted_bytes = 0
+        if not self.max_size and not self.max_entries:
+            return
+
+        # Deferred diagrams are not saved
+        live = [(k, v) for k, v in self.data.items() if k not in self.invalid and v.diagram is not None]
+        sizes = {k: self._size(v) for k, v in live}
+        total_size, total_entries = sum(sizes.values()), len(live)
+
+        for k, _ in sorted(live, key=lambda item: item[1].last_seen or 0):
+            fits_size = not self.max_size or total_size <= self.max_size
+            fits_entries = not self.max_entries or total_entries <= self.max_entries
+            if fits_size and fits_entries:
+                break
+
+            self.invalid.add(k)
+            total_size -= sizes[k]
+            total_entries -= 1
+            self.evicted_bytes += sizes[k]
+
+    def _size(self, d: Diagram) -> int:
+        """Size of the SVG image of the diagram in bytes"""
+        return len(d.diagram.encode("utf-8")) if isinstance(d.diagram, str) else 0
 
     def _read_data(self):
         if not self.path.exists() or self.path.stat().st_size == 0:
             return
 
+        self._stamp = file_stamp(self.path)
+        self.data = self._load()
+
+    def _load(self) -> dict[str, Diagram]:
+        """Read diagrams from the storage file"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {}
+
+        # msgpack is imported on first use, so it's not loaded by builds without the file cache
+        import msgpack
+
+        with open(self.path, "rb") as f:
+            raw = msgpack.load(f)
+            # Deferred diagrams written by earlier versions are skipped
+            data = {k: Diagram(**v) for k, v in raw.items() if v["diagram"] is not None}
+
+        # Diagrams saved before last_seen was introduced
+        # start their lifetime from now
+        now = int(time.time())
+        for v in data.values():
+            if v.last_seen is None:
+                v.last_seen = now
+        return data
+
+
+@dataclasses.dataclass(frozen=True)
+class _Slice:
+    """Position of an SVG image in the data file of `MappedFileStorage`"""
+
+    offset: int
+    length: int
+
+
+class MappedFileStorage(FileStorage):
+    """`MappedFileStorage` keeps only an index of cached diagrams in memory.
+
+    The SVG images are appended to a separate data file, and the index
+    maps a diagram key to the position of its image in this file. The data
+    file is memory-mapped, so an image is read only when the diagram is
+    requested by `__getitem__`. A small LRU cache keeps the recently decoded
+    images. The data file is compacted when it contains more unused bytes
+    than used ones.
+
+    Args:
+        base_dir (Path): the directory where `MappedFileStorage` stores the files.
+        filename (str): name of the index file. Defaults to "mapped.mpack".
+                        The data file has the same name with ".svgs" suffix.
+        join_project_name (bool): if set to true, the storage will join current
+                            working directory name to the storage path
+        max_size (int): maximum size of SVG images in the storage in bytes
+        max_entries (int): maximum number of diagrams in the storage
+        lru_size (int): the number of decoded SVG images to keep in memory
+    """
+
+    def __init__(
+        self,
+        base_dir: Path,
+        filename: str = "mapped.mpack",
+        join_project_name: bool = True,
+        max_size: int = 0,
+        max_entries: int = 0,
+        lru_size: int = 32,
+    ):
+        self._mmap: typing.Optional[mmap.mmap] = None
+        self._read = functools.lru_cache(maxsize=lru_size)(self._read_slice)
+        super().__init__(base_dir, filename, join_project_name, max_size, max_entries)
+
+    @property
+    def data_path(self) -> Path:
+        """Path to the file with SVG images"""
+        return self.path.with_suffix(".svgs")
+
+    def disk_size(self) -> int:
+        return _file_size(self.path) + _file_size(self.data_path)
+
+    def add(self, d: Diagram):
+        h = super().add(d)
+
+        # The index doesn't keep schemes of the cached diagrams
+        self.data[h].scheme = d.scheme
+        return h
+
+    def save(self):
+        import msgpack
+
+        with file_lock(self.lock_path):
+            if file_stamp(self.path) != self._stamp:
+                self._merge(self._load())
+            # Evicted after the merge, so the diagrams of other builds count towards the limits
+            self._evict()
+
+            live = {k: v for k, v in self.data.items() if k not in self.invalid}
+            live_bytes = sum(v.diagram.length for v in live.values() if isinstance(v.diagram, _Slice))
+            size = len(self._mmap) if self._mmap is not None else 0
+
+            if size - live_bytes > live_bytes:
+                index = self._compact(live)
+            else:
+                index = self._append(live, size)
+
+            with atomic_write(self.path) as f:
+                msgpack.dump(index, f)
+            self._stamp = file_stamp(self.path)
+
+        self._open()
+
+    def __getitem__(self, key: str) -> Diagram:
+        """Get diagram by key, reading its SVG image from the data file if needed"""
+        d = self.data[key]
+        if isinstance(d.diagram, _Slice):
+            return Diagram(d.scheme, d.mode, self._read(d.diagram))
+        return d
+
+    def _merge(self, other: dict[str, Diagram]):
+        """Merge the index written by other builds.
+
+        Another build may have compacted the data file, so the positions
+        of the diagrams known to both builds are taken from the new index.
+        The images of the other diagrams are read from the current mapping
+        before the data file is mapped again.
+        """
+        for k, ours in self.data.items():
+            if not isinstance(ours.diagram, _Slice):
+                continue
+
+            theirs = other.get(k)
+            if theirs is not None:
+                ours.diagram = theirs.diagram
+            elif k not in self.invalid:
+                ours.diagram = self._read_slice(ours.diagram)
+
+        super()._merge(other)
+        self._open()
+
+    def _size(self, d: Diagram) -> int:
+        if isinstance(d.diagram, _Slice):
+            return d.diagram.length
+        return super()._size(d)
+
+    def _append(self, live: dict[str, Diagram], size: int) -> dict:
+        """Append new SVG images to the end of the data file"""
+        index = {}
+        with open(self.data_path, "ab") as f:
+            for k, v in live.items():
+                if isinstance(v.diagram, str):
+                    content = v.diagram.encode("utf-8")
+                    f.write(content)
+                    v.diagram = _Slice(size, len(content))
+                    size += len(content)
+                if isinstance(v.diagram, _Slice):
+                    index[k] = [v.mode, v.diagram.offset, v.diagram.length, v.last_seen]
+        return index
+
+    def _compact(self, live: dict[str, Diagram]) -> dict:
+        """Rewrite the data file keeping only the SVG images of live diagrams"""
+        index = {}
+        size = 0
+        with atomic_write(self.data_path) as f:
+            for k, v in live.items():
+                if isinstance(v.diagram, _Slice):
+                    content = self._mmap[v.diagram.offset:v.diagram.offset + v.diagram.length]
+                elif isinstance(v.diagram, str):
+                    content = v.diagram.encode("utf-8")
+                else:
+                    continue
+                f.write(content)
+                v.diagram = _Slice(size, len(content))
+                index[k] = [v.mode, size, len(content), v.last_seen]
+                size += len(content)
+
+            # The data file can't be replaced while it's mapped on some platforms
+            self._close()
+        return index
+
+    def _read_data(self):
+        self._stamp = file_stamp(self.path)
+        self._open()
+        if self._mmap is None:
+            return
+        self.data = self._load()
+
+    def _load(self) -> dict[str, Diagram]:
+        """Read the index of the diagrams"""
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return {}
+
+        import msgpack
+
         with open(self.path, "rb") as f:
             raw = msgpack.load(f)
-            self.data = {k: Diagram(**v) for k, v in raw.items()}
+            return {
+                k: Diagram("", mode, _Slice(offset, length), last_seen)
+                for k, (mode, offset, length, last_seen) in raw.items()
+            }
+
+    def _open(self):
+        """Memory-map the data file"""
+        self._close()
+        if not self.data_path.exists() or self.data_path.stat().st_size == 0:
+            return
+
+        with open(self.data_path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        self._close()
+
+    def _close(self):
+        self._read.cache_clear()
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def _read_slice(self, s: _Slice) -> str:
+        return self._mmap[s.offset:s.offset + s.length].decode("utf-8")
+
+
+class SQLiteStorage(AbstractStorage):
+    """`SQLiteStorage` handles diagrams stored in an SQLite database.
+
+    Unlike `FileStorage`, it doesn't load the whole cache into memory.
+    A diagram is looked up by its key when it's added to the storage,
+    and `save` writes only the diagrams rendered during the build.
+    Pruned diagrams are deleted with a single query using an index
+    on the last seen time.
+
+    `SQLiteStorage` uses `blake2b` as a hasher for diagrams.
+
+    Args:
+        base_dir (Path): the directory where `SQLiteStorage` stores the database.
+        filename (str): name of the database file. Defaults to "storage.sqlite3".
+        join_project_name (bool): if set to true, the storage will join current
+                            working directory name to the storage path making
+                            it possible to keep storage in one place and work
+                            with multiple projects. Otherwise, storage will
+                            keep the database in base_dir as passed
+
+    Attributes:
+        touch_interval (int): last seen time of a cached diagram is written
+                              to the database only if it's older than this
+                              number of seconds. It saves writes of unchanged rows.
+    """
+
+    touch_interval = 3600
+
+    def __init__(
+        self, base_dir: Path, filename: str = "storage.sqlite3", join_project_name: bool = True
+    ):
+        super().__init__()
+        self.path = _storage_dir(base_dir, join_project_name).joinpath(filename)
+
+        self.connection = sqlite3.connect(self.path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS diagrams ("
+            "key TEXT PRIMARY KEY, mode TEXT NOT NULL, diagram TEXT NOT NULL, last_seen INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS diagrams_last_seen ON diagrams (last_seen)"
+        )
+        self.connection.commit()
+
+        # Keys of the diagrams that were loaded from the database
+        # mapped to their last seen time stored in the database.
+        # They don't need to be written again in save(..)
+        self.cached: dict[str, int] = {}
+        self.expire_before: typing.Optional[float] = None
+
+    def hash(self, d: Diagram):
+        return hashlib.blake2b(d.scheme.encode("utf-8")).hexdigest()
+
+    def disk_size(self) -> int:
+        return _file_size(self.path) + _file_size(self.path.with_name(f"{self.path.name}-wal"))
+
+    def add(self, d: Diagram):
+        h = self.hash(d)
+        self._track(h)
+
+        if h not in self.data:
+            row = self.connection.execute(
+                "SELECT diagram, last_seen FROM diagrams WHERE key = ?", (h,)
+            ).fetchone()
+            if row is not None:
+                d.diagram = row[0]
+                self.cached[h] = row[1]
+            self.data[h] = d
+        self.data[h].last_seen = int(time.time())
+
+        return h
+
+    def prune(self, max_age: float):
+        """Remember the age limit. Diagrams that were not seen
+        for longer than `max_age` are deleted in the next `save` call.
+
+        Args:
+            max_age (float): maximum age of a diagram in seconds
+        """
+        self.expire_before = time.time() - max_age
+
+    def save(self):
+        to_save = [
+            (k, v.mode, v.diagram, v.last_seen)
+            for k, v in self.data.items()
+            if k not in self.cached and k not in self.invalid and isinstance(v.diagram, str)
+        ]
+        to_touch = [
+            (self.data[k].last_seen, k)
+            for k, last_seen in self.cached.items()
+            if self.data[k].last_seen - last_seen > self.touch_interval
+        ]
+
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO diagrams (key, mode, diagram, last_seen) VALUES (?, ?, ?, ?)",
+                to_save,
+            )
+            self.connection.executemany("UPDATE diagrams SET last_seen = ? WHERE key = ?", to_touch)
+
+            if self.expire_before is not None:
+                self.connection.execute(
+                    "DELETE FROM diagrams WHERE last_seen < ?", (self.expire_before,)
+                )
+
+        self.cached.update((k, last_seen) for k, _, _, last_seen in to_save)
+        self.cached.update((k, last_seen) for last_seen, k in to_touch)
+
+    def close(self):
+        self.connection.close()
+
+
+def _file_size(path: Path) -> int:
+    stamp = file_stamp(path)
+    return stamp[1] if stamp is not None else 0
+
+
+def _storage_dir(base_dir: Path, join_project_name: bool) -> Path:
+    """Create the directory for a storage file.
+
+    Args:
+        base_dir (Path): base directory of the storage
+        join_project_name (bool): join current working directory name to the base directory
+
+    Returns:
+        Path: the directory where a storage keeps its files
+    """
+    dir = base_dir.expanduser()
+
+    if join_project_name:
+        work_dir = Path.cwd().name
+        dir = dir.joinpath(work_dir)
+
+    dir.mkdir(parents=True, exist_ok=True)
+    return dir
 
 
 def build_storage(config: CacheConfig) -> AbstractStorage:
@@ -209,11 +692,27 @@ def build_storage(config: CacheConfig) -> AbstractStorage:
     Cache backend:
 
     * `disabled` — build `RAMStorage` instance
-    * `local` — build `FileStorage` instance
+    * `local` — build `FileStorage` instance, or `MappedFileStorage` if `lazy` is set
+    * `sqlite` — build `SQLiteStorage` instance
     """
     if config.backend == CacheBackend.DISABLED.value:
         return RAMStorage()
+    elif config.backend == CacheBackend.LOCAL.value and config.local.lazy:
+        return MappedFileStorage(
+            Path(config.local.path),
+            join_project_name=config.local.join_project_name,
+            max_size=config.local.max_size * 1024 * 1024,
+            max_entries=config.local.max_entries,
+            lru_size=config.local.lru_size,
+        )
     elif config.backend == CacheBackend.LOCAL.value:
         return FileStorage(
-            Path(config.local.path), join_project_name=config.local.join_project_name
+            Path(config.local.path),
+            join_project_name=config.local.join_project_name,
+            max_size=config.local.max_size * 1024 * 1024,
+            max_entries=config.local.max_entries,
+        )
+    elif config.backend == CacheBackend.SQLITE.value:
+        return SQLiteStorage(
+            Path(config.sqlite.path), join_project_name=config.sqlite.join_project_name
         )
@@ -0,0 +1,123 @@
+import asyncio
+from concurrent.futures import Executor, Future, TimeoutError
+import threading
+import time
+import typing
+
+from mkdocs_puml.puml import Fallback, PlantUML
+from mkdocs_puml.retry import RetryBudget
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from httpx import AsyncClient
+
+
+class StreamingRenderer:
+    """`StreamingRenderer` sends diagrams to PlantUML server while
+    mkdocs is still parsing markdown pages.
+
+    It runs an event loop in a background thread. Each submitted diagram is
+    rendered right away, so network time overlaps with page processing.
+    The results are collected by ``translate`` which waits only for the
+    diagrams that are still in flight.
+
+    Args:
+        puml (PlantUML): PlantUML converter used to render diagrams
+
+    Examples:
+        Use this class as::
+
+            renderer = StreamingRenderer(PlantUML("https://www.plantuml.com"))
+            renderer.submit(key, diagram)
+            svgs = renderer.translate({key: diagram})
+            renderer.close()
+    """
+
+    def __init__(self, puml: PlantUML):
+        self.puml = puml
+
+        self._futures: dict[str, Future] = {}
+        self._client: typing.Optional["AsyncClient"] = None
+        self._semaphore: typing.Optional[asyncio.Semaphore] = None
+        self._budget: typing.Optional[RetryBudget] = None
+        self._executor: typing.Optional[Executor] = puml.build_executor()
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="mkdocs_puml-renderer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, key: str, scheme: str):
+        """Start rendering a diagram in the background.
+        A key that was already submitted is ignored.
+
+        Args:
+            key (str): key of the diagram in a storage
+            scheme (str): string representation of PUML diagram
+        """
+        if key in self._futures:
+            return
+
+        self._futures[key] = asyncio.run_coroutine_threadsafe(
+            self._render(scheme), self._loop
+        )
+
+    def translate(
+        self, schemes: dict[str, str], timeout: typing.Optional[float] = None
+    ) -> list[typing.Optional[typing.Union[str, Fallback]]]:
+        """Wait for the diagrams to be rendered. The diagrams that were not
+        submitted before are submitted now.
+
+        Args:
+            schemes (dict[str, str]): dictionary where key is diagram key
+                                      and value is diagram scheme
+            timeout (float | None): seconds to wait for all diagrams. The diagrams
+                                    that are not rendered in time are cancelled
+
+        Returns:
+            list[str | Fallback | None]: SVG images ordered as ``schemes``,
+                                         ``None`` for the cancelled ones
+        """
+        for k, v in schemes.items():
+            self.submit(k, v)
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        results = []
+        for k in schemes:
+            future = self._futures[k]
+            try:
+                results.append(
+                    future.result(None if deadline is None else max(deadline - time.monotonic(), 0))
+                )
+            except TimeoutError:
+                future.cancel()
+                results.append(None)
+        return results
+
+    def close(self):
+        """Close the HTTP client and stop the background thread"""
+        if self._loop.is_closed():
+            return
+
+        asyncio.run_coroutine_threadsafe(self._close_client(), self._loop).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+
+        if self._executor is not None:
+            self._executor.shutdown()
+
+    async def _render(self, scheme: str) -> typing.Union[str, Fallback]:
+        # asyncio primitives must be created inside the running loop
+        if self._client is None:
+            self._client = self.puml.build_client()
+            self._semaphore = asyncio.Semaphore(self.puml.max_concurrency)
+            self._budget = self.puml.budget if self.puml.budget is not None else self.puml.retry.new_budget()
+
+        return await self.puml.translate_one(
+            scheme, self._client, self._semaphore, self._budget, self._executor
+        )
+
+    async def _close_client(self):
+        if self._client is not None:
+            await self._client.aclose()
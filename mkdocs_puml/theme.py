@@ -1,8 +1,16 @@
+from pathlib import Path
 import re
+import typing
+
+from mkdocs_puml.include import Includer
 from mkdocs_puml.utils import sanitize_url
 
 C4_REGEX = re.compile(r"(!include(?:.+)(?:[Cc]4)(?:.+).puml)")
 
+# Themes shipped with the package. The wheel installs them next to the package,
+# where they are in the repository too
+THEMES_DIR = Path(__file__).parent.parent.joinpath("themes")
+
 
 class Theme:
     """Theme class helps integrate available themes into PlantUML code.
@@ -10,12 +18,25 @@ class Theme:
     Theme includes theme url after all C4 inclusions. It makes possible
     to provide custom styling to C4 code as well.
 
+    If ``path`` is set, the content of the theme file is inlined into
+    the diagram instead of ``!include`` statement, so PlantUML server
+    doesn't download the theme for every diagram.
+
     Args:
         url (str): repository of themes
+        path (Path | None): local directory of themes
+        includer (Includer | None): includer that reads and caches theme files
     """
 
-    def __init__(self, url: str):
+    def __init__(
+        self,
+        url: str,
+        path: typing.Optional[Path] = None,
+        includer: typing.Optional[Includer] = None,
+    ):
         self.url = sanitize_url(url)
+        self.path = path
+        self.includer = includer if includer is not None else Includer()
 
     def include(self, theme: str, diagram: str) -> str:
         """Includes theme to the beginning of PlantUML diagram
@@ -29,7 +50,7 @@ class Theme:
         """
         diagram = diagram.strip()
         with_c4 = C4_REGEX.split(diagram)
-        url = self.url_for(theme)
+        statement = self.statement_for(theme)
 
         if len(with_c4) == 1:
             if diagram.startswith("@startuml"):
@@ -38,14 +59,28 @@ class Theme:
                 head, tail = None, diagram
 
             if head:
-                return f"{head}\n!include {url}\n{tail}"
-            return f"!include {url}\n{tail}"
+                return f"{head}\n{statement}\n{tail}"
+            return f"{statement}\n{tail}"
         else:
             tail = with_c4[-1]
-            with_c4[-1] = f"\n!include {url}"
+            with_c4[-1] = f"\n{statement}"
             with_c4.append(tail)
             return "".join(with_c4)
 
+    def statement_for(self, theme: str) -> str:
+        """Create the code that applies theme to a diagram:
+        either ``!include`` statement or the content of the theme file
+
+        Args:
+            theme (str): theme name
+
+        Returns:
+            str: PlantUML code of the theme
+        """
+        if self.path is None:
+            return f"!include {self.url_for(theme)}"
+        return self.includer.read(self.path_for(theme))
+
     def url_for(self, theme: str) -> str:
         """Create full url for theme
 
@@ -56,3 +91,14 @@ class Theme:
             str: full url for theme
         """
         return f"{self.url}{theme}.puml"
+
+    def path_for(self, theme: str) -> Path:
+        """Create full path for theme in the local directory
+
+        Args:
+            theme (str): theme name
+
+        Returns:
+            Path: full path to theme file
+        """
+        return self.path.joinpath(f"{theme}.puml")
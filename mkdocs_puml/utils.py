@@ -1,3 +1,10 @@
+from contextlib import nullcontext
+import typing
+
+if typing.TYPE_CHECKING:  # pragma: no cover
+    from rich.console import Console
+
+
 def sanitize_url(url: str) -> str:
     """Converts a url to a normalized state.
 
@@ -12,3 +19,48 @@ def sanitize_url(url: str) -> str:
         str: sanitized url
     """
     return url if url.endswith("/") else f"{url}/"
+
+
+def format_size(size: int) -> str:
+    """Converts a size in bytes to a human-readable string.
+
+    Args:
+        size (int): size in bytes
+
+    Returns:
+        str: size with a unit, e.g. ``1.5 MB``
+    """
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+
+class QuietConsole:
+    """Stand-in for ``rich.console.Console`` that prints nothing.
+    It's used when ``verbose`` is disabled, so rich is not imported at all
+    """
+
+    def status(self, *args, **kwargs) -> typing.ContextManager:
+        return nullcontext()
+
+    def print(self, *args, **kwargs):
+        pass
+
+
+def build_console(verbose: bool) -> typing.Union["Console", QuietConsole]:
+    """Create the console to display status messages.
+
+    Args:
+        verbose (bool): whether the messages are displayed
+
+    Returns:
+        Console | QuietConsole: rich console or a stand-in that prints nothing
+    """
+    if not verbose:
+        return QuietConsole()
+
+    from rich.console import Console
+
+    return Console()
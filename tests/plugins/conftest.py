@@ -6,7 +6,18 @@ import pytest
 
 from uuid import UUID
 
-from mkdocs_puml.config import CacheConfig, InteractionConfig, LocalCacheConfig, PlantUMLConfig, ThemeConfig
+from mkdocs_puml.config import (
+    CacheConfig,
+    InteractionConfig,
+    LocalCacheConfig,
+    MetricsConfig,
+    PlantUMLConfig,
+    ProcessRendererConfig,
+    ProfileConfig,
+    ReportConfig,
+    RetryConfig,
+    ThemeConfig,
+)
 from mkdocs_puml.model import ThemeMode
 from mkdocs_puml.plugin import Diagram, PlantUMLPlugin
 from tests.conftest import BASE_PUML_URL, TESTDATA_DIR
@@ -47,6 +58,21 @@ def plugin_config() -> PlantUMLConfig:
 
     inter = InteractionConfig()
     inter.load_dict({"enabled": True})
+
+    retry = RetryConfig()
+    retry.load_dict({"attempts": 3, "backoff_factor": 0, "backoff_max": 0, "budget": 100})
+
+    process = ProcessRendererConfig()
+    process.load_dict({"command": "plantuml -tsvg -pipe"})
+
+    report = ReportConfig()
+    report.load_dict({"enabled": False, "path": "", "top": 5})
+
+    metrics = MetricsConfig()
+    metrics.load_dict({"enabled": False, "path": "", "format": "openmetrics"})
+
+    profile = ProfileConfig()
+    profile.load_dict({"enabled": False, "path": ""})
     c.load_dict(
         {
             "puml_url": BASE_PUML_URL,
@@ -55,7 +81,12 @@ def plugin_config() -> PlantUMLConfig:
             "theme": t,
             "cache": cache,
             "request_timeout": 40,
-            "interaction": inter
+            "interaction": inter,
+            "retry": retry,
+            "process": process,
+            "report": report,
+            "metrics": metrics,
+            "profile": profile,
         }
     )
     return c
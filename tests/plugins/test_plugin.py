@@ -1,13 +1,22 @@
+import json
 import os
+import sqlite3
+import sys
+from unittest.mock import MagicMock
 
 import pytest
+from mkdocs.exceptions import PluginError
+from mkdocs_puml.config import SQLiteCacheConfig
 from mkdocs_puml.model import Count
-from mkdocs_puml.storage import FileStorage, RAMStorage
+from mkdocs_puml.palette import load_palette
+from mkdocs_puml.storage import FileStorage, MappedFileStorage, RAMStorage, SQLiteStorage
 from mkdocs_puml.plugin import PlantUMLPlugin, ThemeMode
 from mkdocs_puml.puml import Fallback, PlantUML
-from mkdocs_puml.theme import Theme
-from tests.conftest import BASE_PUML_KEYWORD, CUSTOM_PUML_KEYWORD
-from tests.plugins.conftest import is_uuid_valid, patch_plugin_to_single_theme
+from mkdocs_puml.renderers import ProcessRenderer
+from mkdocs_puml.streaming import StreamingRenderer
+from mkdocs_puml.theme import THEMES_DIR, Theme
+from tests.plugins.conftest import patch_plugin_to_single_theme
+from tests.conftest import BASE_PUML_KEYWORD, CUSTOM_PUML_KEYWORD, TESTDATA_DIR
 
 
 def test_on_config(plugin_config):
@@ -30,6 +39,7 @@ def test_on_config(plugin_config):
     assert "assets/mkdocs_puml/interaction.js" in plugin_config["extra_javascript"]
 
     assert plugin.puml.timeout == plugin_config.request_timeout
+    assert plugin.puml.max_concurrency == plugin_config.max_concurrency
 
 
 def test_on_config_theme_disabled(plugin_config):
@@ -59,6 +69,102 @@ def test_on_config_file_storage(plugin_config, patch_path_mkdir):
     assert isinstance(plugin.storage, FileStorage)
 
 
+def test_on_config_mapped_file_storage(plugin_config, tmp_path):
+    plugin = PlantUMLPlugin()
+    plugin.config = plugin_config
+    plugin_config.cache.backend = "local"
+    plugin_config.cache.local.load_dict({"path": str(tmp_path), "join_project_name": False, "lazy": True})
+
+    plugin.on_config(plugin_config)
+
+    assert isinstance(plugin.storage, MappedFileStorage)
+
+
+def test_on_config_sqlite_storage(plugin_config, tmp_path):
+    plugin = PlantUMLPlugin()
+    plugin.config = plugin_config
+    plugin_config.cache.backend = "sqlite"
+    plugin_config.cache.sqlite = SQLiteCacheConfig()
+    plugin_config.cache.sqlite.load_dict({"path": str(tmp_path), "join_project_name": False})
+
+    plugin.on_config(plugin_config)
+
+    assert isinstance(plugin.storage, SQLiteStorage)
+    connection = plugin.storage.connection
+
+    plugin.on_post_build({"site_dir": str(tmp_path.joinpath("site"))})
+
+    # The connection is closed after the build
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+
+
+def test_on_build_error_closes_storage(plugin_config, tmp_path):
+    plugin = PlantUMLPlugin()
+    plugin.config = plugin_config
+    plugin_config.cache.backend = "sqlite"
+    plugin_config.cache.sqlite = SQLiteCacheConfig()
+    plugin_config.cache.sqlite.load_dict({"path": str(tmp_path), "join_project_name": False})
+    plugin.on_config(plugin_config)
+    connection = plugin.storage.connection
+
+    plugin.on_build_error(RuntimeError())
+
+    assert plugin.storage is None
+    with pytest.raises(sqlite3.ProgrammingError):
+        connection.execute("SELECT 1")
+
+
+def test_on_config_renderer(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.renderer = "process"
+    plugin_config.streaming = True
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert isinstance(plugin.puml, ProcessRenderer)
+    assert plugin.puml.command == ["plantuml", "-tsvg", "-pipe"]
+    # Streaming requires a PlantUML server
+    assert plugin.streamer is None
+
+
+def test_on_config_unknown_renderer(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.renderer = "unknown"
+    plugin.config = plugin_config
+
+    with pytest.raises(PluginError):
+        plugin.on_config(plugin_config)
+
+
+def test_on_env_process_renderer(plant_uml_plugin, diagrams_dict, plugin_environment):
+    plant_uml_plugin.config.renderer = "process"
+    plant_uml_plugin.config.process.command = f"{sys.executable} {TESTDATA_DIR.joinpath('fake_plantuml.py')}"
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+
+    plant_uml_plugin.storage.data = diagrams_dict
+    plant_uml_plugin.on_env(plugin_environment)
+
+    for _, diagram in plant_uml_plugin.storage.items():
+        assert diagram.diagram.startswith("<svg")
+
+
+def test_on_env_pipe_renderer(plant_uml_plugin, diagrams_dict, plugin_environment):
+    plant_uml_plugin.config.renderer = "pipe"
+    plant_uml_plugin.config.num_workers = 1
+    plant_uml_plugin.config.process.command = f"{sys.executable} {TESTDATA_DIR.joinpath('fake_plantuml_pipe.py')}"
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+
+    plant_uml_plugin.storage.data = diagrams_dict
+    plant_uml_plugin.on_env(plugin_environment)
+
+    for _, diagram in plant_uml_plugin.storage.items():
+        assert diagram.diagram.startswith("<svg")
+    # The processes are stopped when the diagrams are built
+    assert plant_uml_plugin.puml._idle == []
+
+
 def test_on_config_interaction_disabled(plugin_config):
     plugin_config.interaction.enabled = False
 
@@ -88,8 +194,8 @@ def test_on_page_markdown_single_theme(plant_uml_plugin, md_lines):
 
     assert len(plant_uml_plugin.storage.items()) == 2
 
-    for key in plant_uml_plugin.storage.keys():
-        assert is_uuid_valid(key)
+    for key, val in plant_uml_plugin.storage.items():
+        assert key == plant_uml_plugin.storage.hash(val)
 
     for val in plant_uml_plugin.storage.schemes().values():
         assert "@startuml" in val and "@enduml" in val
@@ -101,12 +207,8 @@ def test_on_page_markdown_dual_themes(plant_uml_plugin, md_lines):
     assert len(plant_uml_plugin.storage.keys()) == 4
 
     for key, val in plant_uml_plugin.storage.items():
-        if val.mode == ThemeMode.LIGHT:
-            assert is_uuid_valid(key)
-        else:
-            uuid_key, _, dark = key.rpartition("-")
-            assert is_uuid_valid(uuid_key)
-            assert dark == "dark"
+        assert key == plant_uml_plugin.storage.hash(val)
+        assert key.endswith("-dark") == (val.mode == ThemeMode.DARK)
 
     for val in plant_uml_plugin.storage.schemes().values():
         assert "@startuml" in val and "@enduml" in val
@@ -122,6 +224,79 @@ def test_on_page_markdown_custom_keyword(plant_uml_plugin, md_lines):
     )  # 2 (light / dark) on each diagram
 
 
+def test_on_config_inline_theme(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.theme.inline = True
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert plugin.themer.path == THEMES_DIR
+    assert "!include" not in plugin.themer.include("default/light", "Bob -> Alice")
+
+
+def test_on_config_inline_theme_missing(plugin_config, tmp_path):
+    plugin = PlantUMLPlugin()
+    plugin_config.theme.inline = True
+    plugin_config.theme.path = str(tmp_path)
+    plugin.config = plugin_config
+
+    with pytest.raises(PluginError):
+        plugin.on_config(plugin_config)
+
+
+def test_on_config_client_render_inline_theme(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.theme.inline = True
+    plugin_config.client_render = True
+    plugin.config = plugin_config
+
+    with pytest.raises(PluginError):
+        plugin.on_config(plugin_config)
+
+
+def test_on_page_markdown_inline_includes(plant_uml_plugin, tmp_path):
+    patch_plugin_to_single_theme(plant_uml_plugin)
+    plant_uml_plugin.config.inline_includes = True
+    tmp_path.joinpath("styles.puml").write_text("skinparam monochrome true")
+    page = MagicMock()
+    page.file.abs_src_path = str(tmp_path.joinpath("index.md"))
+
+    plant_uml_plugin.on_page_markdown(
+        "```puml\n@startuml\n!include styles.puml\nBob -> Alice\n@enduml\n```", page=page
+    )
+
+    (diagram,) = plant_uml_plugin.storage.data.values()
+    assert "skinparam monochrome true" in diagram.scheme
+    assert "!include" not in diagram.scheme
+
+
+def test_on_page_markdown_repeated(plant_uml_plugin, diagram_and_encoded):
+    block = f"```puml\n{diagram_and_encoded[0]}\n```"
+    markdown = plant_uml_plugin.on_page_markdown(f"{block}\n\ntext\n\n{block}")
+
+    assert "```" not in markdown
+    assert markdown.count("puml-container") == 2
+    assert "text" in markdown
+
+    # Identical diagrams share the keys
+    assert len(plant_uml_plugin.storage.keys()) == 2
+    assert plant_uml_plugin.storage.duplicates == 2
+
+
+def test_on_env_duplicates(mock_requests, plant_uml_plugin, diagram_and_encoded, plugin_environment):
+    patch_plugin_to_single_theme(plant_uml_plugin)
+    block = f"```puml\n{diagram_and_encoded[0]}\n```"
+    plant_uml_plugin.on_page_markdown(block)
+    plant_uml_plugin.on_page_markdown(block)
+    mock_requests(1)
+
+    plant_uml_plugin.on_env(plugin_environment)
+
+    (diagram,) = plant_uml_plugin.storage.data.values()
+    assert diagram.diagram.startswith("<svg")
+
+
 def test_on_env(mock_requests, plant_uml_plugin, diagrams_dict, plugin_environment):
     mock_requests(len(diagrams_dict))
 
@@ -146,6 +321,168 @@ def test_on_env_fallback(
     assert len(plant_uml_plugin.storage.invalid) == len(diagrams_dict)
 
 
+def test_on_env_offline(httpx_mock, plant_uml_plugin, diagrams_dict, plugin_environment, svg_diagram):
+    plant_uml_plugin.config.mode = "offline"
+    plant_uml_plugin.storage.data = diagrams_dict
+    cached_key, *deferred_keys = diagrams_dict.keys()
+    diagrams_dict[cached_key].diagram = svg_diagram
+
+    plant_uml_plugin.on_env(plugin_environment)
+
+    # Nothing is requested, the diagrams stay unrendered for the next build
+    assert httpx_mock.get_requests() == []
+    assert plant_uml_plugin.storage[cached_key].diagram == svg_diagram
+    for key in deferred_keys:
+        assert plant_uml_plugin.storage[key].diagram is None
+    assert plant_uml_plugin.storage.invalid == set()
+
+
+def test_on_post_page_deferred(plant_uml_plugin, diagrams_dict):
+    plant_uml_plugin.storage.data = diagrams_dict
+    key = list(diagrams_dict.keys())[0]
+    pre = f'<pre class="{PlantUMLPlugin.pre_class_name}">{key}</pre>'
+
+    output = plant_uml_plugin.on_post_page(pre, MagicMock())
+    assert '<p class="deferred">' in output
+
+    plant_uml_plugin.config.client_render = True
+    output = plant_uml_plugin.on_post_page(pre, MagicMock())
+    assert f'<img class="diagram" src="{plant_uml_plugin.puml.url_for(diagrams_dict[key].scheme)}"' in output
+
+
+def test_on_config_offline_streaming(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.streaming = True
+    plugin_config.mode = "offline"
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert plugin.streamer is None
+
+
+def test_on_config_streaming(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.streaming = True
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert isinstance(plugin.streamer, StreamingRenderer)
+    plugin.on_build_error(RuntimeError())
+    assert plugin.streamer is None
+
+
+def test_on_env_streaming(mock_requests, plant_uml_plugin, md_lines, plugin_environment):
+    plant_uml_plugin.config.streaming = True
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+    mock_requests(4)
+
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+
+    # Diagrams were submitted while the page was being parsed
+    assert len(plant_uml_plugin.streamer._futures) == 4
+
+    plant_uml_plugin.on_env(plugin_environment)
+
+    assert plant_uml_plugin.streamer is None
+    for _, diagram in plant_uml_plugin.storage.items():
+        assert diagram.diagram.startswith("<svg")
+
+
+def test_on_page_markdown_streaming_cached(monkeypatch, plant_uml_plugin, md_lines, svg_diagram):
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+    plant_uml_plugin.storage.update((k, svg_diagram) for k in plant_uml_plugin.storage.keys())
+    plant_uml_plugin.streamer = StreamingRenderer(plant_uml_plugin.puml)
+    getitem = MagicMock(side_effect=AssertionError("The image of a cached diagram is read"))
+    monkeypatch.setattr(RAMStorage, "__getitem__", getitem)
+
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+
+    assert plant_uml_plugin.streamer._futures == {}
+    plant_uml_plugin.streamer.close()
+
+
+def test_on_config_retry_budget(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.retry.budget = 7
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert plugin.puml.budget.left == 7
+
+
+def test_on_config_recolor_unsupported(plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.theme.recolor = True
+    plugin_config.theme.light = "custom/light"
+    plugin.config = plugin_config
+
+    plugin.on_config(plugin_config)
+
+    assert plugin.palette is None
+
+
+def test_on_env_recolor(mock_requests, httpx_mock, plant_uml_plugin, md_lines, plugin_environment):
+    plant_uml_plugin.config.theme.recolor = True
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+    # The shipped palette of the default themes
+    assert plant_uml_plugin.palette == load_palette("default/light", "default/dark")
+    mock_requests(2)
+
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+    plant_uml_plugin.on_env(plugin_environment)
+
+    # Only light diagrams are requested
+    assert len(httpx_mock.get_requests()) == 2
+    assert len(plant_uml_plugin.derived) == 2
+    for key in plant_uml_plugin.derived:
+        diagram = plant_uml_plugin.storage[key].diagram
+        assert diagram.startswith("<svg")
+        assert "background:#1b1b1b;" in diagram
+
+
+def test_on_env_recolor_unknown_color(mock_requests, plant_uml_plugin, md_lines, plugin_environment):
+    plant_uml_plugin.config.theme.recolor = True
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+    plant_uml_plugin.palette = {}
+    # Dark diagrams that can't be recolored are requested from the server
+    mock_requests(4)
+
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+    plant_uml_plugin.on_env(plugin_environment)
+
+    for _, diagram in plant_uml_plugin.storage.items():
+        assert diagram.diagram.startswith("<svg")
+
+
+def test_store_dual_colored_diagram(plant_uml_plugin):
+    plant_uml_plugin.config.theme.recolor = True
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+
+    plant_uml_plugin.on_page_markdown("```puml\nBob -> Alice #LightBlue : hello\n```\n")
+
+    # The dark diagram is rendered by the server together with the light one
+    assert plant_uml_plugin.derived == {}
+
+
+def test_on_env_recolor_cached_light(plant_uml_plugin, md_lines, plugin_environment, svg_diagram):
+    plant_uml_plugin.config.theme.recolor = True
+    plant_uml_plugin.on_config(plant_uml_plugin.config)
+    plant_uml_plugin.palette = {}
+    plant_uml_plugin.on_page_markdown("\n".join(md_lines))
+    plant_uml_plugin.storage.update((v, svg_diagram) for v in plant_uml_plugin.derived.values())
+    plant_uml_plugin._translate = MagicMock(side_effect=lambda schemes: [svg_diagram] * len(schemes))
+
+    plant_uml_plugin.on_env(plugin_environment)
+
+    # Dark diagrams that can't be recolored are requested in one batch
+    plant_uml_plugin._translate.assert_called_once()
+    assert set(plant_uml_plugin._translate.call_args.args[0]) == set(plant_uml_plugin.derived)
+
+
 def test_on_post_page(plant_uml_plugin, diagrams_dict, html_page):
     plant_uml_plugin.storage.data = diagrams_dict
     output = plant_uml_plugin.on_post_page(html_page.content, html_page)
@@ -158,6 +495,80 @@ def test_on_post_page(plant_uml_plugin, diagrams_dict, html_page):
     )
 
 
+def test_on_post_page_without_diagrams(plant_uml_plugin):
+    page = MagicMock(content="original")
+    output = plant_uml_plugin.on_post_page("<p>No diagrams</p>", page)
+
+    assert output == "<p>No diagrams</p>"
+    assert page.content == "original"
+
+
+def test_on_post_page_repeated_key(plant_uml_plugin, diagrams_dict):
+    plant_uml_plugin.storage.data = diagrams_dict
+    key = list(diagrams_dict.keys())[0]
+    pre = f'<pre class="{PlantUMLPlugin.pre_class_name}">{key}</pre>'
+    page = MagicMock()
+
+    output = plant_uml_plugin.on_post_page(f"{pre}<p>text</p>{pre}", page)
+
+    assert output.count('<div class="puml light" style="">') == 2
+    assert "<pre" not in output
+    assert page.content == output
+
+
+def test_on_post_page_external(plant_uml_plugin, diagrams_dict, svg_diagram):
+    plant_uml_plugin.config.output = "external"
+    plant_uml_plugin.storage.data = diagrams_dict
+    light_key, dark_key, fallback_key = diagrams_dict.keys()
+    diagrams_dict[light_key].diagram = svg_diagram
+    diagrams_dict[dark_key].diagram = svg_diagram
+    diagrams_dict[fallback_key].diagram = Fallback(400, "Syntax error")
+    page = MagicMock(url="dir/page/")
+
+    output = plant_uml_plugin.on_post_page(
+        "".join(f'<pre class="{PlantUMLPlugin.pre_class_name}">{k}</pre>' for k in diagrams_dict), page
+    )
+
+    assert f'<img class="diagram" src="../../assets/mkdocs_puml/{light_key}.svg"' in output
+    assert f'<img class="diagram" src="../../assets/mkdocs_puml/{dark_key}.svg"' in output
+    assert "Syntax error" in output
+    assert "<svg" not in output
+    assert plant_uml_plugin.external == {light_key, dark_key}
+
+
+def test_on_post_page_lazy(plant_uml_plugin, diagrams_dict, svg_diagram):
+    plant_uml_plugin.config.output = "lazy"
+    plant_uml_plugin.storage.data = diagrams_dict
+    light_key, dark_key, fallback_key = diagrams_dict.keys()
+    diagrams_dict[light_key].diagram = svg_diagram
+    diagrams_dict[dark_key].diagram = svg_diagram
+    diagrams_dict[fallback_key].diagram = Fallback(400, "Syntax error")
+    page = MagicMock(url="dir/page/")
+
+    output = plant_uml_plugin.on_post_page(
+        "".join(f'<pre class="{PlantUMLPlugin.pre_class_name}">{k}</pre>' for k in diagrams_dict), page
+    )
+
+    assert f'data-puml-src="../../assets/mkdocs_puml/{light_key}.svg"></div>' in output
+    assert f'data-puml-src="../../assets/mkdocs_puml/{dark_key}.svg"></div>' in output
+    assert "Syntax error" in output
+    assert "<svg" not in output
+    assert "<img" not in output
+    assert plant_uml_plugin.external == {light_key, dark_key}
+
+
+def test_on_post_build_external(tmp_path, plant_uml_plugin, diagrams_dict, svg_diagram):
+    config = {"site_dir": str(tmp_path)}
+    key = list(diagrams_dict.keys())[0]
+    diagrams_dict[key].diagram = svg_diagram
+    plant_uml_plugin.storage.data = diagrams_dict
+    plant_uml_plugin.external = {key}
+
+    plant_uml_plugin.on_post_build(config)
+
+    assert tmp_path.joinpath(f"assets/mkdocs_puml/{key}.svg").read_text() == svg_diagram
+
+
 def test_on_post_build(tmp_path, plant_uml_plugin):
     # Test if static files are correctly copied during the build process
     config = {"site_dir": str(tmp_path)}
@@ -173,6 +584,136 @@ def test_on_post_build(tmp_path, plant_uml_plugin):
     assert dest_dir.joinpath("interaction.js").exists()
 
 
+def test_on_post_build_prune(tmp_path, plant_uml_plugin, diagrams_dict):
+    config = {"site_dir": str(tmp_path)}
+    plant_uml_plugin.storage.data = diagrams_dict
+    old_key = list(diagrams_dict.keys())[0]
+    diagrams_dict[old_key].last_seen = 0
+
+    plant_uml_plugin.on_post_build(config)
+
+    assert plant_uml_plugin.storage.invalid == {old_key}
+
+
+def test_on_post_build_evicted(tmp_path, plant_uml_plugin):
+    config = {"site_dir": str(tmp_path)}
+    plant_uml_plugin.storage.evicted_bytes = 2048
+    plant_uml_plugin.console = MagicMock()
+
+    plant_uml_plugin.on_post_build(config)
+
+    plant_uml_plugin.console.print.assert_called_once_with(
+        "[dim][bold magenta]mkdocs_puml[/bold magenta]: Evicted 2.0 KB from cache[/dim]"
+    )
+
+
+def test_on_post_build_report(tmp_path, mock_requests, plant_uml_plugin, diagram_and_encoded, plugin_environment):
+    plant_uml_plugin.config.report.enabled = True
+    plant_uml_plugin.on_config({"extra_css": [], "extra_javascript": []})
+    patch_plugin_to_single_theme(plant_uml_plugin)
+    plant_uml_plugin.console = MagicMock()
+    mock_requests(1)
+
+    block = f"```puml\n{diagram_and_encoded[0]}\n```"
+    for src_uri in ("index.md", "dir/page.md"):
+        page = MagicMock(file=MagicMock(abs_src_path=None, src_uri=src_uri))
+        plant_uml_plugin.on_page_markdown(block, page=page)
+    plant_uml_plugin.on_env(plugin_environment)
+    plant_uml_plugin.on_post_build({"site_dir": str(tmp_path)})
+
+    report = json.loads(tmp_path.joinpath("mkdocs_puml_report.json").read_text())
+    (diagram,) = report["diagrams"]
+    assert diagram["pages"] == ["index.md", "dir/page.md"]
+    assert diagram["status"] == "rendered"
+    assert diagram["latency"] > 0
+    assert not diagram["cache_hit"]
+
+    printed = [c.args[0] for c in plant_uml_plugin.console.print.call_args_list]
+    assert any("Slowest diagrams" in p for p in printed)
+    assert any("Largest diagrams" in p for p in printed)
+
+
+def test_on_post_build_metrics(tmp_path, mock_requests, plant_uml_plugin, diagram_and_encoded, plugin_environment):
+    plant_uml_plugin.config.metrics.enabled = True
+    plant_uml_plugin.on_config(
+        {"extra_css": [], "extra_javascript": [], "config_file_path": str(tmp_path.joinpath("mkdocs.yml"))}
+    )
+    patch_plugin_to_single_theme(plant_uml_plugin)
+    mock_requests(1)
+
+    html = plant_uml_plugin.on_page_markdown(f"```puml\n{diagram_and_encoded[0]}\n```")
+    plant_uml_plugin.on_env(plugin_environment)
+    plant_uml_plugin.on_post_page(html, MagicMock())
+    site_dir = tmp_path.joinpath("site")
+    plant_uml_plugin.on_post_build({"site_dir": str(site_dir)})
+
+    # The report itself is written only when it's enabled, and nothing is written to `site_dir`
+    assert not tmp_path.joinpath("mkdocs_puml_report.json").exists()
+    assert not site_dir.joinpath("mkdocs_puml.prom").exists()
+    lines = tmp_path.joinpath("mkdocs_puml.prom").read_text().splitlines()
+    assert 'mkdocs_puml_diagrams_total{status="rendered"} 1' in lines
+    assert "mkdocs_puml_cache_misses_total 1" in lines
+    for hook in ("on_page_markdown", "on_env", "on_post_page", "on_post_build"):
+        assert f'mkdocs_puml_hook_duration_seconds_count{{hook="{hook}"}} 1' in lines
+
+
+def test_on_config_metrics_path_next_to_cache(tmp_path, plugin_config):
+    plugin = PlantUMLPlugin()
+    plugin_config.metrics.enabled = True
+    plugin_config.cache.backend = "local"
+    plugin_config.cache.local.path = str(tmp_path)
+    plugin_config.cache.local.join_project_name = False
+    plugin.config = plugin_config
+
+    plugin.on_config({"extra_css": [], "extra_javascript": []})
+    assert plugin.metrics_path == tmp_path.joinpath("mkdocs_puml.prom")
+
+
+def test_profile(tmp_path, monkeypatch, mock_requests, plant_uml_plugin, diagram_and_encoded, plugin_environment):
+    monkeypatch.setenv("MKDOCS_PUML_PROFILE", str(tmp_path.joinpath("profile")))
+    plant_uml_plugin.on_config({"extra_css": [], "extra_javascript": []})
+    patch_plugin_to_single_theme(plant_uml_plugin)
+    mock_requests(1)
+
+    html = plant_uml_plugin.on_page_markdown(f"```puml\n{diagram_and_encoded[0]}\n```")
+    plant_uml_plugin.on_env(plugin_environment)
+    plant_uml_plugin.on_post_page(html, MagicMock())
+    plant_uml_plugin.on_post_build({"site_dir": str(tmp_path.joinpath("site"))})
+
+    profile_dir = tmp_path.joinpath("profile")
+    for hook in ("on_config", "on_page_markdown", "on_env", "on_post_page", "on_post_build"):
+        assert profile_dir.joinpath(f"{hook}.prof").exists()
+    spans = profile_dir.joinpath("spans.collapsed").read_text()
+    for stack in ("on_config;storage.load", "on_env;translate", "on_post_build;storage.save"):
+        assert f"{stack} " in spans
+
+
+def test_profile_config(tmp_path, plant_uml_plugin):
+    assert plant_uml_plugin.profiler is None
+
+    plant_uml_plugin.config.profile.enabled = True
+    plant_uml_plugin.on_config(
+        {"extra_css": [], "extra_javascript": [], "config_file_path": str(tmp_path.joinpath("mkdocs.yml"))}
+    )
+    assert plant_uml_plugin.profiler.directory == tmp_path.joinpath("mkdocs_puml_profile")
+
+
+def test_on_config_report_path(tmp_path, plant_uml_plugin):
+    plant_uml_plugin.config.report.enabled = True
+    plant_uml_plugin.config.report.path = "reports/puml.json"
+    plant_uml_plugin.on_config(
+        {"extra_css": [], "extra_javascript": [], "config_file_path": str(tmp_path.joinpath("mkdocs.yml"))}
+    )
+
+    assert plant_uml_plugin.report_path == tmp_path.joinpath("reports/puml.json")
+    assert plant_uml_plugin.puml.stats is plant_uml_plugin.report.stats
+
+
+def test_on_config_report_disabled(plant_uml_plugin):
+    assert plant_uml_plugin.report is None
+    assert plant_uml_plugin.puml.stats is None
+
+
 def test_on_post_build_with_subdirectory(tmp_path, plant_uml_plugin):
     # Test if the plugin correctly handles subdirectories in the static folder
     config = {"site_dir": str(tmp_path)}
@@ -229,3 +770,19 @@ def test_on_post_build_with_subdirectory(tmp_path, plant_uml_plugin):
 def test_status_message(plant_uml_plugin, fallback, count, expected):
     msg = plant_uml_plugin._prepare_status_message(fallback, count)
     assert msg == expected
+
+
+def test_status_message_duplicates(plant_uml_plugin):
+    msg = plant_uml_plugin._prepare_status_message(0, Count(1, 0), 0, 3)
+    assert msg == (
+        "[dim][bold magenta]mkdocs_puml[/bold magenta]: Built 1 light diagram, 3 duplicates coalesced[/dim] "
+        "[green bold]✔️[/green bold]"
+    )
+
+
+def test_status_message_deferred(plant_uml_plugin):
+    msg = plant_uml_plugin._prepare_status_message(0, Count(0, 0), 2)
+    assert msg == (
+        "[dim][bold magenta]mkdocs_puml[/bold magenta]: No diagrams built[/dim] "
+        "[green bold]✔️[/green bold][bold yellow] 2 diagrams deferred[/bold yellow]"
+    )
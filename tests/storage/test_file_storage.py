@@ -1,9 +1,12 @@
 from pathlib import Path
+import time
 from unittest.mock import MagicMock
 
+import msgpack
 import pytest
 
 from mkdocs_puml.model import Diagram, ThemeMode
+from mkdocs_puml.puml import Fallback
 from mkdocs_puml.storage import FileStorage
 
 
@@ -66,11 +69,14 @@ def test_read_empty_file(monkeypatch, patch_path_mkdir):
 def test_read(monkeypatch, patch_exist_stat, patch_stream, hash_diagrams):
     fs = FileStorage(Path("test"), "test.mock")
 
-    assert len(fs.data) == len(fs.invalid) == len(hash_diagrams)
+    assert len(fs.data) == len(hash_diagrams)
+    assert len(fs.invalid) == 0
 
     for k, v in hash_diagrams.items():
-        assert fs[k] == v
-        assert k in fs.invalid
+        assert fs[k].scheme == v.scheme
+        assert fs[k].diagram == v.diagram
+        # Diagrams without last_seen start their lifetime on read
+        assert fs[k].last_seen is not None
 
 
 def test_add_new(patch_exist_stat, patch_stream, hash_diagrams):
@@ -79,7 +85,8 @@ def test_add_new(patch_exist_stat, patch_stream, hash_diagrams):
     fs.add(d)
 
     assert len(fs.data) == len(hash_diagrams) + 1
-    assert len(fs.invalid) == len(hash_diagrams)
+    assert len(fs.invalid) == 0
+    assert d.last_seen is not None
 
 
 def test_count_total(patch_exist_stat, patch_stream, hash_diagrams):
@@ -105,28 +112,151 @@ def test_count_to_request(patch_exist_stat, patch_stream, hash_diagrams):
 def test_add_existing(patch_exist_stat, patch_stream, hash_diagrams):
     fs = FileStorage(Path("test"), "test.mock")
 
-    diagram_list = list(hash_diagrams.items())
-    fs.add(diagram_list[0][1])
+    key, diagram = list(hash_diagrams.items())[0]
+    fs[key].last_seen = 0
+    fs.add(diagram)
 
     assert len(fs.data) == len(hash_diagrams)
-    assert len(fs.invalid) == len(hash_diagrams) - 1
-
-    assert diagram_list[0][0] not in fs.invalid
+    assert fs[key].last_seen > 0
 
 
-def test_update(patch_exist_stat, patch_stream, hash_diagrams_with_fallback):
+def test_update(patch_exist_stat, patch_stream, hash_diagrams):
     fs = FileStorage(Path("test"), "test.mock")
-    fs.update(hash_diagrams_with_fallback.items())
+    keys = list(hash_diagrams.keys())
+    fs.update([(keys[0], Fallback(400, "Test")), (keys[1], "svg")])
 
-    # One from patch_stream, and one Fallback from hash_diagrams_with_fallback
-    assert len(fs.invalid) == 1 + 1
+    assert fs.invalid == {keys[0]}
 
 
-def test_save(patch_exist_stat, patch_stream, hash_diagrams):
+def test_prune(patch_exist_stat, patch_stream, hash_diagrams):
     fs = FileStorage(Path("test"), "test.mock")
+    old_key, fresh_key = list(hash_diagrams.keys())
+    fs[old_key].last_seen = time.time() - 100
+
+    fs.prune(50)
+
+    assert fs.invalid == {old_key}
+    assert fresh_key in fs.data
+
+
+def test_save(tmp_path, hash_diagrams):
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    fs.data = hash_diagrams
+    old_key, fresh_key = list(hash_diagrams.keys())
+    fs.invalid.add(old_key)
 
-    fs.invalid.remove(list(hash_diagrams.items())[0][0])
     fs.save()
 
-    # One from patch_stream, and one Fallback from hash_diagrams_with_fallback
-    assert patch_stream.return_value.write.call_count == 1
+    with open(fs.path, "rb") as f:
+        saved = msgpack.load(f)
+    # Diagrams absent from the build are kept, invalid ones are dropped
+    assert list(saved.keys()) == [fresh_key]
+    assert [p.name for p in tmp_path.iterdir() if p.suffix == ".tmp"] == []
+
+
+def test_save_merges_other_writers(tmp_path):
+    first = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    second = FileStorage(tmp_path, "test.mock", join_project_name=False)
+
+    key_one = first.add(Diagram("test_one", ThemeMode.LIGHT))
+    first.update([(key_one, "svg1")])
+    key_two = second.add(Diagram("test_two", ThemeMode.LIGHT))
+    second.update([(key_two, "svg2")])
+
+    first.save()
+    second.save()
+
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    assert fs[key_one].diagram == "svg1"
+    assert fs[key_two].diagram == "svg2"
+
+
+def test_save_merges_rendered_fallback(tmp_path):
+    first = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    second = FileStorage(tmp_path, "test.mock", join_project_name=False)
+
+    key = first.add(Diagram("test_one", ThemeMode.LIGHT))
+    first.update([(key, "svg1")])
+    second.add(Diagram("test_one", ThemeMode.LIGHT))
+    second.update([(key, Fallback(503, "Test"))])
+
+    first.save()
+    second.save()
+
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    assert fs[key].diagram == "svg1"
+
+
+def test_save_merges_recently_seen(tmp_path):
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    key = fs.add(Diagram("test_one", ThemeMode.LIGHT))
+    fs.update([(key, "svg1")])
+    fs.data[key].last_seen = 0
+    fs.save()
+
+    first = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    second = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    second.add(Diagram("test_one", ThemeMode.LIGHT))
+    second.save()
+
+    # The first build prunes the diagram that the second build has just seen
+    first.prune(60)
+    first.save()
+
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    assert fs[key].diagram == "svg1"
+    assert fs[key].last_seen > 0
+
+
+@pytest.mark.parametrize(
+    "max_size,max_entries,evicted",
+    [
+        (0, 0, []),
+        (8, 0, ["old"]),
+        (0, 1, ["old", "mid"]),
+        (4, 3, ["old", "mid"]),
+    ],
+)
+def test_evict(patch_path_mkdir, monkeypatch, max_size, max_entries, evicted):
+    monkeypatch.setattr("pathlib.Path.exists", MagicMock(return_value=False))
+    fs = FileStorage(Path("test"), "test.mock", max_size=max_size, max_entries=max_entries)
+    fs.data = {
+        "new": Diagram("new", ThemeMode.LIGHT, "svg3", last_seen=3),
+        "old": Diagram("old", ThemeMode.LIGHT, "svg1", last_seen=1),
+        "mid": Diagram("mid", ThemeMode.LIGHT, "svg2", last_seen=2),
+    }
+
+    fs._evict()
+
+    assert fs.invalid == set(evicted)
+    assert fs.evicted_bytes == 4 * len(evicted)
+
+
+def test_save_skips_deferred(tmp_path):
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    rendered = fs.add(Diagram("test_one", ThemeMode.LIGHT))
+    fs.update([(rendered, "svg1")])
+    fs.add(Diagram("test_two", ThemeMode.LIGHT))
+    fs.save()
+
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    assert list(fs.data.keys()) == [rendered]
+    assert fs.schemes() == {}
+
+
+def test_save_evicts_after_merge(tmp_path):
+    first = FileStorage(tmp_path, "test.mock", join_project_name=False, max_entries=1)
+    second = FileStorage(tmp_path, "test.mock", join_project_name=False)
+
+    key_two = second.add(Diagram("test_two", ThemeMode.LIGHT))
+    second.update([(key_two, "svg2")])
+    second.data[key_two].last_seen = 0
+    second.save()
+
+    key_one = first.add(Diagram("test_one", ThemeMode.LIGHT))
+    first.update([(key_one, "svg1")])
+    first.save()
+
+    # The diagram of the other build counts towards the limit
+    fs = FileStorage(tmp_path, "test.mock", join_project_name=False)
+    assert list(fs.data.keys()) == [key_one]
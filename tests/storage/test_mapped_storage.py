@@ -0,0 +1,155 @@
+from mkdocs_puml.model import Diagram, ThemeMode
+from mkdocs_puml.puml import Fallback
+from mkdocs_puml.storage import MappedFileStorage, _Slice
+
+
+def _build(tmp_path, diagrams: dict[str, str], lru_size: int = 32) -> tuple[MappedFileStorage, dict[str, str]]:
+    """Add diagrams to a fresh storage, render them and save"""
+    storage = MappedFileStorage(tmp_path, join_project_name=False, lru_size=lru_size)
+    keys = {}
+    for scheme, svg in diagrams.items():
+        key = storage.add(Diagram(scheme, ThemeMode.LIGHT))
+        keys[scheme] = key
+        if svg is not None:
+            storage.update([(key, svg)])
+    storage.save()
+    return storage, keys
+
+
+def test_read_nonexistent(tmp_path):
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+
+    assert len(storage.data) == 0
+    assert storage._mmap is None
+
+
+def test_save_and_read_lazily(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>", "two": "<svg>два</svg>"})
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+
+    # Only the index is loaded
+    for v in storage.data.values():
+        assert isinstance(v.diagram, _Slice)
+
+    storage.add(Diagram("two", ThemeMode.LIGHT))
+    assert storage.schemes() == {}
+    assert storage[keys["two"]].diagram == "<svg>два</svg>"
+    assert storage[keys["two"]].scheme == "two"
+    assert storage[keys["one"]].diagram == "<svg>1</svg>"
+
+
+def test_lru(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>"})
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False, lru_size=2)
+    storage[keys["one"]]
+    storage[keys["one"]]
+
+    info = storage._read.cache_info()
+    assert info.hits == 1
+    assert info.misses == 1
+
+
+def test_save_appends(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>"})
+    size = tmp_path.joinpath("mapped.svgs").stat().st_size
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("one", ThemeMode.LIGHT))
+    key = storage.add(Diagram("two", ThemeMode.DARK))
+    storage.update([(key, "<svg>2</svg>")])
+    storage.save()
+
+    assert tmp_path.joinpath("mapped.svgs").stat().st_size == size + len("<svg>2</svg>")
+    assert isinstance(storage.data[key].diagram, _Slice)
+    assert storage[key].diagram == "<svg>2</svg>"
+    assert storage[keys["one"]].diagram == "<svg>1</svg>"
+
+
+def test_save_keeps_unseen(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>", "two": "<svg>2</svg>"})
+
+    # A partial build sees only one diagram
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("two", ThemeMode.LIGHT))
+    storage.save()
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert storage[keys["one"]].diagram == "<svg>1</svg>"
+    assert storage[keys["two"]].diagram == "<svg>2</svg>"
+
+
+def test_save_compacts(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>", "two": "<svg>2</svg>", "three": "<svg>3</svg>"})
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("three", ThemeMode.LIGHT))
+    storage.data[keys["one"]].last_seen = 0
+    storage.data[keys["two"]].last_seen = 0
+    storage.prune(60)
+    storage.save()
+
+    assert tmp_path.joinpath("mapped.svgs").read_text() == "<svg>3</svg>"
+    assert not tmp_path.joinpath("mapped.tmp").exists()
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert list(storage.keys()) == [keys["three"]]
+    assert storage[keys["three"]].diagram == "<svg>3</svg>"
+
+
+def test_save_skips_fallback(tmp_path):
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    key = storage.add(Diagram("one", ThemeMode.LIGHT))
+    storage.update([(key, Fallback(400, "Test"))])
+    storage.save()
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert len(storage.data) == 0
+
+
+def test_save_evicts(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>", "two": "<svg>2</svg>"})
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False, max_entries=1)
+    storage.data[keys["one"]].last_seen = 0
+    storage.save()
+
+    assert storage.evicted_bytes == len("<svg>1</svg>")
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert list(storage.keys()) == [keys["two"]]
+
+
+def test_save_merges_other_writers(tmp_path):
+    _, keys = _build(tmp_path, {"one": "<svg>1</svg>", "two": "<svg>2</svg>", "three": "<svg>3</svg>"})
+
+    first = MappedFileStorage(tmp_path, join_project_name=False)
+    second = MappedFileStorage(tmp_path, join_project_name=False)
+
+    # The first build compacts the data file, moving the image of "three"
+    first.add(Diagram("three", ThemeMode.LIGHT))
+    for k in ("one", "two"):
+        first.data[keys[k]].last_seen = 0
+    first.prune(60)
+    first.save()
+
+    key_four = second.add(Diagram("four", ThemeMode.LIGHT))
+    second.update([(key_four, "<svg>4</svg>")])
+    second.add(Diagram("one", ThemeMode.LIGHT))
+    second.save()
+
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert storage[keys["one"]].diagram == "<svg>1</svg>"
+    assert storage[keys["three"]].diagram == "<svg>3</svg>"
+    assert storage[key_four].diagram == "<svg>4</svg>"
+    # The second build didn't prune "two", its image is copied from the old mapping
+    assert storage[keys["two"]].diagram == "<svg>2</svg>"
+
+
+def test_disk_size(tmp_path):
+    storage = MappedFileStorage(tmp_path, join_project_name=False)
+    assert storage.disk_size() == 0
+
+    storage, _ = _build(tmp_path, {"one": "<svg>1</svg>"})
+    assert storage.disk_size() == storage.path.stat().st_size + storage.data_path.stat().st_size
@@ -1,7 +1,8 @@
+import hashlib
+
 import pytest
 from mkdocs_puml.model import Diagram, ThemeMode
 from mkdocs_puml.storage import RAMStorage
-from tests.plugins.conftest import is_uuid_valid
 
 
 @pytest.fixture
@@ -11,7 +12,7 @@ def diagram_object():
 
 def test_hash_light(diagram_object):
     storage = RAMStorage()
-    assert is_uuid_valid(storage.hash(diagram_object))
+    assert storage.hash(diagram_object) == hashlib.blake2b(b"test").hexdigest()
 
 
 def test_hash_dark(diagram_object):
@@ -19,7 +20,7 @@ def test_hash_dark(diagram_object):
     storage = RAMStorage()
 
     h, _, dark = storage.hash(diagram_object).rpartition("-")
-    assert is_uuid_valid(h)
+    assert h == hashlib.blake2b(b"test").hexdigest()
     assert dark == "dark"
 
 
@@ -27,7 +28,28 @@ def test_add(diagram_object):
     storage = RAMStorage()
     key = storage.add(diagram_object)
 
-    assert is_uuid_valid(key)
+    assert key == storage.hash(diagram_object)
     assert len(storage.items()) == 1
 
     assert storage.items()[0][1] == diagram_object
+
+
+def test_add_duplicates(diagram_object):
+    storage = RAMStorage()
+    dark = Diagram("test", ThemeMode.DARK)
+
+    keys = [storage.add(Diagram("test", ThemeMode.LIGHT)) for _ in range(3)]
+    dark_key = storage.add(dark)
+
+    assert len(set(keys)) == 1
+    assert dark_key != keys[0]
+    assert len(storage.items()) == 2
+    assert storage.duplicates == 2
+    assert storage.count() == storage.count(total=True)
+
+
+def test_disk_size(diagram_object):
+    storage = RAMStorage()
+    storage.add(diagram_object)
+
+    assert storage.disk_size() == 0
@@ -0,0 +1,138 @@
+import sqlite3
+import time
+
+import pytest
+
+from mkdocs_puml.model import Diagram, ThemeMode
+from mkdocs_puml.puml import Fallback
+from mkdocs_puml.storage import SQLiteStorage
+
+
+def _rows(storage: SQLiteStorage) -> dict[str, str]:
+    with sqlite3.connect(storage.path) as conn:
+        return dict(conn.execute("SELECT key, diagram FROM diagrams").fetchall())
+
+
+def test_path(tmp_path):
+    storage = SQLiteStorage(tmp_path, "test.sqlite3", join_project_name=False)
+
+    assert storage.path == tmp_path.joinpath("test.sqlite3")
+    assert storage.path.exists()
+
+
+def test_add_new(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+
+    assert storage[key].diagram is None
+    assert storage.schemes() == {key: "test_one"}
+    assert len(storage.cached) == 0
+
+
+def test_save_and_read(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.update([(key, "<svg/>")])
+    storage.save()
+
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    assert len(storage.data) == 0
+
+    same_key = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+
+    assert same_key == key
+    assert storage[key].diagram == "<svg/>"
+    assert key in storage.cached
+    assert storage.schemes() == {}
+
+
+def test_save_fallback(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key_ok = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    key_fail = storage.add(Diagram("test_two", ThemeMode.DARK))
+    storage.update([(key_ok, "<svg/>"), (key_fail, Fallback(400, "Test"))])
+    storage.save()
+
+    assert _rows(storage) == {key_ok: "<svg/>"}
+
+
+def test_save_keeps_unseen(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key_one = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    key_two = storage.add(Diagram("test_two", ThemeMode.LIGHT))
+    storage.update([(key_one, "<svg>1</svg>"), (key_two, "<svg>2</svg>")])
+    storage.save()
+
+    # A partial build sees only one diagram
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.save()
+
+    assert _rows(storage) == {key_one: "<svg>1</svg>", key_two: "<svg>2</svg>"}
+
+
+def test_prune(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key_one = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    key_two = storage.add(Diagram("test_two", ThemeMode.LIGHT))
+    storage.update([(key_one, "<svg>1</svg>"), (key_two, "<svg>2</svg>")])
+    storage[key_two].last_seen = int(time.time()) - 100
+    storage.save()
+
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    storage.prune(50)
+    storage.save()
+
+    assert _rows(storage) == {key_one: "<svg>1</svg>"}
+
+
+def test_save_touches_old(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.update([(key, "<svg>1</svg>")])
+    storage[key].last_seen = 0
+    storage.save()
+
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.prune(50)
+    storage.save()
+
+    assert _rows(storage) == {key: "<svg>1</svg>"}
+    assert storage.cached[key] > 0
+
+
+def test_save_writes_only_new(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key_one = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.update([(key_one, "<svg>1</svg>")])
+    storage.save()
+
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    key_two = storage.add(Diagram("test_two", ThemeMode.DARK))
+    storage.update([(key_two, "<svg>2</svg>")])
+
+    changes = storage.connection.total_changes
+    storage.save()
+
+    # Recently seen cached diagram is not written again
+    assert storage.connection.total_changes - changes == 1
+    assert _rows(storage) == {key_one: "<svg>1</svg>", key_two: "<svg>2</svg>"}
+
+
+def test_disk_size(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    key = storage.add(Diagram("test_one", ThemeMode.LIGHT))
+    storage.update([(key, "<svg/>")])
+    storage.save()
+
+    assert storage.disk_size() >= storage.path.stat().st_size > 0
+
+
+def test_close(tmp_path):
+    storage = SQLiteStorage(tmp_path, join_project_name=False)
+    storage.close()
+
+    with pytest.raises(sqlite3.ProgrammingError):
+        storage.connection.execute("SELECT 1")
@@ -0,0 +1,47 @@
+import pytest
+
+from mkdocs_puml.files import atomic_write, file_lock, file_stamp
+
+
+def test_atomic_write(tmp_path):
+    path = tmp_path.joinpath("test.bin")
+    path.write_bytes(b"old")
+
+    with atomic_write(path) as f:
+        f.write(b"new")
+        assert path.read_bytes() == b"old"
+
+    assert path.read_bytes() == b"new"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_atomic_write_error(tmp_path):
+    path = tmp_path.joinpath("test.bin")
+    path.write_bytes(b"old")
+
+    with pytest.raises(RuntimeError):
+        with atomic_write(path) as f:
+            f.write(b"new")
+            raise RuntimeError()
+
+    assert path.read_bytes() == b"old"
+    assert list(tmp_path.iterdir()) == [path]
+
+
+def test_file_lock(tmp_path):
+    path = tmp_path.joinpath("test.lock")
+
+    with file_lock(path):
+        assert path.exists()
+
+    # The lock is released and can be taken again
+    with file_lock(path):
+        pass
+
+
+def test_file_stamp(tmp_path):
+    path = tmp_path.joinpath("test.bin")
+    assert file_stamp(path) is None
+
+    path.write_bytes(b"data")
+    assert file_stamp(path)[1] == 4
@@ -0,0 +1,42 @@
+import json
+import subprocess  # nosec
+import sys
+
+# Modules that must not be imported until they are used
+LAZY_MODULES = ("rich", "httpx", "msgpack", "xml.dom.minidom")
+
+# mkdocs is imported first, so only the time of the plugin itself is measured
+SCRIPT = f"""
+import json, sys, time
+import mkdocs.config.defaults, mkdocs.plugins, mkdocs.utils
+
+start = time.perf_counter()
+import mkdocs_puml.plugin
+seconds = time.perf_counter() - start
+
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {LAZY_MODULES!r} if m in sys.modules]}}))
+"""
+
+
+def _import_plugin() -> dict:
+    out = subprocess.run([sys.executable, "-c", SCRIPT], check=True, capture_output=True, text=True)  # nosec
+    return json.loads(out.stdout)
+
+
+def test_plugin_import_is_lazy():
+    assert _import_plugin()["loaded"] == []
+
+
+def test_plugin_import_time():
+    # The bound is generous to keep the test stable on slow machines,
+    # the import takes about 0.1 s without the heavy modules
+    assert min(_import_plugin()["seconds"] for _ in range(3)) < 0.5
+
+
+def test_quiet_console():
+    from mkdocs_puml.utils import QuietConsole, build_console
+
+    console = build_console(False)
+    assert isinstance(console, QuietConsole)
+    with console.status("status"):
+        console.print("message")
@@ -0,0 +1,52 @@
+from mkdocs_puml.include import Includer
+
+
+def test_resolve(tmp_path):
+    tmp_path.joinpath("styles.puml").write_text("@startuml\nskinparam monochrome true\n@enduml\n")
+    diagram = "@startuml\n!include styles.puml\nBob -> Alice\n@enduml"
+
+    resolved = Includer().resolve(diagram, tmp_path)
+
+    assert resolved == "@startuml\nskinparam monochrome true\nBob -> Alice\n@enduml"
+
+
+def test_resolve_nested(tmp_path):
+    tmp_path.joinpath("lib").mkdir()
+    tmp_path.joinpath("lib/outer.puml").write_text("!include inner.puml\nclass Outer")
+    tmp_path.joinpath("lib/inner.puml").write_text("class Inner")
+    diagram = "!include lib/outer.puml\nOuter --> Inner"
+
+    resolved = Includer().resolve(diagram, tmp_path)
+
+    assert resolved == "class Inner\nclass Outer\nOuter --> Inner"
+
+
+def test_resolve_once_and_recursive(tmp_path):
+    tmp_path.joinpath("a.puml").write_text("class A\n!include a.puml")
+    tmp_path.joinpath("b.puml").write_text("class B")
+    diagram = "!include a.puml\n!include_once b.puml\n!include_once b.puml"
+
+    resolved = Includer().resolve(diagram, tmp_path)
+
+    assert resolved == "class A\n\nclass B\n"
+
+
+def test_resolve_skips_remote_and_missing(tmp_path):
+    diagram = (
+        "!include https://example.com/theme.puml\n"
+        "!include <C4/C4_Container>\n"
+        "!include diagrams.puml!1\n"
+        "!include missing.puml"
+    )
+
+    assert Includer().resolve(diagram, tmp_path) == diagram
+
+
+def test_read_is_cached(tmp_path):
+    path = tmp_path.joinpath("styles.puml")
+    path.write_text("class A")
+    includer = Includer()
+
+    assert includer.read(path) == "class A"
+    path.write_text("class B")
+    assert includer.read(path) == "class A"
@@ -0,0 +1,80 @@
+import pytest
+
+from mkdocs_puml.metrics import BuildMetrics, Histogram
+from mkdocs_puml.report import BuildReport, DiagramStatus
+
+
+@pytest.fixture
+def report() -> BuildReport:
+    report = BuildReport()
+    report.add("cached", "light", "index.md", cache_hit=True)
+    report.add("rendered", "light", "index.md", cache_hit=False)
+    report.add("failed", "dark", "index.md", cache_hit=False)
+
+    records = report.records
+    records["cached"].status = DiagramStatus.CACHED
+    records["rendered"].status = DiagramStatus.RENDERED
+    records["rendered"].latency = 0.2
+    records["rendered"].response_bytes = 100
+    records["failed"].status = DiagramStatus.FAILED
+    records["failed"].error_code = 503
+    records["failed"].latency = 3
+    records["failed"].retries = 2
+    return report
+
+
+def test_histogram():
+    h = Histogram((0.1, 1.0))
+    for v in (0.05, 0.5, 2):
+        h.observe(v)
+
+    assert h.samples({"hook": "on_env"}) == [
+        ("_bucket", {"hook": "on_env", "le": "0.1"}, 1),
+        ("_bucket", {"hook": "on_env", "le": "1.0"}, 2),
+        ("_bucket", {"hook": "on_env", "le": "+Inf"}, 3),
+        ("_count", {"hook": "on_env"}, 3),
+        ("_sum", {"hook": "on_env"}, 2.55),
+    ]
+
+
+def test_render_openmetrics(report):
+    metrics = BuildMetrics()
+    metrics.observe_hook("on_env", 0.02)
+    lines = metrics.render(report, 2048).splitlines()
+
+    assert lines[-1] == "# EOF"
+    assert "# TYPE mkdocs_puml_diagrams counter" in lines
+    assert 'mkdocs_puml_diagrams_total{status="failed"} 1' in lines
+    assert "mkdocs_puml_cache_hits_total 1" in lines
+    assert "mkdocs_puml_cache_misses_total 2" in lines
+    assert 'mkdocs_puml_fallbacks_total{status_code="503"} 1' in lines
+    assert "mkdocs_puml_retries_total 2" in lines
+    assert "# UNIT mkdocs_puml_downloaded_bytes bytes" in lines
+    assert "mkdocs_puml_downloaded_bytes_total 100" in lines
+    assert 'mkdocs_puml_render_latency_seconds_bucket{le="0.25"} 1' in lines
+    assert 'mkdocs_puml_render_latency_seconds_bucket{le="+Inf"} 2' in lines
+    assert 'mkdocs_puml_hook_duration_seconds_count{hook="on_env"} 1' in lines
+    assert "mkdocs_puml_cache_size_bytes 2048" in lines
+
+
+def test_render_prometheus(report):
+    lines = BuildMetrics("prometheus").render(report, 0).splitlines()
+
+    assert "# EOF" not in lines
+    assert "# TYPE mkdocs_puml_diagrams_total counter" in lines
+    assert not any(line.startswith("# UNIT") for line in lines)
+
+
+def test_render_escapes_labels():
+    metrics = BuildMetrics()
+    metrics.observe_hook('on "env"\n', 1)
+
+    assert 'hook="on \\"env\\"\\n"' in metrics.render(BuildReport(), 0)
+
+
+def test_write(tmp_path, report):
+    path = tmp_path.joinpath("textfiles", "mkdocs_puml.prom")
+    BuildMetrics().write(path, report, 0)
+
+    assert path.read_text().endswith("# EOF\n")
+    assert list(path.parent.iterdir()) == [path]
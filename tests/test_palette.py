@@ -0,0 +1,136 @@
+import json
+
+from mkdocs_puml.palette import (
+    PALETTES_PATH,
+    build_palette,
+    can_recolor,
+    generate,
+    load_palette,
+    normalize,
+    recolor,
+    resolve_colors,
+)
+from mkdocs_puml.theme import THEMES_DIR
+
+
+LIGHT = """
+<style>
+root {
+    --text: #36464e
+    --accent: #448aff
+    FontColor: var(--text)
+    LineColor black
+    BackGroundColor transparent
+}
+class {
+    ' comment
+    BackGroundColor #D
+    LineColor: var(--accent);
+    arrow {
+        LineColor: var(--text)
+    }
+}
+</style>
+"""
+
+DARK = """
+<style>
+root {
+    --text: #e2e2e2
+    --accent: #2979ff
+    FontColor: var(--text)
+    LineColor white
+    BackGroundColor transparent
+}
+class {
+    BackGroundColor #333
+    LineColor: var(--accent);
+    arrow {
+        LineColor: var(--accent)
+    }
+}
+</style>
+"""
+
+
+def test_normalize():
+    assert normalize("#ABC") == "#aabbcc"
+    assert normalize("#448aff1a") == "#448aff"
+    assert normalize("#8") == "#888888"
+    assert normalize("#e0") == "#e0e0e0"
+    assert normalize("Black") == "#000000"
+    assert normalize("transparent") is None
+    assert normalize("var(--x)") is None
+
+
+def test_resolve_colors():
+    colors = resolve_colors(LIGHT)
+
+    assert colors == {
+        "root/fontcolor": "#36464e",
+        "root/linecolor": "#000000",
+        "class/backgroundcolor": "#dddddd",
+        "class/linecolor": "#448aff",
+        "class/arrow/linecolor": "#36464e",
+    }
+
+
+def test_build_palette():
+    palette = build_palette(LIGHT, DARK)
+
+    assert palette == {
+        "#000000": "#ffffff",
+        # PlantUML colour not used by the light theme takes the line colour of the dark one
+        "#181818": "#ffffff",
+        # #36464e maps to both #e2e2e2 and #2979ff, the root property wins
+        "#36464e": "#e2e2e2",
+        "#dddddd": "#333333",
+        "#448aff": "#2979ff",
+    }
+
+
+def test_recolor():
+    palette = {"#181818": "#e2e2e2", "#448aff": "#2979ff"}
+    svg = '<svg style="background:#181818;"><rect fill="#448AFF1A" stroke="#181818"/><text>#181818</text></svg>'
+
+    assert recolor(svg, palette) == (
+        '<svg style="background:#e2e2e2;"><rect fill="#2979ff1A" stroke="#e2e2e2"/><text>#181818</text></svg>'
+    )
+
+
+def test_recolor_rendered_diagram(svg_diagram):
+    svg = recolor(svg_diagram, load_palette("default/light", "default/dark"))
+
+    assert svg is not None
+    assert "background:#1b1b1b;" in svg
+    assert "#e2e2f0" not in svg.lower()
+    assert "#181818" not in svg
+
+
+def test_can_recolor():
+    palette = {"#ff0000": "#bf616a"}
+
+    assert can_recolor("Bob -> Alice", palette)
+    assert can_recolor("class Foo #FF0000\nclass Bar #red", palette)
+    assert not can_recolor("class Foo #00ff00", palette)
+    assert not can_recolor("class Foo #LightBlue", palette)
+    assert not can_recolor("skinparam backgroundColor transparent\nBob -> Alice", palette)
+    assert not can_recolor("<style>\n</style>\nBob -> Alice", palette)
+
+
+def test_recolor_unknown_color():
+    svg = '<svg><rect fill="#FF0000" stroke="#181818"/></svg>'
+
+    assert recolor(svg, {"#181818": "#e2e2e2"}) is None
+
+
+def test_load_palette():
+    assert load_palette("default/light", "default/dark")
+    assert load_palette("default/light", "nord/night") is None
+
+
+def test_palettes_are_up_to_date():
+    with open(PALETTES_PATH, encoding="utf-8") as f:
+        shipped = json.load(f)
+
+    assert shipped == generate(THEMES_DIR)
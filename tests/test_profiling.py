@@ -0,0 +1,75 @@
+import cProfile
+import pstats
+import time
+
+from mkdocs_puml.profiling import Profiler, collapse, hook, profiled, span
+
+
+def _work():
+    return sorted(str(i) for i in range(2000))
+
+
+def test_hook_and_spans(tmp_path):
+    profiler = Profiler(tmp_path)
+    for _ in range(2):
+        with profiler.hook("on_env"):
+            with profiler.span("translate"):
+                time.sleep(0.01)
+            _work()
+
+    assert set(profiler.spans) == {("on_env",), ("on_env", "translate")}
+    assert profiler.spans[("on_env",)] >= profiler.spans[("on_env", "translate")] >= 0.02
+
+    profiler.write()
+
+    stats = pstats.Stats(str(tmp_path.joinpath("on_env.prof")))
+    assert any(name == "_work" for _, _, name in stats.stats)
+
+    collapsed = tmp_path.joinpath("profile.collapsed").read_text().splitlines()
+    assert any(line.startswith("on_env;") and "test_profiling._work" in line for line in collapsed)
+
+    spans = dict(line.rsplit(" ", 1) for line in tmp_path.joinpath("spans.collapsed").read_text().splitlines())
+    assert set(spans) == {"on_env", "on_env;translate"}
+    assert int(spans["on_env;translate"]) >= 20000
+
+
+def test_collapse_follows_callers():
+    profile = cProfile.Profile()
+    profile.enable()
+    _work()
+    profile.disable()
+
+    stacks = collapse(pstats.Stats(profile))
+    (stack,) = [s for s in stacks if s.endswith("<built-in method builtins.sorted>")]
+    assert stack.split(";")[-2] == "test_profiling._work"
+
+
+def test_span_disabled():
+    with span(None, "translate"):
+        pass
+
+
+def test_hook_disabled():
+    with hook(None, "on_config"):
+        pass
+
+
+class _Plugin:
+    profiler = None
+
+    @profiled
+    def on_post_build(self, config):
+        return config
+
+
+def test_profiled_disabled():
+    assert _Plugin().on_post_build("config") == "config"
+
+
+def test_profiled_writes_after_post_build(tmp_path):
+    plugin = _Plugin()
+    plugin.profiler = Profiler(tmp_path.joinpath("profile"))
+
+    assert plugin.on_post_build("config") == "config"
+    assert tmp_path.joinpath("profile", "on_post_build.prof").exists()
+    assert tmp_path.joinpath("profile", "spans.collapsed").read_text().startswith("on_post_build ")
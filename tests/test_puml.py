@@ -1,4 +1,13 @@
-from mkdocs_puml.puml import Fallback, PlantUML
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import pickle  # nosec
+
+import httpx
+import pytest
+from xml.dom.minidom import parseString  # nosec
+
+from mkdocs_puml.puml import Fallback, PlantUML, RenderStats
+from mkdocs_puml.retry import RetryPolicy
 from tests.conftest import BASE_PUML_URL
 
 
@@ -51,3 +60,293 @@ def test_translate_fallback(diagram_and_encoded: tuple[str, str], mock_requests_
     for r in resp:
         assert isinstance(r, Fallback)
         assert r.status_code == 509
+
+
+def test_translate_bounded_concurrency(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # Verify that no more than max_concurrency requests are in flight at once
+    diagram, _ = diagram_and_encoded
+    in_flight, peak = 0, 0
+
+    async def respond(request):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200, content=svg_diagram.encode("utf-8"))
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, max_concurrency=2)
+    resp = puml.translate([diagram] * 6)
+
+    assert len(resp) == 6
+    assert len(httpx_mock.get_requests()) == 6
+    assert peak == 2
+
+
+def test_translate_timeout(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # Verify that diagrams not rendered in time are cancelled and returned as None
+    diagram, _ = diagram_and_encoded
+    slow = "@startuml\nslow -> server\n@enduml"
+
+    async def respond(request):
+        if request.url.path.endswith(PlantUML(BASE_PUML_URL).preprocess(slow)):
+            await asyncio.sleep(5)
+        return httpx.Response(200, content=svg_diagram.encode("utf-8"))
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    resp = PlantUML(BASE_PUML_URL).translate([diagram, slow], timeout=0.2)
+
+    assert resp[0].startswith("<svg")
+    assert resp[1] is None
+
+
+def test_translate_post_large_diagram(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # Verify that diagrams above post_threshold are sent as POST body without encoding
+    diagram, encoded = diagram_and_encoded
+    large = "@startuml\n" + "Bob -> Alice : hello\n" * 100 + "@enduml"
+    httpx_mock.add_response(method="GET", url=f"{BASE_PUML_URL}svg/{encoded}", content=svg_diagram.encode("utf-8"))
+    httpx_mock.add_response(method="POST", url=f"{BASE_PUML_URL}svg", content=svg_diagram.encode("utf-8"))
+
+    puml = PlantUML(BASE_PUML_URL, post_threshold=len(diagram))
+    resp = puml.translate([diagram, large])
+
+    assert all(r.startswith("<svg") for r in resp)
+    post = httpx_mock.get_request(method="POST")
+    assert post.content == large.encode("utf-8")
+    assert post.headers["Content-Type"] == "text/plain"
+
+
+def test_translate_post_by_default(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # Diagrams that would make too long URL are sent with POST without configuration
+    diagram, encoded = diagram_and_encoded
+    large = "@startuml\n" + "".join(f"Bob -> Alice : hello {i}\n" for i in range(300)) + "@enduml"
+    httpx_mock.add_response(method="GET", url=f"{BASE_PUML_URL}svg/{encoded}", content=svg_diagram.encode("utf-8"))
+    httpx_mock.add_response(method="POST", url=f"{BASE_PUML_URL}svg", content=svg_diagram.encode("utf-8"))
+
+    resp = PlantUML(BASE_PUML_URL).translate([diagram, large])
+
+    assert all(r.startswith("<svg") for r in resp)
+    assert httpx_mock.get_request(method="POST").content == large.encode("utf-8")
+
+
+def test_translate_post_retry(httpx_mock, svg_diagram):
+    large = "@startuml\nBob -> Alice : hello\n@enduml"
+    httpx_mock.add_response(method="POST", status_code=503)
+    httpx_mock.add_response(method="POST", content=svg_diagram.encode("utf-8"))
+
+    puml = PlantUML(BASE_PUML_URL, post_threshold=1, retry=RetryPolicy(backoff_factor=0))
+    resp = puml.translate([large])
+
+    assert resp[0].startswith("<svg")
+    assert len(httpx_mock.get_requests(method="POST")) == 2
+
+
+def test_url_for(diagram_and_encoded: tuple[str, str]):
+    diagram, encoded = diagram_and_encoded
+
+    assert PlantUML(BASE_PUML_URL).url_for(diagram) == f"{BASE_PUML_URL}svg/{encoded}"
+
+
+def test_translate_limits():
+    puml = PlantUML(BASE_PUML_URL, max_connections=4, max_keepalive_connections=2)
+
+    assert puml.limits.max_connections == 4
+    assert puml.limits.max_keepalive_connections == 2
+
+
+def test_translate_retry_transient(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # A transient error is retried and the diagram is rendered on the next attempt
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=503, content=b"unavailable")
+    httpx_mock.add_response(content=svg_diagram.encode("utf-8"))
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(backoff_factor=0))
+    resp = puml.translate([diagram])
+
+    assert resp[0].startswith("<svg")
+    assert len(httpx_mock.get_requests()) == 2
+
+
+def test_translate_stats(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=503, content=b"unavailable")
+    httpx_mock.add_response(content=svg_diagram.encode("utf-8"))
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(backoff_factor=0))
+    puml.stats = {}
+    puml.translate([diagram])
+
+    stats = puml.stats[diagram]
+    assert stats.retries == 1
+    assert stats.response_bytes == len(svg_diagram.encode("utf-8"))
+    assert stats.encode_time > 0
+    assert stats.latency > 0
+    assert stats.postprocess_time > 0
+
+
+def test_translate_no_stats(diagram_and_encoded: tuple[str, str], mock_requests):
+    mock_requests(1)
+    puml = PlantUML(BASE_PUML_URL)
+    puml.translate([diagram_and_encoded[0]])
+
+    assert puml.stats is None
+    assert RenderStats().retries == 0
+
+
+def test_pickle_without_stats():
+    # Process pool pickles the bound methods submitted to it
+    puml = PlantUML(BASE_PUML_URL)
+    size = len(pickle.dumps(puml.postprocess))
+    puml.stats = {f"scheme {i}": RenderStats() for i in range(100)}
+
+    assert len(pickle.dumps(puml.postprocess)) == size
+    assert pickle.loads(pickle.dumps(puml)).stats is None
+    assert len(puml.stats) == 100
+
+
+def test_translate_retry_exhausted(diagram_and_encoded: tuple[str, str], httpx_mock):
+    # A diagram becomes a Fallback only after all attempts are spent
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=502, content=b"bad gateway", is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(attempts=2, backoff_factor=0))
+    resp = puml.translate([diagram])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 502
+    assert len(httpx_mock.get_requests()) == 3
+
+
+def test_translate_transport_error(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    # A connection error doesn't abort the other diagrams of the batch
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_exception(httpx.ConnectError("reset"), is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(attempts=1, backoff_factor=0))
+    resp = puml.translate([diagram])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 0
+    assert "ConnectError" in resp[0].message
+    assert len(httpx_mock.get_requests()) == 2
+
+
+def test_translate_retry_budget(diagram_and_encoded: tuple[str, str], httpx_mock):
+    # The build-wide budget limits the total number of retries
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=503, is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(attempts=5, backoff_factor=0, budget=2))
+    resp = puml.translate([diagram] * 3)
+
+    assert all(isinstance(r, Fallback) for r in resp)
+    assert len(httpx_mock.get_requests()) == 3 + 2
+
+
+def test_translate_shared_retry_budget(diagram_and_encoded: tuple[str, str], httpx_mock):
+    # The budget of the build is shared by several calls of translate
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=503, is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(attempts=5, backoff_factor=0, budget=2))
+    puml.budget = puml.retry.new_budget()
+    puml.translate([diagram] * 2)
+    puml.translate([diagram])
+
+    assert puml.budget.left == 0
+    assert len(httpx_mock.get_requests()) == 3 + 2
+
+
+def test_translate_permanent_error_not_retried(diagram_and_encoded: tuple[str, str], httpx_mock):
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=400, content=b"syntax error")
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(backoff_factor=0))
+    resp = puml.translate([diagram])
+
+    assert resp[0].status_code == 400
+    assert len(httpx_mock.get_requests()) == 1
+
+
+def _minidom_postprocess(puml: PlantUML, content: str) -> str:
+    # The reference implementation that parses the whole SVG into DOM
+    svg = parseString(puml._clean_comments(content)).getElementsByTagName("svg")[0]  # nosec
+    svg.setAttribute("class", "diagram")
+    svg.setAttribute("preserveAspectRatio", "xMidYMid meet")
+    return svg.toxml()
+
+
+def test_postprocess_same_as_dom(svg_diagram):
+    puml = PlantUML(BASE_PUML_URL)
+
+    assert puml.postprocess(svg_diagram) == _minidom_postprocess(puml, svg_diagram)
+
+
+@pytest.mark.parametrize(
+    "content,expected",
+    [
+        (
+            '<?xml version="1.0"?><!DOCTYPE svg><!-- c --><svg class="x" a=\'1\'\n  b="2"><g/></svg>\n',
+            '<svg class="diagram" a=\'1\' b="2" preserveAspectRatio="xMidYMid meet"><g/></svg>',
+        ),
+        (
+            '<svg preserveAspectRatio="none" width="1>2"><text>a &amp; b</text></svg>',
+            '<svg preserveAspectRatio="xMidYMid meet" width="1>2" class="diagram"><text>a &amp; b</text></svg>',
+        ),
+        (
+            '<svg />',
+            '<svg class="diagram" preserveAspectRatio="xMidYMid meet"/>',
+        ),
+        (
+            '<svg><svg width="1"/></svg>',
+            '<svg class="diagram" preserveAspectRatio="xMidYMid meet"><svg width="1"/></svg>',
+        ),
+    ],
+)
+def test_postprocess_root_attributes(content, expected):
+    puml = PlantUML(BASE_PUML_URL)
+
+    assert puml.postprocess(content) == expected
+
+
+@pytest.mark.parametrize("content", ["<html></html>", "<svg", '<svg width="1">'])
+def test_postprocess_malformed(content):
+    puml = PlantUML(BASE_PUML_URL)
+
+    with pytest.raises(ValueError):
+        puml.postprocess(content)
+
+
+@pytest.mark.parametrize("worker_type", ["thread", "process"])
+def test_translate_workers(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram, worker_type):
+    # Encoding and post-processing run in a pool; output order matches the input
+    diagram, encoded = diagram_and_encoded
+
+    def respond(request):
+        if request.url.path.endswith(encoded):
+            return httpx.Response(200, content=svg_diagram.encode("utf-8"))
+        return httpx.Response(400, content=b"error")
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, num_workers=2, worker_type=worker_type, retry=RetryPolicy(backoff_factor=0))
+    resp = puml.translate([diagram, "@startuml\nA -> B\n@enduml", diagram])
+
+    assert resp[0].startswith("<svg")
+    assert isinstance(resp[1], Fallback)
+    assert resp[2].startswith("<svg")
+
+
+def test_build_executor():
+    assert PlantUML(BASE_PUML_URL).build_executor() is None
+
+    executor = PlantUML(BASE_PUML_URL, num_workers=2).build_executor()
+    assert isinstance(executor, ThreadPoolExecutor)
+    executor.shutdown()
+
+    executor = PlantUML(BASE_PUML_URL, num_workers=2, worker_type="process").build_executor()
+    assert isinstance(executor, ProcessPoolExecutor)
+    executor.shutdown()
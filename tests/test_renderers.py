@@ -0,0 +1,177 @@
+import base64
+import sys
+import zlib
+
+import pytest
+
+from mkdocs_puml.puml import Fallback, PlantUML
+from mkdocs_puml.renderers import KrokiRenderer, PipeRenderer, ProcessRenderer, load_renderer
+from tests.conftest import TESTDATA_DIR
+
+FAKE_PLANTUML = f"{sys.executable} {TESTDATA_DIR.joinpath('fake_plantuml.py')}"
+FAKE_PLANTUML_PIPE = f"{sys.executable} {TESTDATA_DIR.joinpath('fake_plantuml_pipe.py')}"
+
+
+@pytest.mark.parametrize(
+    "name,cls",
+    [("plantuml", PlantUML), ("kroki", KrokiRenderer), ("process", ProcessRenderer), ("pipe", PipeRenderer)],
+)
+def test_load_builtin_renderer(name, cls):
+    assert load_renderer(name) is cls
+
+
+def test_load_unknown_renderer():
+    assert load_renderer("unknown") is None
+
+
+def test_kroki_posts_source(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(method="POST", url="http://kroki/plantuml/svg", content=svg_diagram.encode("utf-8"))
+
+    resp = KrokiRenderer("http://kroki").translate([diagram])
+
+    assert 'class="diagram"' in resp[0]
+    assert httpx_mock.get_request().content == diagram.encode("utf-8")
+
+
+def test_kroki_url_for(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+    url = KrokiRenderer("http://kroki").url_for(diagram)
+
+    prefix = "http://kroki/plantuml/svg/"
+    assert url.startswith(prefix)
+    assert zlib.decompress(base64.urlsafe_b64decode(url[len(prefix):])).decode("utf-8") == diagram
+
+
+def test_process_renderer(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+
+    resp = ProcessRenderer(FAKE_PLANTUML, num_workers=2).translate([diagram] * 3)
+
+    assert len(resp) == 3
+    for r in resp:
+        assert 'class="diagram"' in r
+
+
+def test_process_renderer_stats(diagram_and_encoded: tuple[str, str]):
+    renderer = ProcessRenderer(FAKE_PLANTUML)
+    renderer.stats = {}
+    renderer.translate([diagram_and_encoded[0]])
+
+    stats = renderer.stats[diagram_and_encoded[0]]
+    assert stats.latency > 0
+    assert stats.response_bytes > 0
+
+
+def test_process_renderer_error():
+    resp = ProcessRenderer(FAKE_PLANTUML).translate(["@startuml\nerror\n@enduml"])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 200
+    assert resp[0].message == "Syntax Error?"
+
+
+def test_process_renderer_timeout():
+    resp = ProcessRenderer(FAKE_PLANTUML, timeout=0.5).translate(["slow"])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 0
+
+
+def test_process_renderer_deadline(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+
+    resp = ProcessRenderer(FAKE_PLANTUML).translate([diagram, "slow"], timeout=1)
+
+    assert resp[0].startswith("<svg")
+    assert resp[1] is None
+
+
+def test_process_renderer_command_not_found():
+    resp = ProcessRenderer("mkdocs-puml-missing-command").translate(["Bob -> Alice"])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 0
+
+
+def test_pipe_renderer_reuses_process(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, num_workers=1)
+
+    resp = renderer.translate([diagram] * 3)
+    resp.extend(renderer.translate(["Bob -> Alice"]))
+    renderer.close()
+
+    assert len(resp) == 4
+    # The same process rendered all diagrams, including the ones of the second call
+    for i, r in enumerate(resp, start=1):
+        assert 'class="diagram"' in r
+        assert f"rendered {i}" in r
+
+
+def test_pipe_renderer_pool(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, num_workers=2)
+
+    resp = renderer.translate([diagram] * 6)
+
+    assert all('class="diagram"' in r for r in resp)
+    assert len(renderer._idle) == 2
+    renderer.close()
+    assert renderer._idle == []
+
+
+def test_pipe_renderer_stats(diagram_and_encoded: tuple[str, str]):
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, num_workers=1)
+    renderer.stats = {}
+    try:
+        renderer.translate([diagram_and_encoded[0]])
+    finally:
+        renderer.close()
+
+    stats = renderer.stats[diagram_and_encoded[0]]
+    assert stats.latency > 0
+    assert stats.response_bytes > 0
+
+
+def test_pipe_renderer_error():
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, num_workers=1)
+
+    resp = renderer.translate(["@startuml\nerror\n@enduml", "@startuml\nBob -> Alice\n@enduml"])
+    renderer.close()
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 400
+    assert resp[0].message.startswith("<?xml")
+    assert 'class="diagram"' in resp[1]
+
+
+def test_pipe_renderer_timeout(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, timeout=0.5, num_workers=1)
+
+    resp = renderer.translate(["slow", diagram])
+    renderer.close()
+
+    # The process is killed and a new one renders the next diagram
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 0
+    assert "rendered 1" in resp[1]
+
+
+def test_pipe_renderer_deadline(diagram_and_encoded: tuple[str, str]):
+    diagram, _ = diagram_and_encoded
+    renderer = PipeRenderer(FAKE_PLANTUML_PIPE, num_workers=2)
+
+    resp = renderer.translate([diagram, "slow"], timeout=1)
+    renderer.close()
+
+    assert 'class="diagram"' in resp[0]
+    assert resp[1] is None
+
+
+def test_pipe_renderer_command_not_found():
+    resp = PipeRenderer("mkdocs-puml-missing-command").translate(["Bob -> Alice"])
+
+    assert isinstance(resp[0], Fallback)
+    assert resp[0].status_code == 0
@@ -0,0 +1,95 @@
+import json
+
+from mkdocs_puml.model import Diagram, ThemeMode
+from mkdocs_puml.puml import Fallback, RenderStats
+from mkdocs_puml.report import BuildReport, DiagramStatus
+from mkdocs_puml.storage import RAMStorage
+
+
+def _storage(*diagrams: Diagram) -> tuple[RAMStorage, list[str]]:
+    storage = RAMStorage()
+    return storage, [storage.add(d) for d in diagrams]
+
+
+def test_add_pages():
+    report = BuildReport()
+    report.add("key", ThemeMode.LIGHT, "index.md", cache_hit=False)
+    report.add("key", ThemeMode.LIGHT, "other.md", cache_hit=True)
+    report.add("key", ThemeMode.LIGHT, "index.md", cache_hit=True)
+
+    record = report.records["key"]
+    assert record.pages == ["index.md", "other.md"]
+    assert not record.cache_hit
+
+
+def test_collect_statuses(svg_diagram):
+    storage, keys = _storage(
+        Diagram("cached", ThemeMode.LIGHT, svg_diagram),
+        Diagram("rendered", ThemeMode.LIGHT),
+        Diagram("recolored", ThemeMode.DARK),
+        Diagram("failed", ThemeMode.LIGHT),
+        Diagram("deferred", ThemeMode.LIGHT),
+        Diagram("unmeasured", ThemeMode.LIGHT),
+    )
+    report = BuildReport()
+    for k in keys:
+        report.add(k, storage[k].mode, "index.md", cache_hit=storage.is_rendered(k))
+
+    report.stats["rendered"] = RenderStats(encode_time=0.1, latency=1, postprocess_time=0.2, response_bytes=10)
+    report.stats["failed"] = RenderStats(latency=2, retries=3)
+    storage.update(
+        [(keys[1], svg_diagram), (keys[2], svg_diagram), (keys[3], Fallback(500, "error")), (keys[5], svg_diagram)]
+    )
+
+    report.collect(storage, derived={keys[2]: keys[1]})
+
+    statuses = [report.records[k].status for k in keys]
+    assert statuses == [
+        DiagramStatus.CACHED,
+        DiagramStatus.RENDERED,
+        DiagramStatus.RECOLORED,
+        DiagramStatus.FAILED,
+        DiagramStatus.DEFERRED,
+        DiagramStatus.RENDERED,
+    ]
+
+    rendered = report.records[keys[1]]
+    assert rendered.total_time == 1.3
+    assert rendered.response_bytes == 10
+    assert rendered.size == len(svg_diagram.encode("utf-8"))
+    assert report.records[keys[3]].retries == 3
+    assert report.records[keys[4]].size == 0
+
+
+def test_slowest_and_largest(svg_diagram):
+    storage, keys = _storage(
+        Diagram("a", ThemeMode.LIGHT, svg_diagram),
+        Diagram("b", ThemeMode.LIGHT, svg_diagram * 2),
+        Diagram("c", ThemeMode.LIGHT),
+    )
+    report = BuildReport()
+    for k in keys:
+        report.add(k, ThemeMode.LIGHT, None, cache_hit=False)
+    report.stats.update({"a": RenderStats(latency=2), "b": RenderStats(latency=1)})
+
+    report.collect(storage)
+
+    assert [r.key for r in report.slowest(5)] == [keys[0], keys[1]]
+    assert [r.key for r in report.largest(1)] == [keys[1]]
+
+
+def test_write(tmp_path, svg_diagram):
+    storage, keys = _storage(Diagram("a", ThemeMode.LIGHT, svg_diagram), Diagram("b", ThemeMode.LIGHT))
+    report = BuildReport()
+    for k in keys:
+        report.add(k, ThemeMode.LIGHT, "index.md", cache_hit=storage.is_rendered(k))
+    report.collect(storage)
+
+    path = tmp_path.joinpath("reports", "report.json")
+    report.write(path)
+
+    data = json.loads(path.read_text())
+    assert data["summary"]["diagrams"] == 2
+    assert data["summary"]["statuses"] == {DiagramStatus.CACHED: 1, DiagramStatus.DEFERRED: 1}
+    assert {d["key"] for d in data["diagrams"]} == set(keys)
+    assert data["diagrams"][0]["pages"] == ["index.md"]
@@ -0,0 +1,68 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+
+from mkdocs_puml.retry import RetryBudget, RetryPolicy
+
+
+@pytest.mark.parametrize(
+    "result,expected",
+    [
+        (httpx.Response(503), True),
+        (httpx.Response(429), True),
+        (httpx.Response(400), False),
+        (httpx.Response(509), False),
+        (httpx.ConnectError("reset"), True),
+        (httpx.ReadTimeout("timeout"), True),
+        (ValueError("unexpected"), False),
+    ],
+)
+def test_is_retryable(result, expected):
+    assert RetryPolicy().is_retryable(result) is expected
+
+
+def test_delay_exponential():
+    policy = RetryPolicy(backoff_factor=1, backoff_max=5)
+
+    for attempt in range(6):
+        assert 0 <= policy.delay(attempt) <= min(5, 2**attempt)
+
+
+def test_delay_retry_after_seconds():
+    policy = RetryPolicy(backoff_max=30)
+    resp = httpx.Response(503, headers={"Retry-After": "7"})
+
+    assert policy.delay(0, resp) == 7
+
+
+def test_delay_retry_after_capped():
+    policy = RetryPolicy(backoff_max=2)
+    resp = httpx.Response(503, headers={"Retry-After": "120"})
+
+    assert policy.delay(0, resp) == 2
+
+
+def test_delay_retry_after_date():
+    policy = RetryPolicy(backoff_max=30)
+    date = datetime.now(timezone.utc) + timedelta(seconds=10)
+    resp = httpx.Response(503, headers={"Retry-After": format_datetime(date, usegmt=True)})
+
+    assert 5 < policy.delay(0, resp) <= 10
+
+
+def test_delay_retry_after_invalid():
+    policy = RetryPolicy(backoff_factor=0)
+    resp = httpx.Response(503, headers={"Retry-After": "soon"})
+
+    assert policy.delay(0, resp) == 0
+
+
+def test_budget():
+    budget = RetryBudget(2)
+
+    assert budget.spend()
+    assert budget.spend()
+    assert not budget.spend()
+    assert budget.left == 0
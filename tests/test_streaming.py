@@ -0,0 +1,101 @@
+import asyncio
+
+import httpx
+
+from mkdocs_puml.puml import Fallback, PlantUML
+from mkdocs_puml.retry import RetryPolicy
+from mkdocs_puml.streaming import StreamingRenderer
+from tests.conftest import BASE_PUML_URL
+
+
+def test_submit_renders_in_background(diagram_and_encoded: tuple[str, str], mock_requests):
+    diagram, _ = diagram_and_encoded
+    mock_requests(2)
+
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL))
+    renderer.submit("one", diagram)
+    renderer.submit("two", diagram)
+
+    # Requests are already in flight before translate is called
+    assert renderer._futures["one"].result().startswith("<svg")
+
+    svgs = renderer.translate({"two": diagram, "one": diagram})
+    renderer.close()
+
+    assert len(svgs) == 2
+    for v in svgs:
+        assert 'preserveAspectRatio="xMidYMid meet"' in v
+
+
+def test_submit_same_key_once(diagram_and_encoded: tuple[str, str], mock_requests):
+    diagram, _ = diagram_and_encoded
+    mock_requests(1)
+
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL))
+    renderer.submit("one", diagram)
+    renderer.submit("one", diagram)
+    svgs = renderer.translate({"one": diagram})
+    renderer.close()
+
+    assert len(svgs) == 1
+
+
+def test_translate_not_submitted(diagram_and_encoded: tuple[str, str], mock_requests_fallback):
+    diagram, _ = diagram_and_encoded
+    mock_requests_fallback(1)
+
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL, retry=RetryPolicy(backoff_factor=0)))
+    svgs = renderer.translate({"one": diagram})
+    renderer.close()
+
+    assert isinstance(svgs[0], Fallback)
+    assert svgs[0].status_code == 509
+
+
+def test_close_twice():
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL))
+    renderer.close()
+    renderer.close()
+
+    assert not renderer._thread.is_alive()
+
+
+def test_streaming_with_workers(diagram_and_encoded: tuple[str, str], mock_requests):
+    diagram, _ = diagram_and_encoded
+    mock_requests(2)
+
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL, num_workers=2))
+    svgs = renderer.translate({"one": diagram, "two": diagram})
+    renderer.close()
+
+    assert all(v.startswith("<svg") for v in svgs)
+
+
+def test_translate_timeout(diagram_and_encoded: tuple[str, str], httpx_mock, svg_diagram):
+    diagram, _ = diagram_and_encoded
+
+    async def respond(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, content=svg_diagram.encode("utf-8"))
+
+    httpx_mock.add_callback(respond, is_reusable=True)
+
+    renderer = StreamingRenderer(PlantUML(BASE_PUML_URL))
+    svgs = renderer.translate({"one": diagram}, timeout=0.1)
+    renderer.close()
+
+    assert svgs == [None]
+
+
+def test_shared_retry_budget(diagram_and_encoded: tuple[str, str], httpx_mock):
+    diagram, _ = diagram_and_encoded
+    httpx_mock.add_response(status_code=503, is_reusable=True)
+
+    puml = PlantUML(BASE_PUML_URL, retry=RetryPolicy(attempts=5, backoff_factor=0, budget=3))
+    puml.budget = puml.retry.new_budget()
+    renderer = StreamingRenderer(puml)
+    renderer.translate({"one": diagram})
+    renderer.close()
+
+    # The streaming renderer spends the budget of the build
+    assert puml.budget.left == 0
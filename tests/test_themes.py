@@ -1,4 +1,9 @@
-from mkdocs_puml.theme import Theme
+from pathlib import Path
+import zipfile
+
+import pytest
+
+from mkdocs_puml.theme import THEMES_DIR, Theme
 
 
 def test_theme(diagram_and_encoded: tuple[str, str]):
@@ -31,3 +36,36 @@ def test_with_c4(c4_diagram: str):
     # strip because c4_diagram uses raw-formatted strings
     assert with_theme[1].strip() == "!include https://raw.git.../C4-PlantUML/master/C4_Container.puml"
     assert with_theme[2].strip() == f"!include {url}/{name}.puml"
+
+
+def test_inline_theme(diagram_and_encoded: tuple[str, str], tmp_path):
+    tmp_path.joinpath("custom").mkdir()
+    tmp_path.joinpath("custom/light.puml").write_text("<style>\nroot {\n}\n</style>\n")
+    theme = Theme(url="example.url", path=tmp_path)
+
+    with_theme = theme.include("custom/light", diagram_and_encoded[0]).split("\n")
+
+    assert with_theme[0] == "@startuml"
+    assert with_theme[1:5] == ["<style>", "root {", "}", "</style>"]
+    assert "!include" not in "\n".join(with_theme)
+
+
+def test_bundled_themes():
+    assert THEMES_DIR.joinpath("default/light.puml").is_file()
+    assert THEMES_DIR.joinpath("default/dark.puml").is_file()
+
+
+def test_wheel_contains_themes(tmp_path):
+    pytest.importorskip("poetry.core")
+    from poetry.core.factory import Factory
+    from poetry.core.masonry.builders.wheel import WheelBuilder
+
+    poetry = Factory().create_poetry(Path(__file__).parent.parent)
+    wheel = WheelBuilder.make_in(poetry, tmp_path)
+
+    with zipfile.ZipFile(tmp_path.joinpath(wheel)) as f:
+        names = f.namelist()
+    # Installed next to the package, as THEMES_DIR expects
+    assert THEMES_DIR.parent == Path(__file__).parent.parent
+    assert "themes/default/light.puml" in names
+    assert "themes/default/dark.puml" in names
@@ -0,0 +1,16 @@
+"""Stand-in for `plantuml -tsvg -pipe` that reads a diagram from stdin
+and writes the SVG image of testdata to stdout
+"""
+from pathlib import Path
+import sys
+import time
+
+diagram = sys.stdin.read()
+
+if "error" in diagram:
+    sys.stderr.write("Syntax Error?")
+    sys.exit(200)
+if "slow" in diagram:
+    time.sleep(5)
+
+sys.stdout.write(Path(__file__).parent.joinpath("plantuml.svg").read_text())
@@ -0,0 +1,32 @@
+"""Stand-in for `plantuml -tsvg -pipe -pipeNoStderr -pipedelimitor <delimiter>`.
+
+It reads diagrams from stdin one by one and writes the SVG image of testdata
+followed by the delimiter to stdout on the same line. It also writes the number of the diagram
+rendered by this process into the image, so tests can check that the process is reused
+"""
+from pathlib import Path
+import sys
+import time
+
+delimiter = sys.argv[sys.argv.index("-pipedelimitor") + 1]
+svg = Path(__file__).parent.joinpath("plantuml.svg").read_text()
+
+count = 0
+diagram = []
+for line in sys.stdin:
+    diagram.append(line)
+    if not line.startswith("@enduml"):
+        continue
+
+    count += 1
+    text = "".join(diagram)
+    diagram = []
+
+    if "slow" in text:
+        time.sleep(5)
+    if "error" in text:
+        sys.stdout.write("ERROR\n2\nSyntax Error?\n")
+    # PlantUML doesn't end the image with a new line
+    sys.stdout.write(svg.replace("hello", f"rendered {count}").rstrip())
+    sys.stdout.write(delimiter + "\n")
+    sys.stdout.flush()